@@ -0,0 +1,174 @@
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+
+from logger.results_store import percentile
+
+"""
+Aggregation Defaults
+"""
+DEFAULT_WINDOW_SECONDS = 10.0
+# Prefix of the line the wrappers log before executing a command.
+EXECUTING_PREFIX = "Executing: "
+
+"""
+Command Templates
+"""
+# Numeric argument values (LBAs, sizes, counts, ...) are not part of a command template.
+NUMBER_PATTERN = re.compile(r"(?<![\w/])(0x[0-9a-fA-F]+|\d+)(?!\w)")
+
+
+def command_template(cmd):
+    """
+    Template of a command: its text with the numeric argument values replaced by 'N'.
+
+    Args:
+        cmd (list): Executed command.
+
+    Returns:
+        str: Template, e.g. 'nvme read /dev/nvme0n1 --start-block=N --data-size=N'.
+    """
+
+    return NUMBER_PATTERN.sub("N", ' '.join(cmd))
+
+
+class _Window:
+    """
+    Statistics of one command template within the current aggregation window.
+    """
+
+    __slots__ = ("first", "last", "started", "count", "failures", "latencies")
+
+    def __init__(self, now, started):
+        self.first = now
+        self.last = now
+        self.started = started
+        self.count = 0
+        self.failures = 0
+        self.latencies = []
+
+
+class CommandLogAggregator(logging.Filter):
+    """
+    Collapses the repetitive 'Executing:' lines of hot loops into periodic summary records.
+
+    Installed as a filter on a logger it drops the 'Executing:' lines while enabled, and
+    registered as a wrapper observer it counts every command per template. One INFO summary
+    per template (count, first/last time, failures, latency statistics) is logged when the
+    window expires and when aggregation is disabled. Failures are not aggregated away: the
+    wrappers log the failing command and its stderr in full as errors, which pass through.
+
+    Attributes:
+        logger (logging.Logger): Logger the summaries are written to.
+        window (float): Seconds a template is aggregated before its summary is logged.
+        enabled (bool): Whether 'Executing:' lines are being aggregated.
+    """
+
+    def __init__(self, logger, window=DEFAULT_WINDOW_SECONDS):
+        """
+        Initializes the CommandLogAggregator (disabled).
+
+        Args:
+            logger (logging.Logger): Logger the summaries are written to.
+            window (float): Seconds a template is aggregated before its summary is logged.
+        """
+
+        super().__init__()
+        self.logger = logger
+        self.window = window
+        self.enabled = False
+        self._windows = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        """
+        Drop the 'Executing:' lines while enabled.
+
+        Args:
+            record (logging.LogRecord): Record being logged.
+
+        Returns:
+            bool: False if the record is aggregated.
+        """
+
+        return not (self.enabled and isinstance(record.msg, str) and record.msg.startswith(EXECUTING_PREFIX))
+
+    def on_command(self, cmd, elapsed, success):
+        """
+        Wrapper observer: count a command in the window of its template.
+
+        Args:
+            cmd (list): Executed command.
+            elapsed (float): Command latency in seconds.
+            success (bool): Whether the command succeeded.
+        """
+
+        if not self.enabled:
+            return
+
+        template = command_template(cmd)
+        now = time.time()
+        started = time.monotonic()
+        summary = None
+        with self._lock:
+            window = self._windows.get(template)
+            if window is None:
+                window = self._windows[template] = _Window(now - elapsed, started - elapsed)
+            window.last = now
+            window.count += 1
+            window.failures += 0 if success else 1
+            window.latencies.append(elapsed)
+            if started - window.started >= self.window:
+                summary = self._windows.pop(template)
+
+        if summary is not None:
+            self._log_summary(template, summary)
+
+    def _log_summary(self, template, window):
+        """
+        Log the summary record of one template window.
+
+        Args:
+            template (str): Command template.
+            window (_Window): Window statistics.
+        """
+
+        latencies = sorted(window.latencies)
+        first = datetime.fromtimestamp(window.first).strftime('%H:%M:%S.%f')[:-3]
+        last = datetime.fromtimestamp(window.last).strftime('%H:%M:%S.%f')[:-3]
+        self.logger.info(f"Executed {window.count}x: {template} (first {first}, last {last}, "
+                         f"{window.failures} failed, latency ms mean {sum(latencies) / len(latencies) * 1000:.3f}, "
+                         f"p50 {percentile(latencies, 50) * 1000:.3f}, p99 {percentile(latencies, 99) * 1000:.3f}, "
+                         f"max {latencies[-1] * 1000:.3f})")
+
+    def flush(self):
+        """
+        Log the summary of every open window.
+        """
+
+        with self._lock:
+            windows, self._windows = self._windows, {}
+        for template, window in windows.items():
+            self._log_summary(template, window)
+
+    def enable(self, window=None):
+        """
+        Start aggregating the 'Executing:' lines.
+
+        Args:
+            window (float|None): Window in seconds (None keeps the current one).
+        """
+
+        if window is not None:
+            self.window = window
+        self.enabled = True
+
+    def disable(self):
+        """
+        Stop aggregating and log the summary of every open window.
+        """
+
+        self.enabled = False
+        self.flush()
@@ -0,0 +1,439 @@
+import argparse
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+
+from logger.results_store import command_name
+from logger.rotation import (
+    COMPRESSED_SUFFIXES,
+    DEFAULT_COMPRESSION,
+    DEFAULT_MAX_BYTES,
+    DEFAULT_RETENTION_BYTES,
+    SEGMENT_PATTERN,
+    open_log,
+    mark_active,
+    queue_compression,
+    report_background_error,
+    segment_paths,
+    zstandard,
+)
+
+"""
+Stream Defaults
+"""
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_FLUSH_INTERVAL_SECONDS = 0.2
+DEFAULT_POLL_INTERVAL_SECONDS = 0.2
+
+"""
+Event Types
+"""
+EVENT_COMMAND = "command"
+EVENT_PHASE = "phase"
+EVENT_VERDICT = "verdict"
+PHASE_START = "start"
+PHASE_END = "end"
+
+
+class EventRecorder:
+    """
+    Wrapper observer that writes a command event for every executed command.
+
+    Attributes:
+        stream (EventStream): Destination stream.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def on_command(self, cmd, elapsed, success):
+        self.stream.command(cmd, elapsed, success)
+
+
+class EventStream:
+    """
+    Structured JSON Lines event sink written next to the human log.
+
+    Every record is one JSON object per line with a sequence number, the wall clock time
+    ('ts', seconds since the epoch), a monotonic timestamp ('mono', seconds) to order and
+    time events reliably, the event type and its typed fields, plus the stream context
+    (test, serial, ...). Emitting only queues the record; a background thread serializes
+    and writes them in batches, and rotates the file by size like the text log.
+
+    Attributes:
+        path (str): Active event file path.
+        context (dict): Fields added to every record.
+        max_bytes (int): Rotate once the active file reaches this size (0 disables).
+        compression (str|None): Compression of rotated segments ('gzip', 'zstd' or None).
+        retention_bytes (int|None): Size budget of the run logs of the directory.
+        batch_size (int): Maximum number of records per write.
+        flush_interval (float): Seconds a partial batch may wait before being written.
+    """
+
+    def __init__(self, path, context=None, max_bytes=DEFAULT_MAX_BYTES, compression=DEFAULT_COMPRESSION,
+                 retention_bytes=DEFAULT_RETENTION_BYTES, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL_SECONDS):
+        """
+        Initializes the EventStream (the writer thread starts with the first event).
+
+        Args:
+            path (str): Active event file path.
+            context (dict|None): Fields added to every record.
+            max_bytes (int): Rotate once the active file reaches this size (0 disables).
+            compression (str|None): 'gzip', 'zstd' (falls back to gzip if unavailable) or None.
+            retention_bytes (int|None): Size budget of the run logs of the directory, None for no limit.
+            batch_size (int): Maximum number of records per write.
+            flush_interval (float): Seconds a partial batch may wait before being written.
+        """
+
+        if compression == "zstd" and zstandard is None:
+            compression = "gzip"
+        self.path = path
+        self.context = dict(context or {})
+        self.max_bytes = max_bytes
+        self.compression = compression
+        self.retention_bytes = retention_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._sequence = itertools.count()
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        segments = segment_paths(path)
+        self._segment = int(SEGMENT_PATTERN.search(segments[-1]).group(1)) if segments else 0
+
+    def set_context(self, **fields):
+        """
+        Add fields to the context of the following records (e.g. the drive identity).
+
+        Args:
+            **fields: Context fields; None values are ignored.
+        """
+
+        self.context.update({key: value for key, value in fields.items() if value is not None})
+
+    def emit(self, event, **fields):
+        """
+        Queue one event record.
+
+        Args:
+            event (str): Event type ('command', 'phase', 'verdict' or a custom one).
+            **fields: Typed fields of the event (JSON serializable; others are written as strings).
+        """
+
+        record = {"seq": next(self._sequence), "ts": time.time(), "mono": time.monotonic(), "event": event}
+        record.update(self.context)
+        record.update(fields)
+
+        if self._writer is None:
+            # Events may be emitted on several threads at once; start a single writer.
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="event-writer", daemon=True)
+                    self._writer.start()
+        self._queue.put(record)
+
+    def command(self, cmd, elapsed, success):
+        """
+        Queue a command event.
+
+        Args:
+            cmd (list): Executed command.
+            elapsed (float): Command latency in seconds.
+            success (bool): Whether the command succeeded.
+        """
+
+        self.emit(EVENT_COMMAND, command=command_name(cmd), argv=list(cmd), elapsed=elapsed, success=bool(success))
+
+    def phase(self, name, state, **fields):
+        """
+        Queue a phase event (drive checks, test body, ...).
+
+        Args:
+            name (str): Phase name, e.g. 'Pre-Check' or 'Test'.
+            state (str): 'start' or 'end'.
+            **fields: Additional fields.
+        """
+
+        self.emit(EVENT_PHASE, phase=name, state=state, **fields)
+
+    def verdict(self, verdict, errors):
+        """
+        Queue the verdict event of a test.
+
+        Args:
+            verdict (str): 'PASSED' or 'FAILED'.
+            errors (int): Number of errors of the test.
+        """
+
+        self.emit(EVENT_VERDICT, verdict=verdict, errors=errors)
+
+    def observer(self):
+        """
+        Wrapper observer writing command events, see NvmeCommands.add_observer().
+
+        Returns:
+            EventRecorder: The observer.
+        """
+
+        return EventRecorder(self)
+
+    def _rollover(self, stream):
+        """
+        Close the active file, rename it to the next segment and queue it for compression.
+
+        Args:
+            stream (file): Active file.
+
+        Returns:
+            file: New active file.
+        """
+
+        stream.close()
+        self._segment += 1
+        segment = f"{self.path}.{self._segment:04d}"
+        os.replace(self.path, segment)
+        stream = mark_active(open(self.path, 'a', encoding='utf-8'))
+        queue_compression(segment, self.compression, os.path.dirname(self.path) or ".",
+                          self.retention_bytes, (self.path,))
+        return stream
+
+    def _write_loop(self):
+        """
+        Writer thread: serialize and write queued records in batches until close() queues None.
+        """
+
+        stream = mark_active(open(self.path, 'a', encoding='utf-8'))
+        size = stream.tell()
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+
+            # Gather a batch until it is full or the flush interval expires.
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            if batch[-1] is None:
+                running = False
+
+            try:
+                for record in batch:
+                    if record is None:
+                        continue
+                    line = json.dumps(record, default=str, separators=(',', ':')) + "\n"
+                    if self.max_bytes and size and size + len(line) > self.max_bytes:
+                        stream.flush()
+                        stream = self._rollover(stream)
+                        size = 0
+                    stream.write(line)
+                    size += len(line)
+                # Readers following the file see whole batches.
+                stream.flush()
+            except (OSError, ValueError) as ex:
+                report_background_error(f"Event stream {self.path} lost records: {ex}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+        stream.close()
+
+    def flush(self):
+        """
+        Wait until every queued record has been written.
+        """
+
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        """
+        Write the queued records and stop the writer thread.
+        """
+
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+
+def _segment_events(segment):
+    """
+    Events of one closed segment, following it if it was compressed meanwhile.
+
+    Args:
+        segment (str): Segment path, compressed or not.
+
+    Yields:
+        dict: Event records.
+    """
+
+    for candidate in [segment] + [segment + suffix for suffix in COMPRESSED_SUFFIXES.values()]:
+        try:
+            events = open_log(candidate)
+        except FileNotFoundError:
+            continue
+        with events:
+            for line in events:
+                if line.endswith("\n"):
+                    yield json.loads(line)
+        return
+
+
+def read_events(path):
+    """
+    Read the events of a stream across its rotated segments, oldest first.
+
+    Args:
+        path (str): Path of the active event file (it may no longer exist).
+
+    Yields:
+        dict: Event records.
+    """
+
+    for segment in segment_paths(path):
+        yield from _segment_events(segment)
+    if os.path.exists(path):
+        yield from _segment_events(path)
+
+
+def _first_sequence(segment):
+    """Sequence number of the first event of a segment (None if it is empty or gone)."""
+    for record in _segment_events(segment):
+        return record["seq"]
+    return None
+
+
+def _missed_events(path, after, before):
+    """
+    Events of the closed segments with a sequence number between two others.
+
+    Args:
+        path (str): Path of the active event file.
+        after (int): Last sequence number already seen.
+        before (int): First sequence number seen after the gap.
+
+    Yields:
+        dict: Event records, in order.
+    """
+
+    # Walk back from the newest segment to the one holding the first missed event.
+    missed = []
+    for segment in reversed(segment_paths(path)):
+        first = _first_sequence(segment)
+        if first is None or first < before:
+            missed.append(segment)
+        if first is not None and first <= after + 1:
+            break
+    for segment in reversed(missed):
+        for record in _segment_events(segment):
+            if after < record["seq"] < before:
+                yield record
+
+
+def follow(path, from_start=False, poll_interval=DEFAULT_POLL_INTERVAL_SECONDS, stop=None):
+    """
+    Follow an event stream in real time, like 'tail -F'.
+
+    Rotation is handled without losing events: when the active file is renamed, the rest of
+    it is read before switching to the new one, and a gap in the sequence numbers (several
+    rotations between two polls) is filled from the closed segments, compressed or not.
+    Partial lines are held until complete.
+
+    Args:
+        path (str): Path of the active event file (it may not exist yet).
+        from_start (bool): Yield the existing events (rotated segments included) first.
+        poll_interval (float): Seconds to sleep when no new data is available.
+        stop (threading.Event|None): Stop following once set.
+
+    Yields:
+        dict: Event records.
+    """
+
+    stream = None
+    pending = ""
+    # Sequence number of the last event yielded (None until the first one when tailing).
+    last_seq = -1 if from_start else None
+    if from_start:
+        for record in read_events(path):
+            last_seq = record["seq"]
+            yield record
+
+    def accept(lines):
+        nonlocal last_seq
+        for line in lines:
+            if not line:
+                continue
+            record = json.loads(line)
+            if last_seq is not None:
+                if record["seq"] <= last_seq:
+                    continue
+                if record["seq"] > last_seq + 1:
+                    yield from _missed_events(path, last_seq, record["seq"])
+            last_seq = record["seq"]
+            yield record
+
+    try:
+        while stop is None or not stop.is_set():
+            if stream is None:
+                try:
+                    stream = open(path, 'r', encoding='utf-8')
+                except FileNotFoundError:
+                    time.sleep(poll_interval)
+                    continue
+                if not from_start:
+                    stream.seek(0, os.SEEK_END)
+                # Every file opened after the first one is read from its start.
+                from_start = True
+
+            chunk = stream.read()
+            if chunk:
+                lines = (pending + chunk).split("\n")
+                pending = lines.pop()
+                yield from accept(lines)
+                continue
+
+            # No new data: switch files if the active one was rotated, else wait.
+            try:
+                rotated = os.stat(path).st_ino != os.fstat(stream.fileno()).st_ino
+            except FileNotFoundError:
+                rotated = True
+            if not rotated:
+                time.sleep(poll_interval)
+                continue
+
+            yield from accept((pending + stream.read()).split("\n"))
+            pending = ""
+            stream.close()
+            stream = None
+    finally:
+        if stream is not None:
+            stream.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read or follow a JSON Lines test event stream")
+    parser.add_argument("path", help="Event file, e.g. logs/test_id_ctrl_2025-06-16_23-19-11.events.jsonl")
+    parser.add_argument("-f", "--follow", action="store_true", help="Keep printing new events as they arrive")
+    parser.add_argument("--event", action="append", help="Only print events of this type (repeatable)")
+    args = parser.parse_args()
+
+    events = follow(args.path, from_start=True) if args.follow else read_events(args.path)
+    try:
+        for record in events:
+            if not args.event or record["event"] in args.event:
+                print(json.dumps(record), flush=True)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+import argparse
+import os
+import re
+import sqlite3
+import time
+
+from logger.rotation import COMPRESSED_SUFFIXES, SEGMENT_PATTERN, open_log
+
+"""
+Index Defaults
+"""
+DEFAULT_LOG_DIR = "logs"
+INDEX_FILE_NAME = "log_index.db"
+READ_BLOCK_BYTES = 4 * 1024 * 1024
+
+"""
+Log Line Format (see LogManager): timestamp - testname - level - message
+"""
+LINE_PATTERN = re.compile(r"^(\d{4}-\d{2}-\d{2} [\d:,]+) - (.+?) - ([A-Z]+) - (.*)$")
+DRIVE_PATTERN = re.compile(r"SN: ([^,]*), FW: ([^,]*), Health: [^,]*, Model: (.*)$")
+VERDICT_PATTERN = re.compile(r"\[====== TEST (PASSED|FAILED) ======\]")
+FIELD_PATTERN = re.compile(r"Error in \"(\w+)\"")
+WORD_PATTERN = re.compile(r"[A-Za-z0-9_.\-]{2,}")
+INDEXED_LEVELS = ("ERROR", "CRITICAL", "WARNING")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    file_id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    log TEXT NOT NULL,
+    inode INTEGER NOT NULL,
+    indexed_bytes INTEGER NOT NULL,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_log ON files (log);
+
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    file_id INTEGER NOT NULL,
+    offset INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS postings_term ON postings (term, file_id);
+CREATE INDEX IF NOT EXISTS postings_file ON postings (file_id);
+"""
+
+
+def log_name(file_name):
+    """
+    Name of the log a file belongs to: the active file name without its segment suffix.
+
+    Args:
+        file_name (str): Log file or segment name.
+
+    Returns:
+        str | None: Log name, or None if the file is not a log.
+    """
+
+    match = SEGMENT_PATTERN.search(file_name)
+    base = file_name[:match.start()] if match else file_name
+    # Logs of closed runs are compressed as a whole (name.log.gz).
+    for suffix in COMPRESSED_SUFFIXES.values():
+        if base.endswith(".log" + suffix):
+            base = base[:-len(suffix)]
+    return base if base.endswith(".log") else None
+
+
+def line_terms(line):
+    """
+    Index terms of one log line.
+
+    Identity and verdict lines produce prefixed terms (test:, sn:, fw:, model:, verdict:);
+    warning and error lines also produce level:, field: and their lowercase words.
+
+    Args:
+        line (str): Log line without the newline.
+
+    Returns:
+        set: Terms of the line (empty if nothing is worth indexing).
+    """
+
+    match = LINE_PATTERN.match(line)
+    if not match:
+        return set()
+    _, test, level, message = match.groups()
+
+    terms = set()
+    drive = DRIVE_PATTERN.search(message)
+    if drive:
+        sn, fw, model = (value.strip() for value in drive.groups())
+        terms.update((f"test:{test}", f"sn:{sn}", f"fw:{fw}", f"model:{model}"))
+    verdict = VERDICT_PATTERN.search(message)
+    if verdict:
+        terms.update((f"test:{test}", f"verdict:{verdict.group(1)}"))
+
+    if level in INDEXED_LEVELS:
+        terms.add(f"level:{level}")
+        terms.update(f"field:{field}" for field in FIELD_PATTERN.findall(message))
+        terms.update(word.lower() for word in WORD_PATTERN.findall(message))
+    return terms
+
+
+class LogIndex:
+    """
+    Incremental inverted index of the test logs written by LogManager.
+
+    Every indexed line is stored as postings (term, file, byte offset), so queries are
+    answered from the SQLite index and the matching lines are read with a single seek.
+    The index remembers how many bytes of each file it has processed: an update only reads
+    what was appended since, and compressed segments, which never change, are read once.
+
+    Attributes:
+        log_dir (str): Directory holding the logs.
+        db_path (str): Index database path.
+    """
+
+    def __init__(self, log_dir=DEFAULT_LOG_DIR, db_path=None):
+        """
+        Initializes the LogIndex, creating the index database if needed.
+
+        Args:
+            log_dir (str): Directory holding the logs.
+            db_path (str|None): Index database path. Defaults to log_index.db in log_dir.
+        """
+
+        self.log_dir = log_dir
+        self.db_path = db_path or os.path.join(log_dir, INDEX_FILE_NAME)
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(self.db_path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def _index_lines(self, file_id, data, base_offset):
+        """
+        Add the postings of a block of complete lines.
+
+        Args:
+            file_id (int): File the block belongs to.
+            data (bytes): Complete lines.
+            base_offset (int): Offset of the block within the (uncompressed) file.
+
+        Returns:
+            int: Number of postings added.
+        """
+
+        rows = []
+        offset = base_offset
+        for raw in data.splitlines(keepends=True):
+            for term in line_terms(raw.decode('utf-8', errors='replace').rstrip("\r\n")):
+                rows.append((term, file_id, offset))
+            offset += len(raw)
+        self.connection.executemany("INSERT INTO postings (term, file_id, offset) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def _index_file(self, path, log, stat, record):
+        """
+        Index the new content of one file.
+
+        Args:
+            path (str): File path.
+            log (str): Log name the file belongs to.
+            stat (os.stat_result): Current file status.
+            record (tuple|None): Stored (file_id, inode, indexed_bytes), or None for a new file.
+
+        Returns:
+            tuple(int, int): Bytes read and postings added.
+        """
+
+        compressed = path.endswith((".gz", ".zst"))
+
+        if record and record[1] == stat.st_ino and record[2] <= stat.st_size:
+            file_id, _, start = record
+            if start == stat.st_size:
+                return 0, 0
+        else:
+            # New file, or the path now names another file (rotated) or a truncated one.
+            if record:
+                self.connection.execute("DELETE FROM postings WHERE file_id = ?", (record[0],))
+                self.connection.execute("DELETE FROM files WHERE file_id = ?", (record[0],))
+            cursor = self.connection.execute(
+                "INSERT INTO files (path, log, inode, indexed_bytes, indexed_at) VALUES (?, ?, ?, 0, ?)",
+                (path, log, stat.st_ino, time.time()))
+            file_id, start = cursor.lastrowid, 0
+
+        postings = 0
+        if compressed:
+            # Offsets of compressed segments refer to the decompressed stream.
+            with open_log(path, binary=True) as log_file:
+                data = log_file.read()
+            postings = self._index_lines(file_id, data, 0)
+            indexed = stat.st_size
+            read = len(data)
+        else:
+            with open(path, 'rb') as log_file:
+                log_file.seek(start)
+                indexed = start
+                while True:
+                    block = log_file.read(READ_BLOCK_BYTES)
+                    # Only complete lines are indexed; a partial last line waits for the next update.
+                    end = block.rfind(b"\n") + 1
+                    if end == 0:
+                        break
+                    postings += self._index_lines(file_id, block[:end], indexed)
+                    indexed += end
+                    log_file.seek(indexed)
+            read = indexed - start
+
+        self.connection.execute("UPDATE files SET indexed_bytes = ?, indexed_at = ? WHERE file_id = ?",
+                                (indexed, time.time(), file_id))
+        return read, postings
+
+    def update(self):
+        """
+        Index what was written to the log directory since the previous update.
+
+        Returns:
+            dict: Files seen, bytes read, postings added, files dropped and seconds taken.
+        """
+
+        start = time.monotonic()
+        stored = {path: (file_id, inode, indexed)
+                  for file_id, path, inode, indexed in
+                  self.connection.execute("SELECT file_id, path, inode, indexed_bytes FROM files")}
+        summary = {"files": 0, "bytes": 0, "postings": 0, "dropped": 0}
+
+        with self.connection:
+            seen = set()
+            for entry in os.scandir(self.log_dir):
+                log = log_name(entry.name)
+                if log is None or not entry.is_file():
+                    continue
+                seen.add(entry.path)
+                summary["files"] += 1
+                read, postings = self._index_file(entry.path, os.path.join(self.log_dir, log),
+                                                  entry.stat(), stored.get(entry.path))
+                summary["bytes"] += read
+                summary["postings"] += postings
+
+            # Forget files removed by rotation (compressed under a new name) or retention.
+            for path, (file_id, _, _) in stored.items():
+                if path not in seen:
+                    self.connection.execute("DELETE FROM postings WHERE file_id = ?", (file_id,))
+                    self.connection.execute("DELETE FROM files WHERE file_id = ?", (file_id,))
+                    summary["dropped"] += 1
+
+        summary["seconds"] = time.monotonic() - start
+        return summary
+
+    def logs(self, test=None, serial=None, firmware=None, model=None, verdict=None):
+        """
+        Logs (runs) whose identity matches every given value.
+
+        Args:
+            test (str|None): Test name, e.g. 'test_id_ctrl'.
+            serial (str|None): Drive serial number.
+            firmware (str|None): Firmware revision.
+            model (str|None): Model number.
+            verdict (str|None): 'PASSED' or 'FAILED'.
+
+        Returns:
+            list: Log paths, sorted.
+        """
+
+        terms = [f"{prefix}:{value}" for prefix, value in
+                 (("test", test), ("sn", serial), ("fw", firmware), ("model", model), ("verdict", verdict))
+                 if value is not None]
+        if not terms:
+            return [row[0] for row in self.connection.execute("SELECT DISTINCT log FROM files ORDER BY log")]
+
+        placeholders = ", ".join("?" * len(terms))
+        rows = self.connection.execute(
+            f"SELECT f.log FROM postings p JOIN files f ON f.file_id = p.file_id WHERE p.term IN ({placeholders}) "
+            f"GROUP BY f.log HAVING COUNT(DISTINCT p.term) = ? ORDER BY f.log", terms + [len(terms)])
+        return [row[0] for row in rows]
+
+    def search(self, terms, limit=1000, **identity):
+        """
+        Lines containing every term, optionally only in the logs matching an identity.
+
+        Args:
+            terms (list): Terms, e.g. ['field:mn'] or ['timeout', 'level:ERROR'] (words are lowercase).
+            limit (int): Maximum number of lines.
+            **identity: test, serial, firmware, model, verdict (see logs()).
+
+        Returns:
+            list: (path, offset, line) tuples in file order.
+        """
+
+        terms = [term if ":" in term else term.lower() for term in terms]
+        placeholders = ", ".join("?" * len(terms))
+        query = (f"SELECT f.path, f.log, p.offset FROM postings p JOIN files f ON f.file_id = p.file_id "
+                 f"WHERE p.term IN ({placeholders}) GROUP BY p.file_id, p.offset "
+                 f"HAVING COUNT(DISTINCT p.term) = ? ORDER BY f.path, p.offset")
+        rows = self.connection.execute(query, terms + [len(terms)]).fetchall()
+
+        if identity:
+            allowed = set(self.logs(**identity))
+            rows = [row for row in rows if row[1] in allowed]
+
+        return [(path, offset, self.read_line(path, offset)) for path, _, offset in rows[:limit]]
+
+    def read_line(self, path, offset):
+        """
+        Read the line starting at an indexed offset.
+
+        Args:
+            path (str): File path.
+            offset (int): Offset within the (decompressed) file.
+
+        Returns:
+            str: The line without the newline ('' if the file is gone).
+        """
+
+        try:
+            with open_log(path, binary=True) as log_file:
+                log_file.seek(offset)
+                return log_file.readline().decode('utf-8', errors='replace').rstrip("\r\n")
+        except OSError:
+            return ""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index and search the test logs")
+    parser.add_argument("--log-dir", default=DEFAULT_LOG_DIR, help="Log directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("update", help="Index the logs written since the last update")
+    logs = subparsers.add_parser("logs", help="List the logs of matching runs")
+    search = subparsers.add_parser("search", help="Print the lines containing every term")
+    search.add_argument("terms", nargs="+", help="Words or prefixed terms (field:mn, level:ERROR)")
+
+    for sub in (logs, search):
+        sub.add_argument("--test")
+        sub.add_argument("--serial")
+        sub.add_argument("--firmware")
+        sub.add_argument("--model")
+        sub.add_argument("--verdict", choices=("PASSED", "FAILED"))
+
+    args = parser.parse_args()
+    index = LogIndex(args.log_dir)
+
+    # Queries always start from an up-to-date index; only appended bytes are read.
+    summary = index.update()
+    if args.command == "update":
+        print(f"{summary['files']} files, {summary['bytes']} new bytes, {summary['postings']} postings, "
+              f"{summary['dropped']} dropped in {summary['seconds'] * 1000:.0f} ms")
+    else:
+        identity = {key: getattr(args, key) for key in ("test", "serial", "firmware", "model", "verdict")
+                    if getattr(args, key) is not None}
+        if args.command == "logs":
+            for log in index.logs(**identity):
+                print(log)
+        else:
+            for path, offset, line in index.search(args.terms, **identity):
+                print(f"{os.path.basename(path)}:{offset}: {line}")
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,108 @@
 import logging
+from contextlib import contextmanager
 from datetime import datetime
 import os
 
+from logger.rotation import (
+    DEFAULT_COMPRESSION,
+    DEFAULT_MAX_BYTES,
+    DEFAULT_RETENTION_BYTES,
+    RotatingCompressedFileHandler,
+    queue_compression,
+    queue_retention,
+    wait_for_compression,
+    zstandard,
+)
+from logger.event_stream import EventStream
+from logger.aggregation import CommandLogAggregator
+
 class LogManager:
     """
     LogManager sets up a logging system that outputs logs to a timestamped file
     and optionally to the console. It is designed to be initialized per test case.
 
+    The file is rotated by size and age; closed segments, and the whole log once the run is
+    closed, are compressed in the background. The oldest closed runs (log, event stream and
+    segments) are deleted to keep the run logs of the directory within their retention budget,
+    checked when a run starts, on every rotation and when a run closes.
+    Use logger.rotation.iter_log_lines() to read a log across its segments.
+
+    Alongside the text log, a structured JSON Lines event stream (<log name>.events.jsonl)
+    records commands, phases and verdicts with typed fields; see logger.event_stream.
+
+    Tests with hot command loops can enable command aggregation, which collapses the
+    'Executing:' lines of identical command templates into periodic summary records
+    (the aggregator must be registered as an observer of the wrappers).
+
     Attributes:
         testname (str): Name of the test case, used to name the log file.
         log_to_console (bool): Whether logs should also be printed to the console.
         log_dir (str): Directory where log files will be stored.
         log_level (int): Logging level (default is logging.INFO).
         logger (logging.Logger): Configured logger instance.
+        max_bytes (int): Size at which the log file is rotated (0 disables).
+        max_age (float|None): Age in seconds at which the log file is rotated.
+        compression (str|None): Compression of rotated segments and closed run logs ('gzip', 'zstd' or None).
+        retention_bytes (int|None): Size budget of the run logs of the log directory.
+        isolated (bool): Whether the logger is private to this instance instead of the
+            process-wide logger named after the test.
+        events (EventStream|None): Structured event stream written next to the log file.
+        aggregator (CommandLogAggregator): Filter and wrapper observer aggregating command lines.
     """
 
-    def __init__(self, testname, console=True, log_dir='logs'):
+    def __init__(self, testname, console=True, log_dir='logs', max_bytes=DEFAULT_MAX_BYTES, max_age=None,
+                 compression=DEFAULT_COMPRESSION, retention_bytes=DEFAULT_RETENTION_BYTES, events=True,
+                 isolated=False):
         """
         Initializes the LogManager.
 
         Args:
             console (bool): Whether to enable logging output to the console. Default is True.
             log_dir (str): Directory path to store the log files. Default is 'logs'.
+            max_bytes (int): Size at which the log file is rotated (0 disables). Default is 64 MiB.
+            max_age (float|None): Age in seconds at which the log file is rotated. Default is None.
+            compression (str|None): 'gzip' (default), 'zstd' (falls back to gzip if unavailable) or None.
+            retention_bytes (int|None): Size budget of the run logs of the log directory. Default is 2 GiB.
+            events (bool): Whether to write the structured event stream. Default is True.
+            isolated (bool): Use a private logger (still named after the test) so several
+                instances of the same test can run concurrently in one process. Default is False.
         """
 
         self.log_to_console = console
         self.log_dir = log_dir
         self.log_level = logging.INFO
         self.testname = testname
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compression = "gzip" if compression == "zstd" and zstandard is None else compression
+        self.retention_bytes = retention_bytes
+        self.log_file_path = None
+        self.events = None
+        self.isolated = isolated
 
         # Create the specified log directory if it does not already exist.
         os.makedirs(self.log_dir, exist_ok=True)
 
-        # Create and configure the logger instance.
-        self.logger = logging.getLogger(self.testname)
+        # Create and configure the logger instance (a private one is not registered by name).
+        self.logger = logging.Logger(self.testname) if isolated else logging.getLogger(self.testname)
         self.logger.setLevel(self.log_level)
 
         # Setup file and console handlers.
         self._setupLogger()
 
+        # Make room for this run in the log directory (its own files are held, see mark_active()).
+        queue_retention(self.log_dir, self.retention_bytes)
+
+        # Command aggregation is a logger filter (disabled until a test asks for it).
+        self.aggregator = CommandLogAggregator(self.logger)
+        self.logger.addFilter(self.aggregator)
+
+        # Structured events go next to the log file, sharing its name and rotation settings.
+        if events and self.log_file_path:
+            self.events = EventStream(f"{os.path.splitext(self.log_file_path)[0]}.events.jsonl",
+                                      context={"test": self.testname}, max_bytes=self.max_bytes,
+                                      compression=self.compression, retention_bytes=self.retention_bytes)
+
     def _setupLogger(self):
         """
         Configures logging handlers for file and optional console output.
@@ -52,13 +116,25 @@ class LogManager:
         
         # Generate the timestamped filename using the test name.
         timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
-        log_file_path = os.path.join(self.log_dir, f'{self.testname}_{timestamp}.log')
+        self.log_file_path = os.path.join(self.log_dir, f'{self.testname}_{timestamp}.log')
+
+        # Runs of the same test started within the same second get numbered files.
+        sequence = 1
+        while True:
+            try:
+                open(self.log_file_path, 'x').close()
+                break
+            except FileExistsError:
+                sequence += 1
+                self.log_file_path = os.path.join(self.log_dir, f'{self.testname}_{timestamp}_{sequence}.log')
 
         # Define a common log format.
         formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
-        # File handler to write logs to a file.
-        file_handler = logging.FileHandler(log_file_path)
+        # File handler to write logs to a file, rotated and compressed in the background.
+        file_handler = RotatingCompressedFileHandler(self.log_file_path, max_bytes=self.max_bytes,
+                                                     max_age=self.max_age, compression=self.compression,
+                                                     retention_bytes=self.retention_bytes)
         file_handler.setFormatter(formatter)
         self.logger.addHandler(file_handler)
 
@@ -78,6 +154,69 @@ class LogManager:
 
         return self.logger
 
+    def get_events(self):
+        """
+        Returns the structured event stream.
+
+        Returns:
+            EventStream|None: The event stream, or None if disabled.
+        """
+
+        return self.events
+
+    def set_command_aggregation(self, enabled, window=None):
+        """
+        Enables or disables the aggregation of the 'Executing:' command lines.
+        Disabling it logs the summary of the pending commands.
+
+        Args:
+            enabled (bool): Whether to aggregate.
+            window (float|None): Seconds a command template is aggregated before its summary
+                is logged (None keeps the current window, 10 seconds by default).
+        """
+
+        if enabled:
+            self.aggregator.enable(window)
+        else:
+            self.aggregator.disable()
+
+    @contextmanager
+    def command_aggregation(self, enabled=True, window=None):
+        """
+        Aggregates the command lines within a block, e.g. the run of a test.
+
+        Args:
+            enabled (bool): Whether to aggregate (False makes the block a no-op).
+            window (float|None): Aggregation window in seconds.
+        """
+
+        if not enabled:
+            yield self.aggregator
+            return
+        self.set_command_aggregation(True, window)
+        try:
+            yield self.aggregator
+        finally:
+            self.set_command_aggregation(False)
+
+    def close(self):
+        """
+        Closes the handlers of the logger and the event stream, queues the compression of the
+        run log and waits for pending compression and retention.
+        """
+
+        self.aggregator.disable()
+        self.logger.removeFilter(self.aggregator)
+        if self.events:
+            self.events.close()
+
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+            handler.close()
+        if self.log_file_path and os.path.exists(self.log_file_path):
+            queue_compression(self.log_file_path, self.compression, self.log_dir, self.retention_bytes)
+        wait_for_compression()
+
     def info(self, msg):
         self.logger.info(msg)
         
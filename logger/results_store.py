@@ -0,0 +1,499 @@
+import argparse
+import math
+import os
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+
+"""
+Store Defaults
+"""
+DEFAULT_DB_PATH = os.path.join("logs", "results.db")
+DEFAULT_BATCH_SIZE = 512
+DEFAULT_FLUSH_INTERVAL_SECONDS = 1.0
+
+"""
+Admin opcodes recorded by name (admin-passthru commands are otherwise indistinguishable)
+"""
+ADMIN_OPCODE_NAMES = {
+    0x02: "get-log-page",
+    0x06: "identify",
+    0x09: "set-features",
+    0x0A: "get-features",
+    0x10: "fw-commit",
+    0x11: "fw-download",
+    0x14: "device-self-test",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    test TEXT NOT NULL,
+    serial TEXT,
+    model TEXT,
+    firmware TEXT,
+    device TEXT,
+    started REAL NOT NULL,
+    finished REAL,
+    verdict TEXT,
+    errors INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_firmware ON runs (firmware, started);
+CREATE INDEX IF NOT EXISTS runs_serial ON runs (serial, started);
+CREATE INDEX IF NOT EXISTS runs_test ON runs (test, started);
+
+CREATE TABLE IF NOT EXISTS commands (
+    run_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    command TEXT NOT NULL,
+    latency_us REAL NOT NULL,
+    success INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS commands_name ON commands (command, run_id);
+
+CREATE TABLE IF NOT EXISTS measurements (
+    run_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    name TEXT NOT NULL,
+    value REAL NOT NULL,
+    unit TEXT
+);
+CREATE INDEX IF NOT EXISTS measurements_name ON measurements (name, run_id);
+
+CREATE TABLE IF NOT EXISTS smart (
+    run_id TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    stage TEXT NOT NULL,
+    field TEXT NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS smart_field ON smart (field, run_id);
+"""
+
+INSERTS = {
+    "run": "INSERT OR REPLACE INTO runs (run_id, test, serial, model, firmware, device, started) "
+           "VALUES (?, ?, ?, ?, ?, ?, ?)",
+    "identity": "UPDATE runs SET serial = coalesce(?, serial), model = coalesce(?, model), "
+                "firmware = coalesce(?, firmware) WHERE run_id = ?",
+    "finish": "UPDATE runs SET finished = ?, verdict = ?, errors = ? WHERE run_id = ?",
+    "command": "INSERT INTO commands (run_id, timestamp, command, latency_us, success) VALUES (?, ?, ?, ?, ?)",
+    "measurement": "INSERT INTO measurements (run_id, timestamp, name, value, unit) VALUES (?, ?, ?, ?, ?)",
+    "smart": "INSERT INTO smart (run_id, timestamp, stage, field, value) VALUES (?, ?, ?, ?, ?)",
+}
+
+
+def command_name(cmd):
+    """
+    Short name of an nvme-cli command, with admin-passthru commands named after their opcode
+    and vendor plugin commands named '<plugin> <subcommand>'.
+
+    Args:
+        cmd (list): Executed command, e.g. ['nvme', 'admin-passthru', '/dev/nvme0', '--opcode=6', ...].
+
+    Returns:
+        str: Command name, e.g. 'identify', 'id-ctrl' or 'solidigm id-ctrl'.
+    """
+
+    name = cmd[1] if len(cmd) > 1 else cmd[0]
+    # Plugin commands (nvme solidigm id-ctrl /dev/nvme0) have a subcommand before the device.
+    if len(cmd) > 2 and not cmd[2].startswith(("/", "-")):
+        return f"{name} {cmd[2]}"
+    if name == "admin-passthru":
+        for arg in cmd:
+            if arg.startswith("--opcode="):
+                opcode = int(arg.split("=", 1)[1], 0)
+                return ADMIN_OPCODE_NAMES.get(opcode, f"admin-{opcode:#04x}")
+    return name
+
+
+def percentile(values, pct):
+    """
+    Nearest-rank percentile of a sorted list.
+
+    Args:
+        values (list): Sorted values.
+        pct (float): Percentile (0-100).
+
+    Returns:
+        float: The percentile value.
+    """
+
+    rank = max(1, math.ceil(pct / 100 * len(values)))
+    return values[rank - 1]
+
+
+class CommandRecorder:
+    """
+    Wrapper observer that records the latency of every command of one run.
+
+    Attributes:
+        store (ResultsStore): Destination store.
+        run_id (str): Run the commands belong to.
+    """
+
+    def __init__(self, store, run_id):
+        self.store = store
+        self.run_id = run_id
+
+    def on_command(self, cmd, elapsed, success):
+        self.store.record_command(self.run_id, command_name(cmd), elapsed, success)
+
+
+class ResultsStore:
+    """
+    SQLite store of test runs, command latencies, measurements and SMART snapshots.
+
+    Writers never touch the database: records are queued and a background thread inserts
+    them in batches, one transaction per batch, into a WAL-mode database so that readers
+    (the query API or another process) never block the writer.
+
+    Attributes:
+        path (str): Database file path.
+        logger (logging.Logger|None): Logger instance for writer errors.
+        batch_size (int): Maximum number of records per transaction.
+        flush_interval (float): Seconds a partial batch may wait before being written.
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH, logger=None, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL_SECONDS):
+        """
+        Initializes the ResultsStore, creating the schema if needed.
+
+        Args:
+            path (str): Database file path.
+            logger (logging.Logger|None): Logger instance for writer errors.
+            batch_size (int): Maximum number of records per transaction.
+            flush_interval (float): Seconds a partial batch may wait before being written.
+        """
+
+        self.path = path
+        self.logger = logger
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue()
+        self._writer = None
+        self._writer_lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+        connection.close()
+
+    def _connect(self):
+        """
+        Open a connection; WAL readers and the writer wait for each other's locks briefly.
+
+        Returns:
+            sqlite3.Connection: New connection.
+        """
+
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _put(self, kind, row):
+        """
+        Queue a record for the writer thread, starting it on first use.
+
+        Args:
+            kind (str): Key of the INSERTS statement.
+            row (tuple): Statement parameters.
+        """
+
+        if self._writer is None:
+            # Commands may complete on several threads at once; start a single writer.
+            with self._writer_lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="results-writer", daemon=True)
+                    self._writer.start()
+        self._queue.put((kind, row))
+
+    def _write_loop(self):
+        """
+        Writer thread: insert queued records in batches until close() queues None.
+        """
+
+        connection = self._connect()
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+
+            # Gather a batch until it is full or the flush interval expires.
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+
+            if batch[-1] is None:
+                running = False
+            records = [record for record in batch if record is not None]
+
+            try:
+                with connection:
+                    for kind, row in records:
+                        connection.execute(INSERTS[kind], row)
+            except sqlite3.Error as ex:
+                if self.logger:
+                    self.logger.error(f"Results store lost {len(records)} records: {ex}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+        connection.close()
+
+    def start_run(self, test, serial=None, model=None, firmware=None, device=None):
+        """
+        Record the start of a test run.
+
+        Args:
+            test (str): Test name.
+            serial (str|None): Drive serial number.
+            model (str|None): Drive model number.
+            firmware (str|None): Firmware revision.
+            device (str|None): Controller device path.
+
+        Returns:
+            str: Identifier of the new run.
+        """
+
+        run_id = uuid.uuid4().hex
+        self._put("run", (run_id, test, serial, model, firmware, device, time.time()))
+        return run_id
+
+    def set_identity(self, run_id, serial=None, model=None, firmware=None):
+        """
+        Fill in the drive identity of a run once it is known; None keeps the stored value.
+        """
+
+        self._put("identity", (serial, model, firmware, run_id))
+
+    def finish_run(self, run_id, verdict, errors):
+        """
+        Record the verdict of a test run.
+
+        Args:
+            run_id (str): Run identifier.
+            verdict (str): 'PASSED' or 'FAILED'.
+            errors (int): Error count of the test.
+        """
+
+        self._put("finish", (time.time(), verdict, errors, run_id))
+
+    def record_command(self, run_id, command, elapsed, success=True):
+        """
+        Record the latency of one command.
+
+        Args:
+            run_id (str): Run identifier.
+            command (str): Command name (see command_name()).
+            elapsed (float): Latency in seconds.
+            success (bool): Whether the command succeeded.
+        """
+
+        self._put("command", (run_id, time.time(), command, elapsed * 1e6, int(success)))
+
+    def record_measurement(self, run_id, name, value, unit=None):
+        """
+        Record a named measurement of a run (e.g. 'read_iops').
+        """
+
+        self._put("measurement", (run_id, time.time(), name, float(value), unit))
+
+    def record_smart(self, run_id, stage, smart):
+        """
+        Record the numeric fields of a parsed SMART log.
+
+        Args:
+            run_id (str): Run identifier.
+            stage (str): When it was taken, e.g. 'Pre-Check'.
+            smart (dict): Parsed SMART log.
+        """
+
+        now = time.time()
+        for field, value in smart.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self._put("smart", (run_id, now, stage, field, float(value)))
+
+    def observer(self, run_id):
+        """
+        Wrapper observer recording the command latencies of a run (see NvmeCommands.add_observer).
+
+        Args:
+            run_id (str): Run identifier.
+
+        Returns:
+            CommandRecorder: The observer.
+        """
+
+        return CommandRecorder(self, run_id)
+
+    def flush(self):
+        """
+        Wait until every queued record has been written.
+        """
+
+        if self._writer is not None:
+            self._queue.join()
+
+    def close(self):
+        """
+        Write the queued records and stop the writer thread.
+        """
+
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join()
+            self._writer = None
+
+    def _filters(self, serial=None, model=None, firmware=None, test=None, since=None, until=None):
+        """
+        Build the WHERE clause selecting runs.
+
+        Returns:
+            tuple(str, list): SQL condition on the runs table (alias r) and its parameters.
+        """
+
+        conditions, params = ["1"], []
+        for column, value in (("serial", serial), ("model", model), ("firmware", firmware), ("test", test)):
+            if value is not None:
+                conditions.append(f"r.{column} = ?")
+                params.append(value)
+        if since is not None:
+            conditions.append("r.started >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("r.started < ?")
+            params.append(until)
+        return " AND ".join(conditions), params
+
+    def runs(self, limit=100, **filters):
+        """
+        Most recent runs matching the filters.
+
+        Args:
+            limit (int): Maximum number of runs.
+            **filters: serial, model, firmware, test, since, until (epoch seconds).
+
+        Returns:
+            list: One dict per run, newest first.
+        """
+
+        where, params = self._filters(**filters)
+        connection = self._connect()
+        connection.row_factory = sqlite3.Row
+        try:
+            rows = connection.execute(f"SELECT * FROM runs r WHERE {where} ORDER BY r.started DESC LIMIT ?",
+                                      params + [limit]).fetchall()
+        finally:
+            connection.close()
+        return [dict(row) for row in rows]
+
+    def latency(self, command, **filters):
+        """
+        Latency statistics of one command over the runs matching the filters.
+
+        Args:
+            command (str): Command name, e.g. 'identify'.
+            **filters: serial, model, firmware, test, since, until (epoch seconds).
+
+        Returns:
+            dict | None: count, mean, p50, p99, max in microseconds; None if nothing matched.
+        """
+
+        where, params = self._filters(**filters)
+        connection = self._connect()
+        try:
+            rows = connection.execute(
+                f"SELECT c.latency_us FROM commands c JOIN runs r ON r.run_id = c.run_id "
+                f"WHERE c.command = ? AND c.success = 1 AND {where} ORDER BY c.latency_us",
+                [command] + params).fetchall()
+        finally:
+            connection.close()
+
+        values = [row[0] for row in rows]
+        if not values:
+            return None
+        return {
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "p50": percentile(values, 50),
+            "p99": percentile(values, 99),
+            "max": values[-1],
+        }
+
+    def smart_history(self, field, **filters):
+        """
+        Values of one SMART field over the runs matching the filters, oldest first.
+
+        Args:
+            field (str): Parsed SMART field, e.g. 'ctemp'.
+            **filters: serial, model, firmware, test, since, until (epoch seconds).
+
+        Returns:
+            list: (timestamp, serial, stage, value) tuples.
+        """
+
+        where, params = self._filters(**filters)
+        connection = self._connect()
+        try:
+            return connection.execute(
+                f"SELECT s.timestamp, r.serial, s.stage, s.value FROM smart s JOIN runs r ON r.run_id = s.run_id "
+                f"WHERE s.field = ? AND {where} ORDER BY s.timestamp", [field] + params).fetchall()
+        finally:
+            connection.close()
+
+
+def _date(text):
+    # Command line dates are ISO 8601 (e.g. 2026-09-01 or 2026-09-01T08:00).
+    return datetime.fromisoformat(text).timestamp()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the test results store")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="Results database")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    runs = subparsers.add_parser("runs", help="List test runs")
+    latency = subparsers.add_parser("latency", help="Command latency statistics")
+    latency.add_argument("name", help="Command name, e.g. identify, get-log-page, 'solidigm id-ctrl'")
+    smart = subparsers.add_parser("smart", help="History of a SMART field")
+    smart.add_argument("field", help="Parsed SMART field, e.g. ctemp")
+    runs.add_argument("--limit", type=int, default=20)
+
+    for sub in (runs, latency, smart):
+        sub.add_argument("--serial")
+        sub.add_argument("--model")
+        sub.add_argument("--firmware")
+        sub.add_argument("--test")
+        sub.add_argument("--since", type=_date, help="ISO date")
+        sub.add_argument("--until", type=_date, help="ISO date")
+
+    args = parser.parse_args()
+    store = ResultsStore(args.db)
+    filters = {key: getattr(args, key) for key in ("serial", "model", "firmware", "test", "since", "until")}
+
+    if args.command == "runs":
+        for run in store.runs(limit=args.limit, **filters):
+            started = datetime.fromtimestamp(run["started"]).strftime('%Y-%m-%d %H:%M:%S')
+            print(f"{started} {run['test']} SN {run['serial']} FW {run['firmware']}: "
+                  f"{run['verdict'] or 'unfinished'} ({run['errors']} errors)")
+    elif args.command == "latency":
+        stats = store.latency(args.name, **filters)
+        if stats is None:
+            print(f"No '{args.name}' commands recorded.")
+        else:
+            print(f"{args.name}: {stats['count']} commands, mean {stats['mean']:.0f} us, "
+                  f"p50 {stats['p50']:.0f} us, p99 {stats['p99']:.0f} us, max {stats['max']:.0f} us")
+    elif args.command == "smart":
+        for timestamp, serial, stage, value in store.smart_history(args.field, **filters):
+            print(f"{datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')} {serial} {stage}: {value:g}")
+
+
+if __name__ == "__main__":
+    main()
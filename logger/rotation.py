@@ -0,0 +1,429 @@
+import fcntl
+import glob
+import gzip
+import io
+import locale
+import logging
+import os
+import queue
+import re
+import shutil
+import sys
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+"""
+Rotation Defaults
+"""
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_RETENTION_BYTES = 2 * 1024 * 1024 * 1024
+DEFAULT_COMPRESSION = "gzip"
+
+"""
+Segment Files
+"""
+# A rotated segment of 'name.log' is 'name.log.0001', compressed to 'name.log.0001.gz' (or '.zst').
+# The log of a closed run is compressed as a whole to 'name.log.gz'.
+COMPRESSED_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+SEGMENT_PATTERN = re.compile(r"\.(\d{4,})(\.gz|\.zst)?$")
+COPY_BUFFER_BYTES = 1024 * 1024
+
+"""
+Run Files
+"""
+# Every file of a run shares its name: 'name.log' and 'name.events.jsonl', their segments and
+# compressed versions. Retention deletes the files of a closed run together.
+RUN_FILE_PATTERN = re.compile(r"^(?P<run>.+?)\.(log|events\.jsonl)(\.\d{4,})?(\.gz|\.zst)?$")
+
+
+def report_background_error(message):
+    """
+    Report a failure of a background logging thread (compression, retention, event writer).
+
+    The logging system is not used: it may be the failing component.
+
+    Args:
+        message (str): Description of the failure.
+    """
+
+    sys.stderr.write(f"[logger] {message}\n")
+    sys.stderr.flush()
+
+
+def mark_active(stream):
+    """
+    Mark an open log file as in use, so retention never deletes the files of its run.
+
+    The shared lock lasts until the stream is closed (or its process exits), and is seen by
+    every process sharing the log directory.
+
+    Args:
+        stream (io.IOBase): Open log or event file.
+
+    Returns:
+        io.IOBase: The same stream.
+    """
+
+    fcntl.flock(stream.fileno(), fcntl.LOCK_SH)
+    return stream
+
+
+def in_use(path):
+    """
+    Whether a log file is held open by a logger (see mark_active()).
+
+    Args:
+        path (str): Active log or event file.
+
+    Returns:
+        bool: True if a logger in any process holds it.
+    """
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return False
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+
+
+def segment_paths(path):
+    """
+    Closed segments of a log file, oldest first.
+
+    Args:
+        path (str): Path of the active log file.
+
+    Returns:
+        list: Segment paths, compressed or not.
+    """
+
+    segments = []
+    for candidate in glob.glob(f"{glob.escape(path)}.*"):
+        match = SEGMENT_PATTERN.search(candidate[len(path):])
+        if match and candidate[len(path):] == match.group(0):
+            segments.append((int(match.group(1)), candidate))
+    return [candidate for _, candidate in sorted(segments)]
+
+
+def open_log(path, binary=False):
+    """
+    Open a log file or segment for reading, decompressing it when needed.
+
+    Args:
+        path (str): Plain, '.gz' or '.zst' file.
+        binary (bool): Return a binary stream (seekable, offsets refer to the decompressed data).
+
+    Returns:
+        io.IOBase: Text stream, or binary stream if requested.
+    """
+
+    if path.endswith(".gz"):
+        return gzip.open(path, 'rb') if binary else gzip.open(path, 'rt', errors='replace')
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {path}")
+        stream = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True))
+        return stream if binary else io.TextIOWrapper(stream, errors='replace')
+    return open(path, 'rb') if binary else open(path, 'r', errors='replace')
+
+
+def iter_log_lines(path):
+    """
+    Iterate the lines of a log across its rotated segments, oldest first.
+
+    Args:
+        path (str): Path of the active log file (it may no longer exist).
+
+    Yields:
+        str: Log lines, newline included.
+    """
+
+    if not os.path.exists(path):
+        # The log of a closed run may have been compressed as a whole.
+        for suffix in COMPRESSED_SUFFIXES.values():
+            if os.path.exists(path + suffix):
+                path += suffix
+                break
+    for segment in segment_paths(path) + ([path] if os.path.exists(path) else []):
+        try:
+            with open_log(segment) as log_file:
+                yield from log_file
+        except FileNotFoundError:
+            # Compressed or deleted by retention between listing and opening: read the replacement.
+            for suffix in COMPRESSED_SUFFIXES.values():
+                if os.path.exists(segment + suffix):
+                    with open_log(segment + suffix) as log_file:
+                        yield from log_file
+                    break
+
+
+def compress_file(path, compression=DEFAULT_COMPRESSION):
+    """
+    Compress a closed segment (or the log of a closed run) next to itself and remove the original.
+
+    Args:
+        path (str): Segment or log to compress.
+        compression (str): 'gzip' or 'zstd'.
+
+    Returns:
+        str: Path of the compressed segment.
+    """
+
+    target = path + COMPRESSED_SUFFIXES[compression]
+    tmp_path = f"{target}.tmp"
+    with open(path, 'rb') as source, open(tmp_path, 'wb') as raw:
+        if compression == "zstd":
+            with zstandard.ZstdCompressor().stream_writer(raw, closefd=False) as compressed:
+                shutil.copyfileobj(source, compressed, COPY_BUFFER_BYTES)
+        else:
+            with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6) as compressed:
+                shutil.copyfileobj(source, compressed, COPY_BUFFER_BYTES)
+
+    # Publish the compressed segment before removing the plain one so readers always find one.
+    os.replace(tmp_path, target)
+    os.remove(path)
+    return target
+
+
+def enforce_retention(log_dir, budget_bytes, keep=()):
+    """
+    Delete the oldest closed runs until the run files fit in the retention budget.
+
+    A run is deleted as a whole: its log, event stream, their segments and compressed
+    versions. Runs whose log or event file is held by a logger (see mark_active()), or that
+    own a path in `keep`, are active and never deleted. Other files of the directory
+    (databases, telemetry captures) are not budgeted, since retention never deletes them.
+
+    Args:
+        log_dir (str): Log directory.
+        budget_bytes (int): Maximum total size of the run files.
+        keep (iterable): Paths whose runs must not be deleted.
+
+    Returns:
+        int: Number of runs deleted.
+    """
+
+    kept = {match.group("run") for match in (RUN_FILE_PATTERN.match(os.path.basename(path)) for path in keep) if match}
+    total = 0
+    runs = {}
+    for entry in os.scandir(log_dir):
+        if not entry.is_file():
+            continue
+        match = RUN_FILE_PATTERN.match(entry.name)
+        if not match:
+            continue
+        stat = entry.stat()
+        total += stat.st_size
+        run = runs.setdefault(match.group("run"), {"files": [], "mtime": 0})
+        run["files"].append((entry.path, stat.st_size))
+        run["mtime"] = max(run["mtime"], stat.st_mtime)
+
+    if total <= budget_bytes:
+        return 0
+
+    deleted = 0
+    for name, run in sorted(runs.items(), key=lambda item: item[1]["mtime"]):
+        if total <= budget_bytes:
+            break
+        base = os.path.join(log_dir, name)
+        if name in kept or in_use(f"{base}.log") or in_use(f"{base}.events.jsonl"):
+            continue
+        for path, size in run["files"]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+        deleted += 1
+    return deleted
+
+
+class _Compressor:
+    """
+    Single background thread compressing closed segments and applying retention budgets.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, path, compression, log_dir, budget_bytes, keep):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="log-compressor", daemon=True)
+                self._thread.start()
+        self._queue.put((path, compression, log_dir, budget_bytes, keep))
+
+    def _run(self):
+        while True:
+            path, compression, log_dir, budget_bytes, keep = self._queue.get()
+            try:
+                if path and compression:
+                    compress_file(path, compression)
+            except FileNotFoundError:
+                # Deleted by the retention of another process.
+                pass
+            except Exception as ex:
+                report_background_error(f"Log compression of {path} failed: {ex}")
+            try:
+                if budget_bytes is not None:
+                    enforce_retention(log_dir, budget_bytes, keep)
+            except Exception as ex:
+                report_background_error(f"Log retention of {log_dir} failed: {ex}")
+            finally:
+                self._queue.task_done()
+
+    def wait(self):
+        self._queue.join()
+
+
+_compressor = _Compressor()
+
+
+def queue_compression(path, compression, log_dir, budget_bytes=None, keep=()):
+    """
+    Queue a closed segment or run log for background compression and apply the retention budget.
+
+    Args:
+        path (str|None): Closed segment or run log, None to only apply the budget.
+        compression (str|None): 'gzip', 'zstd' or None to only apply the budget.
+        log_dir (str): Directory the retention budget applies to.
+        budget_bytes (int|None): Size budget of the run logs of the directory, None for no limit.
+        keep (iterable): Paths whose runs must not be deleted.
+    """
+
+    _compressor.submit(path, compression, log_dir, budget_bytes, keep)
+
+
+def queue_retention(log_dir, budget_bytes, keep=()):
+    """
+    Queue a retention check of a log directory (e.g. when a logger starts).
+
+    Args:
+        log_dir (str): Log directory.
+        budget_bytes (int|None): Size budget of the run logs of the directory, None for no limit.
+        keep (iterable): Paths whose runs must not be deleted.
+    """
+
+    if budget_bytes is not None:
+        _compressor.submit(None, None, log_dir, budget_bytes, keep)
+
+
+def wait_for_compression():
+    """
+    Block until every queued segment has been compressed.
+    """
+
+    _compressor.wait()
+
+
+class RotatingCompressedFileHandler(logging.FileHandler):
+    """
+    File handler that rotates by size and age and compresses closed segments in the background.
+
+    The logging thread only renames the full file and opens a new one; compression and the
+    retention budget of the log directory are handled by a shared background thread.
+
+    Attributes:
+        max_bytes (int): Rotate once the active file reaches this size (0 disables).
+        max_age (float|None): Rotate once the active file is this many seconds old.
+        compression (str|None): 'gzip', 'zstd' or None to keep segments uncompressed.
+        retention_bytes (int|None): Size budget of the run logs of the log directory.
+    """
+
+    def __init__(self, filename, max_bytes=DEFAULT_MAX_BYTES, max_age=None, compression=DEFAULT_COMPRESSION,
+                 retention_bytes=DEFAULT_RETENTION_BYTES, encoding=None):
+        """
+        Initializes the RotatingCompressedFileHandler.
+
+        Args:
+            filename (str): Active log file path.
+            max_bytes (int): Rotate once the active file reaches this size (0 disables).
+            max_age (float|None): Rotate once the active file is this many seconds old.
+            compression (str|None): 'gzip', 'zstd' or None.
+            retention_bytes (int|None): Size budget of the run logs of the log directory, None for no limit.
+            encoding (str|None): File encoding.
+        """
+
+        if compression == "zstd" and zstandard is None:
+            compression = "gzip"
+        super().__init__(filename, mode='a', encoding=encoding)
+        # Encoding used to count the bytes of a message ('locale' is not a codec name).
+        self.byte_encoding = self.encoding or 'utf-8'
+        if self.byte_encoding == "locale":
+            self.byte_encoding = locale.getpreferredencoding(False)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.compression = compression
+        self.retention_bytes = retention_bytes
+        self.opened = time.time()
+        self.size = os.path.getsize(self.baseFilename)
+        segments = segment_paths(self.baseFilename)
+        self.sequence = int(SEGMENT_PATTERN.search(segments[-1]).group(1)) if segments else 0
+
+    def _open(self):
+        # Hold the active file so the retention of any process keeps this run.
+        return mark_active(super()._open())
+
+    def should_rollover(self, message_bytes):
+        """
+        Whether the active file must be rotated before writing a message.
+
+        Args:
+            message_bytes (int): Size of the message about to be written.
+
+        Returns:
+            bool: True if the size or age limit is reached.
+        """
+
+        if self.size == 0:
+            return False
+        if self.max_bytes and self.size + message_bytes > self.max_bytes:
+            return True
+        return bool(self.max_age) and time.time() - self.opened >= self.max_age
+
+    def rollover(self):
+        """
+        Close the active file, rename it to the next segment and queue it for compression.
+        """
+
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        self.sequence += 1
+        segment = f"{self.baseFilename}.{self.sequence:04d}"
+        os.replace(self.baseFilename, segment)
+        self.stream = self._open()
+        self.opened = time.time()
+        self.size = 0
+
+        queue_compression(segment, self.compression, os.path.dirname(self.baseFilename),
+                          self.retention_bytes, (self.baseFilename,))
+
+    def emit(self, record):
+        try:
+            message = self.format(record) + self.terminator
+            message_bytes = len(message.encode(self.byte_encoding, errors='replace'))
+            with self.lock:
+                if self.should_rollover(message_bytes):
+                    self.rollover()
+                if self.stream is None:
+                    self.stream = self._open()
+                self.stream.write(message)
+                self.stream.flush()
+                self.size += message_bytes
+        except Exception:
+            self.handleError(record)
@@ -1,4 +1,5 @@
 import argparse
+import sys
 from test_manager.test_manager import TestManager
 
 def main():
@@ -14,17 +15,42 @@ def main():
         help="Testname"
     )
 
+    parser.add_argument(
+        "--device",
+        type=str,
+        default=None,
+        help="Device path to use instead of discovering it by serial number (e.g. a file or loop-device stand-in)"
+    )
+
+    parser.add_argument(
+        "--daemon",
+        nargs="?",
+        const=True,
+        default=None,
+        help="Run the test through the runner daemon listening on this socket, or on its default one "
+             "(start it with: python -m test_manager.daemon serve)"
+    )
+
     args = parser.parse_args()
 
-    my_test = TestManager(args.serial_number, args.testname)
+    #The daemon keeps the infrastructure warm; only the test runs per job
+    if args.daemon:
+        #Imported only here so direct runs do not load the daemon
+        from test_manager.daemon import DEFAULT_SOCKET_PATH, run_test
+        socket_path = DEFAULT_SOCKET_PATH if args.daemon is True else args.daemon
+        result = run_test(args.serial_number, args.testname, args.device, socket_path)
+        if result and result.get("error"):
+            print(f"ERROR {result['error']}")
+        sys.exit(0 if result and result.get("verdict") == "PASSED" else 1)
+
+    my_test = TestManager(args.serial_number, args.testname, device_path=args.device)
 
     try:
-        my_test.drive_check(discovery=True)
-        if my_test.run():
-            my_test.set_final_result()
-        my_test.drive_check(discovery=False)
+        my_test.execute()
     except Exception as e:
         print(f"ERROR {e}")
+    finally:
+        my_test.close()
 
 if __name__ == "__main__":
     main()
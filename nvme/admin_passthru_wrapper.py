@@ -1,6 +1,6 @@
 import re
 import subprocess
-import json
+import time
 
 from logger.log_manager import LogManager
 
@@ -9,6 +9,19 @@ Data Sizes
 """
 SMARTLOGPAGE_SIZE_BYTES = 512
 IDENTIFY_DATA_SIZE_BYTES = 4096
+SELFTESTLOG_SIZE_BYTES = 564
+SELFTEST_RESULT_SIZE_BYTES = 28
+SELFTEST_RESULT_COUNT = 20
+FWSLOTLOG_SIZE_BYTES = 512
+FW_SLOT_COUNT = 7
+
+"""
+Transfer Sizes
+"""
+# Memory page size assumed for MDTS (CAP.MPSMIN = 0).
+MEMORY_PAGE_SIZE_BYTES = 4096
+# Upper bound of a single Get Log Page transfer, also used when MDTS reports no limit.
+LOG_PAGE_MAX_CHUNK_BYTES = 1024 * 1024
 
 """
 Broadcast Namespace ID
@@ -22,17 +35,149 @@ ADMIN_CMD_OPCODE_GETLOGPAGE = 0x02
 ADMIN_CMD_OPCODE_IDENTIFY = 0x06
 ADMIN_CMD_OPCODE_SETFEATURES = 0x09
 ADMIN_CMD_OPCODE_GETFEATURES = 0x0A
+ADMIN_CMD_OPCODE_FW_COMMIT = 0x10
+ADMIN_CMD_OPCODE_FW_DOWNLOAD = 0x11
+ADMIN_CMD_OPCODE_DEVICE_SELF_TEST = 0x14
 
 """
 Get Log Page - Log Page Identifiers
 """
 LOG_PAGE_ID_SMART = 0x02
+LOG_PAGE_ID_FW_SLOT = 0x03
+LOG_PAGE_ID_SELF_TEST = 0x06
+
+"""
+Firmware Commit - Commit Actions (CA)
+"""
+FW_COMMIT_REPLACE = 0x0
+FW_COMMIT_REPLACE_AND_ACTIVATE_ON_RESET = 0x1
+FW_COMMIT_ACTIVATE_ON_RESET = 0x2
+FW_COMMIT_REPLACE_AND_ACTIVATE_NOW = 0x3
+
+"""
+Firmware Commit - Statuses of a successful commit whose activation needs a reset
+"""
+FW_COMMIT_STATUS_CONVENTIONAL_RESET = 0x10B
+FW_COMMIT_STATUS_SUBSYSTEM_RESET = 0x110
+FW_COMMIT_STATUS_CONTROLLER_RESET = 0x111
+FW_COMMIT_RESETS = {
+    FW_COMMIT_STATUS_CONVENTIONAL_RESET: "conventional",
+    FW_COMMIT_STATUS_SUBSYSTEM_RESET: "subsystem",
+    FW_COMMIT_STATUS_CONTROLLER_RESET: "controller",
+}
+
+"""
+Device Self-test - Self-test Codes (STC)
+"""
+SELF_TEST_CODE_SHORT = 0x1
+SELF_TEST_CODE_EXTENDED = 0x2
+SELF_TEST_CODE_ABORT = 0xF
+
+"""
+Device Self-test - Result values of a Self-test Result entry
+"""
+SELF_TEST_RESULT_NO_ERROR = 0x0
+SELF_TEST_RESULT_UNUSED = 0xF
 
 """
 Identify - Controller or Namespace Structures
 """
 IDENTIFY_STRUCTURE_NAMESPACE = 0x00
 IDENTIFY_STRUCTURE_CONTROLLER = 0x01
+IDENTIFY_STRUCTURE_ACTIVE_NSID_LIST = 0x02
+
+"""
+Get Features - Select (SEL) values
+"""
+FEATURE_SEL_CURRENT = 0
+FEATURE_SEL_DEFAULT = 1
+FEATURE_SEL_SAVED = 2
+FEATURE_SEL_SUPPORTED = 3
+
+"""
+Feature Identifiers
+"""
+FEATURE_ID_ARBITRATION = 0x01
+FEATURE_ID_POWER_MANAGEMENT = 0x02
+FEATURE_ID_TEMPERATURE_THRESHOLD = 0x04
+FEATURE_ID_ERROR_RECOVERY = 0x05
+FEATURE_ID_VOLATILE_WRITE_CACHE = 0x06
+FEATURE_ID_NUMBER_OF_QUEUES = 0x07
+FEATURE_ID_INTERRUPT_COALESCING = 0x08
+FEATURE_ID_WRITE_ATOMICITY = 0x0A
+FEATURE_ID_ASYNC_EVENT_CONFIG = 0x0B
+FEATURE_ID_HOST_THERMAL_MGMT = 0x10
+FEATURE_ID_NON_OP_POWER_STATE = 0x11
+
+"""
+Feature Parsers: FID -> (name, function decoding the Get Features DWORD0 into a dict)
+"""
+FEATURE_PARSERS = {
+    FEATURE_ID_ARBITRATION: ("arbitration", lambda dw0: {
+        "ab": dw0 & 0x7,                    # Arbitration Burst
+        "lpw": (dw0 >> 8) & 0xFF,           # Low Priority Weight
+        "mpw": (dw0 >> 16) & 0xFF,          # Medium Priority Weight
+        "hpw": (dw0 >> 24) & 0xFF,          # High Priority Weight
+    }),
+    FEATURE_ID_POWER_MANAGEMENT: ("power_management", lambda dw0: {
+        "ps": dw0 & 0x1F,                   # Power State
+        "wh": (dw0 >> 5) & 0x7,             # Workload Hint
+    }),
+    FEATURE_ID_TEMPERATURE_THRESHOLD: ("temperature_threshold", lambda dw0: {
+        "tmpth": dw0 & 0xFFFF,              # Temperature Threshold
+        "tmpsel": (dw0 >> 16) & 0xF,        # Threshold Temperature Select
+        "thsel": (dw0 >> 20) & 0x3,         # Threshold Type Select
+        "tmpthh": (dw0 >> 22) & 0x7,        # Temperature Threshold Hysteresis
+    }),
+    FEATURE_ID_ERROR_RECOVERY: ("error_recovery", lambda dw0: {
+        "tler": dw0 & 0xFFFF,               # Time Limited Error Recovery
+        "dulbe": (dw0 >> 16) & 0x1,         # Deallocated or Unwritten Logical Block Error Enable
+    }),
+    FEATURE_ID_VOLATILE_WRITE_CACHE: ("volatile_write_cache", lambda dw0: {
+        "wce": dw0 & 0x1,                   # Volatile Write Cache Enable
+    }),
+    FEATURE_ID_NUMBER_OF_QUEUES: ("number_of_queues", lambda dw0: {
+        "nsqa": dw0 & 0xFFFF,               # Number of I/O Submission Queues Allocated
+        "ncqa": (dw0 >> 16) & 0xFFFF,       # Number of I/O Completion Queues Allocated
+    }),
+    FEATURE_ID_INTERRUPT_COALESCING: ("interrupt_coalescing", lambda dw0: {
+        "thr": dw0 & 0xFF,                  # Aggregation Threshold
+        "time": (dw0 >> 8) & 0xFF,          # Aggregation Time
+    }),
+    FEATURE_ID_WRITE_ATOMICITY: ("write_atomicity_normal", lambda dw0: {
+        "dn": dw0 & 0x1,                    # Disable Normal
+    }),
+    FEATURE_ID_ASYNC_EVENT_CONFIG: ("async_event_config", lambda dw0: {
+        "smart": dw0 & 0xFF,                # SMART / Health Critical Warnings
+        "nan": (dw0 >> 8) & 0x1,            # Namespace Attribute Notices
+        "fan": (dw0 >> 9) & 0x1,            # Firmware Activation Notices
+        "tln": (dw0 >> 10) & 0x1,           # Telemetry Log Notices
+        "anacn": (dw0 >> 11) & 0x1,         # ANA Change Notices
+        "plealcn": (dw0 >> 12) & 0x1,       # Predictable Latency Event Aggregate Log Change Notices
+        "lsian": (dw0 >> 13) & 0x1,         # LBA Status Information Notices
+        "egealcn": (dw0 >> 14) & 0x1,       # Endurance Group Event Aggregate Log Change Notices
+    }),
+    FEATURE_ID_HOST_THERMAL_MGMT: ("host_thermal_management", lambda dw0: {
+        "tmt2": dw0 & 0xFFFF,               # Thermal Management Temperature 2
+        "tmt1": (dw0 >> 16) & 0xFFFF,       # Thermal Management Temperature 1
+    }),
+    FEATURE_ID_NON_OP_POWER_STATE: ("non_operational_power_state", lambda dw0: {
+        "noppme": dw0 & 0x1,                # Non-Operational Power State Permissive Mode Enable
+    }),
+}
+
+
+def register_feature_parser(fid, name, parser):
+    """
+    Register (or replace) the decoder of a Feature Identifier.
+
+    Args:
+        fid (int): Feature Identifier.
+        name (str): Short feature name used in snapshots and diffs.
+        parser (callable): Function decoding the Get Features DWORD0 into a dict.
+    """
+
+    FEATURE_PARSERS[fid] = (name, parser)
 
 class AdminCommands:
 
@@ -47,16 +192,47 @@ class AdminCommands:
 
         self.logger = logger
         self.device = device
+        # Objects notified of every executed command, see add_observer().
+        self.observers = []
+        self._max_transfer_size = None
 
-    def _execute_cmd(self, cmd: list):
+    def add_observer(self, observer):
+        """
+        Registers an observer notified after every executed command.
+
+        Args:
+            observer (object): Object with an on_command(cmd, elapsed, success) method.
+        """
+
+        self.observers.append(observer)
+
+    def _notify_observers(self, cmd, elapsed, success):
+        """
+        Reports an executed command to the observers; observer failures are only logged.
+
+        Args:
+            cmd (list): The executed command.
+            elapsed (float): Command latency in seconds.
+            success (bool): Whether the command succeeded.
+        """
+
+        for observer in self.observers:
+            try:
+                observer.on_command(cmd, elapsed, success)
+            except Exception as ex:
+                self.logger.error(f"Exception in command observer: {ex}")
+
+    def _execute_cmd(self, cmd: list, accept_status=(), binary=False):
         """
         Executes an NVMe CLI command and handles logging and errors.
 
         Args:
             cmd (list): The full command to execute as a list of strings.
+            accept_status (iterable): NVMe statuses (SCT and SC) that complete the command successfully.
+            binary (bool): Return stdout as bytes (e.g. data dumped with --raw-binary); stderr stays text.
 
         Returns:
-            tuple(str|None, str|None): stdout and stderr if successful; None, None if error.
+            tuple(str|bytes|None, str|None): stdout and stderr if successful; None, None if error.
         """
 
         # Convert the command list into string for logging.
@@ -65,19 +241,29 @@ class AdminCommands:
         # Log the command to be executed.
         self.logger.info(f"Executing: {cmd_str}")
 
+        start = time.perf_counter()
+        success = False
+
         try:
             # Execute the command capturing stdout and stderr. Enable exception raise if command fails. 
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            result = subprocess.run(cmd, capture_output=True, text=not binary, check=True)
 
             # Return both stdout and stderr if the command succeed.
-            return result.stdout, result.stderr
+            success = True
+            return result.stdout, self._stderr_text(result.stderr)
         
         except subprocess.CalledProcessError as error:
+            stderr = self._stderr_text(error.stderr)
+            if self._parse_nvme_status(stderr) in accept_status:
+                self.logger.info(f"Command completed with status: {stderr.strip()}")
+                success = True
+                return error.stdout, stderr
+
             # Log the command that failed.
             self.logger.error(f"Command failed: {cmd_str}")
 
             # Log the stderr output.
-            self.logger.error(f"stderr: {error.stderr}")
+            self.logger.error(f"stderr: {stderr}")
 
             return None, None
         
@@ -86,7 +272,43 @@ class AdminCommands:
             self.logger.error(f"Unexpected error executing command: {ex}")
 
             return None, None
-        
+        finally:
+            # Report the command latency to the observers.
+            self._notify_observers(cmd, time.perf_counter() - start, success)
+
+    def _stderr_text(self, stderr):
+        """
+        Standard error output as text, also for commands run with a binary stdout.
+
+        Args:
+            stderr (str|bytes|None): Captured standard error.
+
+        Returns:
+            str | None: Decoded standard error.
+        """
+
+        if isinstance(stderr, bytes):
+            return stderr.decode(errors="replace")
+        return stderr
+
+    def _parse_nvme_status(self, stderr):
+        """
+        Parse the NVMe status printed by nvme-cli for a command that completed with an error.
+
+        Args:
+            stderr (str|None): Standard error output, e.g. 'NVMe status: ...(0x10b)'.
+
+        Returns:
+            int | None: Status Code Type and Status Code (bits 10:0), or None if not found.
+        """
+
+        match = re.search(r"NVMe status:.*\((0x[0-9a-fA-F]+)\)", stderr or "")
+        if not match:
+            return None
+
+        # Drop the More and Do Not Retry bits.
+        return int(match.group(1), 16) & 0x7FF
+
     def _parse_cqe_result(self, stderr: str):
         """
         Parse the completion queue entry DWORD0 result from stderr text.
@@ -115,7 +337,7 @@ class AdminCommands:
         return None
 
     def admin_passthru(self, opcode, nsid=1, data_len=None, read=True, cdw10=None, cdw11=None, cdw12=None, 
-                       cdw13=None, cdw14=None, cdw15=None, raw=False):
+                       cdw13=None, cdw14=None, cdw15=None, raw=False, input_file=None, accept_status=()):
         """
         Send an NVMe admin command via passthrough interface.
 
@@ -125,10 +347,12 @@ class AdminCommands:
             data_len (int): Length of data buffer.
             read (bool): Whether this is a read operation.
             cdw10..cdw15 (int|None): Optional command DWORD values.
-            raw (bool): Whether to return raw output or parsed.
+            raw (bool): Return the data read as bytes (nvme-cli --raw-binary) instead of a hex dump.
+            input_file (str|None): File holding the data sent by a write operation.
+            accept_status (iterable): NVMe statuses that complete the command successfully.
 
         Returns:
-            tuple(str|None, str|None): stdout and stderr or None,None on failure.
+            tuple(str|bytes|None, str|None): stdout and stderr or None,None on failure.
         """
 
         # Mandatory command structure: nvme admin-passthru {device_path}.
@@ -149,54 +373,143 @@ class AdminCommands:
         if data_len:
             cmd.append(f"--data-len={data_len}")
 
+        # Add the Input File with the data to transfer to the command.
+        if input_file:
+            cmd.append(f"--input-file={input_file}")
+
         # Add the Dataflow Direction to Receive option to the command.
         if read:
             cmd.append("--read")
         else:
             cmd.append("--write")
 
+        # Dump the data read as binary instead of a hex dump.
+        if raw:
+            cmd.append("--raw-binary")
+
         # Execute the command
-        cmd_stdout, cmd_stderr = self._execute_cmd(cmd)
+        cmd_stdout, cmd_stderr = self._execute_cmd(cmd, accept_status, binary=raw)
 
         return cmd_stdout, cmd_stderr
     
-    def _get_log_page(self, log_page_id, nsid=1, log_len=512):
+    def _hex_dump_to_bytes(self, output):
         """
-        Get an NVMe log page via the admin passthru interface.
+        Convert the hex dump printed by nvme admin-passthru into bytes.
 
         Args:
-            log_page_id (int): Log Page Identifier.
-            nsid (int): Namespace ID.
-            log_len (int): Number of bytes to read.
+            output (str): Standard output of the admin-passthru command.
 
         Returns:
-            str: Log page output.
+            bytes: Data contained in the dump (empty if no dump was found).
         """
 
-        try:
-            # Number of Dwords Lower (NUMDL) field is in unit of DWords (4 bytes) zeroes-based.
-            numdl = (log_len // 4) - 1
+        # Dump lines look like '0010: 01 02 ... 0f "ascii"'; the last line may be partial.
+        rows = re.findall(r'^\s*[0-9a-fA-F]+:((?: [0-9a-fA-F]{2})+)', output, re.MULTILINE)
+        if not rows:
+            # Fall back to bare rows of 16 bytes.
+            rows = re.findall(r'\b(?:[0-9a-f]{2} ){15}[0-9a-f]{2}', output, re.IGNORECASE)
 
-            # Set the Log Page Identifier (LID) and Number of Dwords Lower (NUMDL) fields in the Dword 10.
-            dword10 = (numdl << 16) | log_page_id
+        return bytes.fromhex(''.join(''.join(row.split()) for row in rows))
 
-            stdout, _ =  self.admin_passthru(
-                opcode=ADMIN_CMD_OPCODE_GETLOGPAGE,
-                nsid=nsid,
-                data_len=log_len,
-                read=True,
-                cdw10=dword10
-            )
+    def max_transfer_size(self):
+        """
+        Maximum Data Transfer Size of the controller in bytes, from Identify Controller MDTS.
 
-            if stdout is None:
-                self.logger.error("Failed to get log page output.")
+        Returns:
+            int: Transfer size in bytes, capped to LOG_PAGE_MAX_CHUNK_BYTES.
+        """
+
+        if self._max_transfer_size is None:
+            ctrl = self.id_ctrl()
+            mdts = ctrl.get("mdts", 0) if ctrl else 0
+
+            # MDTS is a power of two in units of the minimum memory page size; 0 means no limit.
+            size = MEMORY_PAGE_SIZE_BYTES * (2 ** mdts) if mdts else LOG_PAGE_MAX_CHUNK_BYTES
+            self._max_transfer_size = min(size, LOG_PAGE_MAX_CHUNK_BYTES)
+
+        return self._max_transfer_size
+
+    def get_log_page(self, log_page_id, nsid=NSID_BROADCAST, log_len=512, offset=0, lsp=0, rae=False,
+                     out=None, chunk_size=None):
+        """
+        Read any log page, in MDTS-sized pieces, streaming every piece to the output.
+
+        Args:
+            log_page_id (int): Log Page Identifier (LID).
+            nsid (int): Namespace ID.
+            log_len (int): Number of bytes to read, a multiple of 4.
+            offset (int): Byte offset within the log page to start from, a multiple of 4.
+            lsp (int): Log Specific Field (CDW10 bits 11:8).
+            rae (bool): Retain Asynchronous Event; pieces before the last one always retain it.
+            out (file|bytearray|memoryview|None): Writable binary file or buffer receiving the data.
+            chunk_size (int|None): Bytes per command. Defaults to the controller MDTS.
+
+        Returns:
+            bytes | int | None: The data if `out` is None, else the number of bytes written;
+                                None on failure.
+        """
+
+        if log_len % 4 or offset % 4:
+            self.logger.error("Log page length and offset must be multiples of 4 bytes.")
+            return None
+
+        try:
+            # Log pages that fit in a minimum page never need the MDTS lookup.
+            if chunk_size is None:
+                chunk_size = log_len if log_len <= MEMORY_PAGE_SIZE_BYTES else self.max_transfer_size()
+
+            data = bytearray() if out is None else None
+            done = 0
+            while done < log_len:
+                length = min(chunk_size, log_len - done)
+                position = offset + done
+                last = done + length >= log_len
+
+                # Number of Dwords (NUMD) is zero-based, split into NUMDL (CDW10) and NUMDU (CDW11).
+                numd = (length // 4) - 1
+
+                # CDW10: LID bits 7:0, LSP bits 11:8, RAE bit 15, NUMDL bits 31:16.
+                dword10 = (log_page_id & 0xFF) | ((lsp & 0xF) << 8) | ((numd & 0xFFFF) << 16)
+                if rae or not last:
+                    dword10 |= (1 << 15)
+
+                stdout, _ = self.admin_passthru(
+                    opcode=ADMIN_CMD_OPCODE_GETLOGPAGE,
+                    nsid=nsid,
+                    data_len=length,
+                    read=True,
+                    cdw10=dword10,
+                    cdw11=(numd >> 16) & 0xFFFF,
+                    cdw12=position & 0xFFFFFFFF,
+                    cdw13=(position >> 32) & 0xFFFFFFFF,
+                    raw=True
+                )
+
+                if stdout is None:
+                    self.logger.error(f"Failed to get log page {log_page_id:#x} at offset {position}.")
+                    return None
+
+                chunk = stdout
+                if len(chunk) != length:
+                    self.logger.error(f"Log page {log_page_id:#x}: expected {length} bytes, got {len(chunk)}.")
+                    return None
+
+                # Stream the piece to the caller's output as soon as it arrives.
+                if data is not None:
+                    data += chunk
+                elif hasattr(out, "write"):
+                    out.write(chunk)
+                else:
+                    out[done:done + length] = chunk
+
+                done += length
+
+            return bytes(data) if data is not None else done
 
-            return stdout
-        
         except Exception as ex:
-            self.logger.error(f"Exception in _get_log_page: {ex}")
+            self.logger.error(f"Exception in get_log_page: {ex}")
             return None
-    
+
     def smart_log(self):
         """
         Retrieve and parse the SMART/Health Information Log Page.
@@ -216,12 +529,12 @@ class AdminCommands:
             log_len = SMARTLOGPAGE_SIZE_BYTES
             
             # Send Get Log Page command to retrieve SMART/Health log page.
-            log_page_output = self._get_log_page(log_page_id=page_id_smart, nsid=nsid, log_len=log_len)
-            if not log_page_output:
+            log_page_data = self.get_log_page(log_page_id=page_id_smart, nsid=nsid, log_len=log_len)
+            if not log_page_data:
                 self.logger.error("No SMART log page output received.")
                 return None
 
-            return self._parse_smart_log(log_page_output)
+            return self._parse_smart_log(log_page_data)
         
         except Exception as ex:
             self.logger.error(f"Exception in smart_log: {ex}")
@@ -232,7 +545,7 @@ class AdminCommands:
         Parse raw bytes output of SMART log page into a structured JSON.
 
         Args:
-            raw_bytes (str): Raw hex string output from the admin-passthru command.
+            raw_bytes (bytes|str): Log page data, or the hex dump output of the admin-passthru command.
 
         Returns:
             str: JSON string of parsed SMART log.
@@ -243,14 +556,11 @@ class AdminCommands:
 
         try:
             # Extract the hex dump from nvme CLI output.
-            hex_lines = re.findall(r'\b(?:[0-9a-f]{2} ){15}[0-9a-f]{2}', raw_bytes, re.IGNORECASE)
+            info = self._hex_dump_to_bytes(raw_bytes) if isinstance(raw_bytes, str) else raw_bytes
 
-            if not hex_lines:
+            if not info:
                 self.logger.warning("No hex lines found in SMART log output.")
                 return None
-            
-            hex_str = ''.join(''.join(line.split()) for line in hex_lines)
-            info = bytes.fromhex(hex_str)
 
             smart_log_dict =  {
                 "cw": info[0],                                    # Critical Warning
@@ -309,6 +619,47 @@ class AdminCommands:
             self.logger.error(f"Exception in _identify: {ex}")
             return None
     
+    def identify_data(self, nsid, cns):
+        """
+        Raw Identify data structure.
+
+        Args:
+            nsid (int): Namespace ID to identify.
+            cns (int): Controller or Namespace Structure type.
+
+        Returns:
+            bytes or None: The 4096-byte data structure, or None on failure.
+        """
+
+        raw_output = self._identify(nsid=nsid, cns=cns)
+        if not raw_output:
+            return None
+
+        data = self._hex_dump_to_bytes(raw_output)
+        return data if len(data) == IDENTIFY_DATA_SIZE_BYTES else None
+
+    def active_namespaces(self):
+        """
+        Active Namespace ID list (Identify CNS 0x02, as reported by nvme list-ns).
+
+        Returns:
+            list or None: Active namespace IDs in increasing order, or None on failure.
+        """
+
+        data = self.identify_data(nsid=0, cns=IDENTIFY_STRUCTURE_ACTIVE_NSID_LIST)
+        if data is None:
+            self.logger.error("Failed to read the active namespace list.")
+            return None
+
+        # The list holds up to 1024 NSIDs and ends at the first zero entry.
+        nsids = []
+        for i in range(0, IDENTIFY_DATA_SIZE_BYTES, 4):
+            nsid = int.from_bytes(data[i:i + 4], 'little')
+            if nsid == 0:
+                break
+            nsids.append(nsid)
+        return nsids
+
     def id_ns(self, nsid=1):
         """
         Identify Namespace data structure for given Namespace ID.
@@ -466,6 +817,12 @@ class AdminCommands:
                 "mn": info[24:64].decode('ascii', errors='ignore').strip(),# Model Number
                 "fr": info[64:72].decode('ascii', errors='ignore').strip(),# Firmware Revision
                 "rab": info[72],                                           # Recommended Arbitration Burst
+                "mdts": info[77],                                          # Maximum Data Transfer Size
+                "elpe": info[262],                                         # Error Log Page Entries
+                "oacs": int.from_bytes(info[256:258], 'little'),           # Optional Admin Command Support
+                "frmw": info[260],                                         # Firmware Updates
+                "fwug": info[319],                                         # Firmware Update Granularity (4 KiB units)
+                "edstt": int.from_bytes(info[316:318], 'little'),          # Extended Device Self-test Time (minutes)
             }
 
             return id_ctrl_dict
@@ -507,6 +864,41 @@ class AdminCommands:
             self.logger.error(f"Exception in set_feature: {ex}")
             return None
 
+    def get_feature_dword0(self, fid, nsid=0, sel=0, cdw11=None):
+        """
+        Get the raw completion DWORD0 of a Get Features command.
+
+        Args:
+            fid (int): Feature Identifier (FID).
+            nsid (int): Namespace ID. Set to 0 for controller-wide features.
+            sel (int): Select which value to retrieve (CDW10 bits 8-9).
+            cdw11 (int|None): Feature specific CDW11 value.
+
+        Returns:
+            int or None: DWORD0 value, or None on failure.
+        """
+
+        try:
+            # CDW10: Bits 0–7 = FID, Bits 8–9 = SEL
+            cdw10 = (fid & 0xFF) | ((sel & 0x3) << 8)
+
+            _, cqe_output = self.admin_passthru(
+                opcode=ADMIN_CMD_OPCODE_GETFEATURES,
+                nsid=nsid,
+                cdw10=cdw10,
+                cdw11=cdw11,
+                read=True
+            )
+
+            if cqe_output is None:
+                return None
+
+            return self._parse_cqe_result(cqe_output)
+
+        except Exception as ex:
+            self.logger.error(f"Exception in get_feature_dword0: {ex}")
+            return None
+
     def get_feature(self, fid, nsid=0, sel=0):
         """
         Get an NVMe feature value via the admin passthru interface.
@@ -561,42 +953,189 @@ class AdminCommands:
             self.logger.error("Failed to parse CQE DWORD0 result from stderr.")
             return None
 
-        parsers = {
-            0x04: self._parse_temperature_threshold_feature,
-        }
-
-        if fid in parsers:
+        if fid in FEATURE_PARSERS:
+            # Decode through the registry of feature parsers.
             try:
-                return parsers[fid](dword0)
+                return FEATURE_PARSERS[fid][1](dword0)
             except Exception as ex:
                 self.logger.error(f"Exception parsing feature {fid}: {ex}")
                 return None
-        else:
-            # For unknown features, just return the raw DWORD0 hex
-            return {"raw_dword0": hex(dword0)}
-        
-    def _parse_temperature_threshold_feature(self, dword0):
+
+        # For unknown features, just return the raw DWORD0 hex
+        return {"raw_dword0": hex(dword0)}
+
+    def device_self_test(self, code, nsid=NSID_BROADCAST):
+        """
+        Start or abort a device self-test.
+
+        Args:
+            code (int): Self-test Code: 1 = short, 2 = extended, 0xF = abort.
+            nsid (int): Namespace to test; 0xFFFFFFFF includes every namespace.
+
+        Returns:
+            str or None: Command output or None on failure.
+        """
+
+        try:
+            # CDW10: Bits 3:0 = Self-test Code (STC)
+            _, result = self.admin_passthru(
+                opcode=ADMIN_CMD_OPCODE_DEVICE_SELF_TEST,
+                nsid=nsid,
+                cdw10=code & 0xF,
+                read=False
+            )
+
+            return result
+        except Exception as ex:
+            self.logger.error(f"Exception in device_self_test: {ex}")
+            return None
+
+    def self_test_log(self):
         """
-        Parse Temperature Threshold (FID = 0x04).
-        Returns the threshold in both Kelvin and Celsius.
+        Retrieve and parse the Device Self-test log page.
+
+        Returns:
+            dict or None: Current operation, its completion and the valid result entries
+                          (newest first), or None on failure.
         """
 
         try:
-            temp_threshold = dword0 & 0xFFFF               # Temperature Threshold (TMPTH)-> bits 15:0
-            threshold_temp_sel = (dword0 >> 16) & 0xF      # Threshold Temperature Select (TMPSEL)-> bits 19:16
-            threshold_type_sel = (dword0 >> 20) & 0x3      # Threshold Type Select (THSEL) -> bits 21:20
-            temp_threshold_hyst = (dword0 >> 22) & 0x7     # Temperature Threshold Hysteresis (TMPTHH) -> bits 24:22
-
-            temperature_threshold_dict = {
-                "tmpth": temp_threshold,
-                "tmpsel": threshold_temp_sel,
-                "thsel": threshold_type_sel,
-                "tmpthh": temp_threshold_hyst
+            data = self.get_log_page(log_page_id=LOG_PAGE_ID_SELF_TEST, nsid=NSID_BROADCAST,
+                                     log_len=SELFTESTLOG_SIZE_BYTES)
+            if not data:
+                self.logger.error("No Device Self-test log page output received.")
+                return None
+
+            return self._parse_self_test_log(data)
+
+        except Exception as ex:
+            self.logger.error(f"Exception in self_test_log: {ex}")
+            return None
+
+    def _parse_self_test_log(self, data):
+        """
+        Parse the raw Device Self-test log page.
+
+        Args:
+            data (bytes): Raw log page data.
+
+        Returns:
+            dict: Parsed self-test log.
+        """
+
+        results = []
+        for i in range(SELFTEST_RESULT_COUNT):
+            entry = data[4 + i * SELFTEST_RESULT_SIZE_BYTES:4 + (i + 1) * SELFTEST_RESULT_SIZE_BYTES]
+            result = entry[0] & 0xF
+            if result == SELF_TEST_RESULT_UNUSED:
+                continue
+
+            results.append({
+                "result": result,                                   # Self-test Result
+                "code": (entry[0] >> 4) & 0xF,                      # Self-test Code
+                "segment": entry[1],                                # Segment Number
+                "valid_diag": entry[2],                             # Valid Diagnostic Information
+                "poh": int.from_bytes(entry[4:12], 'little'),       # Power On Hours
+                "nsid": int.from_bytes(entry[12:16], 'little'),     # Namespace Identifier
+                "flba": int.from_bytes(entry[16:24], 'little'),     # Failing LBA
+                "sct": entry[24] & 0x7,                             # Status Code Type
+                "sc": entry[25],                                    # Status Code
+            })
+
+        return {
+            "current_operation": data[0] & 0xF,                     # Current Device Self-test Operation
+            "completion": data[1] & 0x7F,                           # Current Device Self-test Completion (%)
+            "results": results,
+        }
+
+    def fw_download(self, input_file, offset, data_len):
+        """
+        Transfer one piece of a firmware image to the controller.
+
+        Args:
+            input_file (str): File holding the piece to transfer.
+            offset (int): Byte offset of the piece within the image, a multiple of 4.
+            data_len (int): Size of the piece in bytes, a multiple of 4.
+
+        Returns:
+            str or None: Command output or None on failure.
+        """
+
+        try:
+            # CDW10: Number of Dwords (NUMD), zero-based. CDW11: Offset (OFST) in dwords.
+            _, result = self.admin_passthru(
+                opcode=ADMIN_CMD_OPCODE_FW_DOWNLOAD,
+                nsid=0,
+                data_len=data_len,
+                read=False,
+                cdw10=(data_len // 4) - 1,
+                cdw11=offset // 4,
+                input_file=input_file
+            )
+
+            return result
+        except Exception as ex:
+            self.logger.error(f"Exception in fw_download: {ex}")
+            return None
+
+    def fw_commit(self, slot, action, bpid=0):
+        """
+        Commit the downloaded firmware image to a slot and/or activate a slot.
+
+        Args:
+            slot (int): Firmware Slot (0 lets the controller choose).
+            action (int): Commit Action (CA), see FW_COMMIT_* values.
+            bpid (int): Boot Partition ID.
+
+        Returns:
+            dict or None: 'reset', the reset the activation requires ('conventional', 'subsystem',
+                          'controller' or None if the controller did not ask for one), or None on failure.
+        """
+
+        try:
+            # CDW10: Bits 2:0 = Firmware Slot, Bits 5:3 = Commit Action, Bit 31 = BPID
+            cdw10 = (slot & 0x7) | ((action & 0x7) << 3) | ((bpid & 0x1) << 31)
+
+            # A commit whose activation needs a reset completes with a status that names the reset.
+            _, result = self.admin_passthru(
+                opcode=ADMIN_CMD_OPCODE_FW_COMMIT,
+                nsid=0,
+                cdw10=cdw10,
+                read=False,
+                accept_status=FW_COMMIT_RESETS
+            )
+            if result is None:
+                return None
+
+            return {"reset": FW_COMMIT_RESETS.get(self._parse_nvme_status(result))}
+        except Exception as ex:
+            self.logger.error(f"Exception in fw_commit: {ex}")
+            return None
+
+    def fw_slot_log(self):
+        """
+        Retrieve and parse the Firmware Slot Information log page.
+
+        Returns:
+            dict or None: Active slot, slot activated at next reset and the revision of every slot.
+        """
+
+        try:
+            data = self.get_log_page(log_page_id=LOG_PAGE_ID_FW_SLOT, nsid=NSID_BROADCAST,
+                                     log_len=FWSLOTLOG_SIZE_BYTES)
+            if not data:
+                self.logger.error("No Firmware Slot log page output received.")
+                return None
+
+            return {
+                "active_slot": data[0] & 0x7,                       # Active Firmware Info (AFI) bits 2:0
+                "next_slot": (data[0] >> 4) & 0x7,                  # Slot activated at the next reset
+                "frs": {slot: data[8 * slot:8 * slot + 8].decode('ascii', errors='ignore').strip('\x00 ')
+                        for slot in range(1, FW_SLOT_COUNT + 1)},   # Firmware Revision for Slot 1..7
             }
-        
-            return json.dumps(temperature_threshold_dict, indent=2)
+
         except Exception as ex:
-            self.logger.error(f"Exception parsing temperature threshold feature: {ex}")
+            self.logger.error(f"Exception in fw_slot_log: {ex}")
             return None
 
 """
@@ -0,0 +1,272 @@
+import os
+import re
+import socket
+import threading
+import time
+
+from nvme.admin_passthru_wrapper import FEATURE_ID_ASYNC_EVENT_CONFIG
+
+"""
+Asynchronous Event Types (completion DWORD0 bits 2:0)
+"""
+AER_TYPE_ERROR = 0x0
+AER_TYPE_SMART = 0x1
+AER_TYPE_NOTICE = 0x2
+AER_TYPE_IO_CMD_SPECIFIC = 0x6
+AER_TYPE_VENDOR = 0x7
+
+AER_TYPE_NAMES = {
+    AER_TYPE_ERROR: "error",
+    AER_TYPE_SMART: "smart",
+    AER_TYPE_NOTICE: "notice",
+    AER_TYPE_IO_CMD_SPECIFIC: "io_command_specific",
+    AER_TYPE_VENDOR: "vendor",
+}
+
+"""
+Asynchronous Event Information - SMART / Health Status
+"""
+AER_SMART_RELIABILITY = 0x00
+AER_SMART_TEMPERATURE = 0x01
+AER_SMART_SPARE = 0x02
+
+# SMART critical warning bit -> SMART / Health event information.
+CRITICAL_WARNING_EVENTS = {
+    0x01: AER_SMART_SPARE,
+    0x02: AER_SMART_TEMPERATURE,
+    0x04: AER_SMART_RELIABILITY,
+}
+
+"""
+Asynchronous Event Information - Notice
+"""
+AER_NOTICE_NS_CHANGED = 0x00
+AER_NOTICE_FW_ACTIVATION = 0x01
+AER_NOTICE_TELEMETRY = 0x02
+AER_NOTICE_ANA_CHANGE = 0x03
+
+"""
+Asynchronous Event Configuration: all SMART critical warnings, namespace attribute
+and firmware activation notices.
+"""
+DEFAULT_AEC_VALUE = 0x1F | (1 << 8) | (1 << 9)
+
+"""
+Kernel uevents
+"""
+NETLINK_KOBJECT_UEVENT = 15
+UEVENT_BUFFER_BYTES = 64 * 1024
+POLL_INTERVAL_SECONDS = 1.0
+
+
+def decode_aer_result(result):
+    """
+    Decode the completion DWORD0 of an Asynchronous Event Request.
+
+    Args:
+        result (int): Completion DWORD0.
+
+    Returns:
+        dict: Event type, information and associated log page.
+    """
+
+    event_type = result & 0x7
+    return {
+        "type": AER_TYPE_NAMES.get(event_type, f"type_{event_type}"),
+        "type_code": event_type,
+        "info": (result >> 8) & 0xFF,        # Asynchronous Event Information
+        "lid": (result >> 16) & 0xFF,        # Log Page Identifier to read to clear the event
+        "result": result,
+    }
+
+
+class AerListener:
+    """
+    Delivers Asynchronous Events of one controller to subscribers on a background thread.
+
+    The kernel NVMe driver owns the Asynchronous Event Request commands and keeps them
+    outstanding; every completion is reported to user space as an `NVME_AEN` uevent of the
+    controller. The listener enables the wanted events through the Asynchronous Event
+    Configuration feature (FID 0x0B) and reads those uevents from a netlink socket. Where
+    netlink is unavailable it falls back to polling the SMART critical warning.
+
+    Attributes:
+        admin (AdminCommands): Admin passthru wrapper of the controller.
+        logger (logging.Logger): Logger instance.
+        controller (str): Controller name as used by the kernel (e.g. 'nvme0').
+        events (list): Every event received, oldest first.
+    """
+
+    def __init__(self, admin, logger, aec_value=DEFAULT_AEC_VALUE):
+        """
+        Initializes the AerListener.
+
+        Args:
+            admin (AdminCommands): Admin passthru wrapper of the controller.
+            logger (logging.Logger): Logger instance.
+            aec_value (int): Asynchronous Event Configuration value to set when starting.
+        """
+
+        self.admin = admin
+        self.logger = logger
+        self.aec_value = aec_value
+        self.controller = os.path.basename(admin.device)
+        self.events = []
+        self._subscribers = []
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+        self._socket = None
+
+    def subscribe(self, callback, event_type=None):
+        """
+        Register a callback for every event, or only for one event type.
+
+        Args:
+            callback (callable): Called with the decoded event dict, on the listener thread.
+            event_type (str|None): Event type name (e.g. 'smart'), or None for all events.
+        """
+
+        with self._condition:
+            self._subscribers.append((callback, event_type))
+
+    def start(self):
+        """
+        Enable asynchronous events on the controller and start the listener thread.
+
+        Returns:
+            bool: True if the listener is running.
+        """
+
+        if self.admin.set_feature(fid=FEATURE_ID_ASYNC_EVENT_CONFIG, value=self.aec_value) is None:
+            self.logger.error("Failed to configure Asynchronous Event Configuration.")
+            return False
+
+        try:
+            self._socket = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+            self._socket.bind((0, 1))
+            self._socket.settimeout(POLL_INTERVAL_SECONDS)
+            target = self._listen_uevents
+        except (AttributeError, OSError) as ex:
+            self.logger.warning(f"Kernel uevents unavailable ({ex}), polling SMART critical warnings.")
+            self._socket = None
+            target = self._poll_smart
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=target, name=f"aer-{self.controller}", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Asynchronous event listener started for {self.controller}")
+        return True
+
+    def stop(self):
+        """
+        Stop the listener thread.
+        """
+
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if self._socket:
+            self._socket.close()
+            self._socket = None
+
+    def __enter__(self):
+        if not self.start():
+            raise RuntimeError(f"Asynchronous event listener for {self.controller} could not be started")
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _deliver(self, result):
+        """
+        Decode an event, record it and notify waiters and subscribers.
+
+        Args:
+            result (int): Completion DWORD0 of the Asynchronous Event Request.
+        """
+
+        event = decode_aer_result(result)
+        event["timestamp"] = time.time()
+        event["monotonic"] = time.monotonic()
+
+        with self._condition:
+            self.events.append(event)
+            subscribers = list(self._subscribers)
+            self._condition.notify_all()
+
+        self.logger.info(f"Asynchronous event: {event['type']} info={event['info']:#x} lid={event['lid']:#x}")
+        for callback, event_type in subscribers:
+            if event_type is None or event_type == event["type"]:
+                try:
+                    callback(event)
+                except Exception as ex:
+                    self.logger.error(f"Exception in asynchronous event subscriber: {ex}")
+
+    def _listen_uevents(self):
+        """
+        Listener thread: decode NVME_AEN uevents of this controller.
+        """
+
+        while not self._stop.is_set():
+            try:
+                message = self._socket.recv(UEVENT_BUFFER_BYTES)
+            except socket.timeout:
+                continue
+            except OSError as ex:
+                if not self._stop.is_set():
+                    self.logger.error(f"Uevent socket error: {ex}")
+                return
+
+            # Uevents are NUL separated KEY=VALUE strings after an 'action@devpath' header.
+            fields = message.split(b"\0")
+            if not fields[0].endswith(f"/{self.controller}".encode()):
+                continue
+
+            for field in fields[1:]:
+                match = re.match(rb"NVME_AEN=(0x[0-9a-fA-F]+|\d+)", field)
+                if match:
+                    self._deliver(int(match.group(1), 0))
+
+    def _poll_smart(self):
+        """
+        Fallback thread: report changes of the SMART critical warning as SMART events.
+        """
+
+        smart = self.admin.smart_log()
+        last = smart["cw"] if smart else 0
+        while not self._stop.wait(POLL_INTERVAL_SECONDS):
+            smart = self.admin.smart_log()
+            if smart and smart["cw"] != last:
+                # Synthesize one SMART event per newly set critical warning bit.
+                for bit, info in CRITICAL_WARNING_EVENTS.items():
+                    if smart["cw"] & bit and not last & bit:
+                        self._deliver(AER_TYPE_SMART | (info << 8) | (0x02 << 16))
+                last = smart["cw"]
+
+    def wait_for(self, event_type, info=None, timeout=None, since=None):
+        """
+        Wait until a matching event is received.
+
+        Args:
+            event_type (str): Event type name (e.g. 'smart', 'notice').
+            info (int|None): Required Asynchronous Event Information, or None for any.
+            timeout (float|None): Seconds to wait. None waits forever.
+            since (float|None): Only consider events received after this time.monotonic() value.
+
+        Returns:
+            dict | None: The first matching event, or None on timeout.
+        """
+
+        def match():
+            for event in self.events:
+                if event["type"] != event_type or (info is not None and event["info"] != info):
+                    continue
+                if since is None or event["monotonic"] >= since:
+                    return event
+            return None
+
+        with self._condition:
+            self._condition.wait_for(match, timeout)
+            return match()
@@ -0,0 +1,210 @@
+import errno
+import mmap
+import os
+import threading
+from contextlib import contextmanager
+
+"""
+Buffer Pool Defaults
+"""
+DEFAULT_LBA_SIZE_BYTES = 512
+DEFAULT_BUFFER_SIZE_BYTES = 128 * 1024
+DEFAULT_BUFFER_COUNT = 32
+
+
+def lba_size_from_id_ns(id_ns):
+    """
+    Compute the formatted LBA data size of a namespace.
+
+    Args:
+        id_ns (dict): Parsed Identify Namespace data (see AdminCommands.id_ns).
+
+    Returns:
+        int: LBA data size in bytes.
+    """
+
+    # FLBAS bits 3:0 hold the lower format index, bits 6:5 the upper one (more than 16 formats).
+    flbas = id_ns["flbas"]
+    index = (flbas & 0x0F) | ((flbas >> 1) & 0x30)
+
+    # LBADS is reported as a power of two.
+    return 2 ** id_ns["lbafs"][index]["ds"]
+
+
+def open_block_device(path, write=False, direct=True):
+    """
+    Open a namespace block device (or a regular file stand-in) for in-process I/O.
+
+    O_DIRECT is requested first so transfers bypass the page cache. Filesystems such as tmpfs
+    reject it with EINVAL, in which case the file is reopened with buffered I/O.
+
+    Args:
+        path (str): Path to the block device or stand-in file.
+        write (bool): Open for reading and writing if True, read-only otherwise.
+        direct (bool): Whether to try O_DIRECT at all.
+
+    Returns:
+        tuple(int, bool): File descriptor and whether O_DIRECT is active on it.
+    """
+
+    flags = os.O_RDWR if write else os.O_RDONLY
+
+    if direct and hasattr(os, "O_DIRECT"):
+        try:
+            return os.open(path, flags | os.O_DIRECT), True
+        except OSError as error:
+            if error.errno != errno.EINVAL:
+                raise
+
+    return os.open(path, flags), False
+
+
+class AlignedBufferPool:
+    """
+    A pool of reusable, page-aligned mmap buffers sized in whole logical blocks.
+
+    Anonymous mmap regions always start on a page boundary, which satisfies the alignment
+    rules of O_DIRECT. Buffers are allocated lazily up to `count` and handed out with
+    checkout()/release(); callers that exhaust the pool wait for a buffer to be returned.
+
+    Attributes:
+        lba_size (int): Logical block size in bytes of the target namespace.
+        buffer_size (int): Size in bytes of every buffer, a multiple of the LBA and page size.
+        count (int): Maximum number of buffers the pool will allocate.
+        logger (logging.Logger): Optional logger for pool diagnostics.
+    """
+
+    def __init__(self, lba_size=DEFAULT_LBA_SIZE_BYTES, buffer_size=DEFAULT_BUFFER_SIZE_BYTES,
+                 count=DEFAULT_BUFFER_COUNT, logger=None):
+        """
+        Initializes the AlignedBufferPool.
+
+        Args:
+            lba_size (int): Logical block size in bytes.
+            buffer_size (int): Requested buffer size in bytes, rounded up to the alignment.
+            count (int): Maximum number of buffers.
+            logger (logging.Logger): Optional logger instance.
+        """
+
+        self.lba_size = lba_size
+        self.count = count
+        self.logger = logger
+
+        # Round the buffer size up to a multiple of both the LBA size and the page size.
+        alignment = max(lba_size, mmap.PAGESIZE)
+        self.buffer_size = max(alignment, -(-buffer_size // alignment) * alignment)
+
+        self._free = []
+        self._all = set()
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_id_ns(cls, id_ns, buffer_size=DEFAULT_BUFFER_SIZE_BYTES, count=DEFAULT_BUFFER_COUNT, logger=None):
+        """
+        Build a pool sized for the formatted LBA of a namespace.
+
+        Args:
+            id_ns (dict): Parsed Identify Namespace data.
+            buffer_size (int): Requested buffer size in bytes.
+            count (int): Maximum number of buffers.
+            logger (logging.Logger): Optional logger instance.
+
+        Returns:
+            AlignedBufferPool: The new pool.
+        """
+
+        return cls(lba_size_from_id_ns(id_ns), buffer_size=buffer_size, count=count, logger=logger)
+
+    def checkout(self, timeout=None):
+        """
+        Take a buffer out of the pool, allocating a new one if the limit allows it.
+
+        Args:
+            timeout (float|None): Seconds to wait for a free buffer. None waits forever.
+
+        Returns:
+            mmap.mmap | None: A buffer of `buffer_size` bytes, or None on timeout.
+        """
+
+        with self._condition:
+            while not self._free:
+                # Allocate lazily until the pool reaches its size limit.
+                if len(self._all) < self.count:
+                    buf = mmap.mmap(-1, self.buffer_size)
+                    self._all.add(buf)
+                    return buf
+
+                if not self._condition.wait(timeout):
+                    if self.logger:
+                        self.logger.error("Timed out waiting for an aligned buffer.")
+                    return None
+
+            return self._free.pop()
+
+    def release(self, buf):
+        """
+        Return a buffer to the pool.
+
+        Args:
+            buf (mmap.mmap): A buffer previously obtained from checkout().
+        """
+
+        with self._condition:
+            if buf not in self._all:
+                raise ValueError("Buffer does not belong to this pool.")
+            self._free.append(buf)
+            self._condition.notify()
+
+    def owns(self, obj):
+        """
+        Check whether an object is one of the pool's buffers.
+
+        Args:
+            obj (object): Typically the `obj` attribute of a memoryview.
+
+        Returns:
+            bool: True if the object was allocated by this pool.
+        """
+
+        return obj in self._all
+
+    @contextmanager
+    def buffer(self, nbytes=None, timeout=None):
+        """
+        Check out a buffer and expose it as a zero-copy memoryview.
+
+        Args:
+            nbytes (int|None): Length of the view. Defaults to the whole buffer.
+            timeout (float|None): Seconds to wait for a free buffer.
+
+        Yields:
+            memoryview: A writable view over the first `nbytes` bytes of the buffer.
+        """
+
+        if nbytes is not None and nbytes > self.buffer_size:
+            raise ValueError(f"Requested {nbytes} bytes, pool buffers hold {self.buffer_size}.")
+
+        buf = self.checkout(timeout=timeout)
+        if buf is None:
+            raise TimeoutError("No aligned buffer available.")
+
+        view = memoryview(buf)
+        window = view[:nbytes] if nbytes is not None else view
+        try:
+            yield window
+        finally:
+            # Views must be released before the mmap can be reused or closed.
+            window.release()
+            view.release()
+            self.release(buf)
+
+    def close(self):
+        """
+        Unmap every buffer allocated by the pool.
+        """
+
+        with self._condition:
+            for buf in self._all:
+                buf.close()
+            self._all.clear()
+            self._free.clear()
@@ -0,0 +1,170 @@
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+
+from nvme.admin_passthru_wrapper import NSID_BROADCAST
+
+"""
+Error Information Log
+"""
+LOG_PAGE_ID_ERROR = 0x01
+ERROR_LOG_ENTRY_SIZE_BYTES = 64
+DEFAULT_STATE_PATH = os.path.join("logs", "error_log_state.json")
+
+
+def parse_error_entry(entry):
+    """
+    Decode one 64-byte Error Information Log entry.
+
+    Args:
+        entry (bytes): Raw entry.
+
+    Returns:
+        dict: Decoded entry fields.
+    """
+
+    status = int.from_bytes(entry[12:14], 'little')
+
+    return {
+        "error_count": int.from_bytes(entry[0:8], 'little'),    # Error Count
+        "sqid": int.from_bytes(entry[8:10], 'little'),          # Submission Queue ID
+        "cid": int.from_bytes(entry[10:12], 'little'),          # Command ID
+        "status_field": status,                                 # Status Field (phase tag in bit 0)
+        "sc": (status >> 1) & 0xFF,                             # Status Code
+        "sct": (status >> 9) & 0x7,                             # Status Code Type
+        "parm_error_location": int.from_bytes(entry[14:16], 'little'),  # Parameter Error Location
+        "lba": int.from_bytes(entry[16:24], 'little'),          # LBA
+        "nsid": int.from_bytes(entry[24:28], 'little'),         # Namespace
+        "vs": entry[28],                                        # Vendor Specific Information Available
+        "trtype": entry[29],                                    # Transport Type
+        "cs": int.from_bytes(entry[32:40], 'little'),           # Command Specific Information
+        "trtype_spec_info": int.from_bytes(entry[40:42], 'little'),  # Transport Type Specific Information
+    }
+
+
+class ErrorLogReader:
+    """
+    Incremental reader of the Error Information Log (LID 0x01).
+
+    The reader remembers, per serial number, the SMART "Number of Error Information Log
+    Entries" (`neile`) seen last time and only fetches the entries logged since then.
+    Entries are returned newest first, as the controller reports them.
+
+    Attributes:
+        admin (AdminCommands): Admin passthru wrapper used to read the log.
+        logger (logging.Logger): Logger instance.
+        state_path (str): JSON file holding the last seen error count of every device.
+    """
+
+    def __init__(self, admin, logger, state_path=DEFAULT_STATE_PATH):
+        """
+        Initializes the ErrorLogReader.
+
+        Args:
+            admin (AdminCommands): Admin passthru wrapper.
+            logger (logging.Logger): Logger instance.
+            state_path (str): JSON file holding the last seen error counts.
+        """
+
+        self.admin = admin
+        self.logger = logger
+        self.state_path = state_path
+
+    @contextmanager
+    def _locked_state(self):
+        """
+        Hold an exclusive lock on the state while it is read, updated and saved.
+
+        Every runner of the host (and every reader of a process) shares the state file, so the
+        lock is an flock on a companion lock file; the state file itself is replaced on save.
+        """
+
+        os.makedirs(os.path.dirname(self.state_path) or ".", exist_ok=True)
+        with open(f"{self.state_path}.lock", 'a') as lock_file:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _load_state(self):
+        """
+        Load the last seen error counts, keyed by serial number.
+
+        Returns:
+            dict: Stored counts (empty if the state file is missing or corrupt).
+        """
+
+        try:
+            with open(self.state_path, 'r') as state_file:
+                return json.load(state_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_state(self, state):
+        """
+        Persist the last seen error counts.
+
+        Args:
+            state (dict): Counts keyed by serial number.
+        """
+
+        # Write to a temporary file first so a crash never leaves a truncated state file.
+        tmp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as state_file:
+            json.dump(state, state_file, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def read_new(self, serial_number, neile, entries_supported):
+        """
+        Fetch and decode the error entries logged since the previous call for this device.
+
+        The first call for a device only records the current count as a baseline.
+
+        Args:
+            serial_number (str): Serial number keying the stored count.
+            neile (int): Current Number of Error Information Log Entries from the SMART log.
+            entries_supported (int): Error Log Page Entries (ELPE) from Identify Controller, zero-based.
+
+        Returns:
+            list | None: New entries, newest first, or None if the log could not be read.
+        """
+
+        with self._locked_state():
+            state = self._load_state()
+            last = state.get(serial_number)
+
+            if last is None or neile < last:
+                # Unknown device or a counter reset: start tracking from the current count.
+                self.logger.info(f"Error log baseline for {serial_number}: {neile} entries")
+                state[serial_number] = neile
+                self._save_state(state)
+                return []
+
+            new = neile - last
+            if new == 0:
+                return []
+
+            # Only the newest ELPE + 1 entries are kept by the controller.
+            capacity = entries_supported + 1
+            if new > capacity:
+                self.logger.warning(f"{new - capacity} error log entries were overwritten before being read")
+
+            count = min(new, capacity)
+            data = self.admin.get_log_page(LOG_PAGE_ID_ERROR, nsid=NSID_BROADCAST,
+                                           log_len=count * ERROR_LOG_ENTRY_SIZE_BYTES)
+            if data is None:
+                self.logger.error("Failed to read the Error Information log.")
+                return None
+
+            entries = []
+            for i in range(count):
+                entry = parse_error_entry(data[i * ERROR_LOG_ENTRY_SIZE_BYTES:(i + 1) * ERROR_LOG_ENTRY_SIZE_BYTES])
+                # Empty slots have an error count of zero; older entries were already reported.
+                if entry["error_count"] > last:
+                    entries.append(entry)
+
+            state[serial_number] = neile
+            self._save_state(state)
+            return entries
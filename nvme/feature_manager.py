@@ -0,0 +1,213 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from nvme.admin_passthru_wrapper import (
+    FEATURE_PARSERS,
+    FEATURE_SEL_CURRENT,
+    FEATURE_SEL_DEFAULT,
+    FEATURE_SEL_SAVED,
+    FEATURE_SEL_SUPPORTED,
+)
+
+"""
+Snapshot Select Values
+"""
+SNAPSHOT_SELECTS = {
+    "current": FEATURE_SEL_CURRENT,
+    "default": FEATURE_SEL_DEFAULT,
+    "saved": FEATURE_SEL_SAVED,
+    "capabilities": FEATURE_SEL_SUPPORTED,
+}
+
+
+def decode_capabilities(dword0):
+    """
+    Decode the DWORD0 returned by Get Features with SEL = 3 (supported capabilities).
+
+    Args:
+        dword0 (int): Completion DWORD0.
+
+    Returns:
+        dict: Saveable, namespace specific and changeable flags.
+    """
+
+    return {
+        "saveable": bool(dword0 & 0x1),
+        "ns_specific": bool(dword0 & 0x2),
+        "changeable": bool(dword0 & 0x4),
+    }
+
+
+class FeatureManager:
+    """
+    Snapshots, compares and restores controller features through Get/Set Features.
+
+    Every (FID, SEL) query of a snapshot is submitted in a single concurrent round, and
+    restores set back every changed feature in a single concurrent round as well.
+
+    Attributes:
+        admin (AdminCommands): Admin passthru wrapper used to send the commands.
+        logger (logging.Logger): Logger instance.
+        fids (list): Feature Identifiers handled by the manager.
+        nsid (int): Namespace ID sent with the commands (0 for controller features).
+        max_workers (int): Maximum number of commands in flight.
+        restore_failures (int): Features that preserve() could not set back on exit.
+    """
+
+    def __init__(self, admin, logger, fids=None, nsid=0, max_workers=16):
+        """
+        Initializes the FeatureManager.
+
+        Args:
+            admin (AdminCommands): Admin passthru wrapper.
+            logger (logging.Logger): Logger instance.
+            fids (list|None): Feature Identifiers to manage. Defaults to every registered parser.
+            nsid (int): Namespace ID sent with the commands.
+            max_workers (int): Maximum number of commands in flight.
+        """
+
+        self.admin = admin
+        self.logger = logger
+        self.fids = list(fids) if fids is not None else sorted(FEATURE_PARSERS)
+        self.nsid = nsid
+        self.max_workers = max_workers
+        self.restore_failures = 0
+
+    def _query(self, requests):
+        """
+        Send a batch of Get Features commands concurrently.
+
+        Args:
+            requests (list): (fid, sel) tuples.
+
+        Returns:
+            dict: (fid, sel) -> DWORD0, or None for commands that failed.
+        """
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = executor.map(lambda req: self.admin.get_feature_dword0(req[0], nsid=self.nsid, sel=req[1]),
+                                   requests)
+            return dict(zip(requests, results))
+
+    def snapshot(self, selects=("current", "default", "saved", "capabilities")):
+        """
+        Take a snapshot of every managed feature.
+
+        Features whose current value cannot be read are considered unsupported and left out.
+
+        Args:
+            selects (tuple): Names of the values to capture (keys of SNAPSHOT_SELECTS).
+
+        Returns:
+            dict: FID -> {"name", "current", "default", "saved", "capabilities", "decoded"}.
+        """
+
+        requests = [(fid, SNAPSHOT_SELECTS[name]) for fid in self.fids for name in selects]
+        results = self._query(requests)
+
+        snapshot = {}
+        for fid in self.fids:
+            entry = {name: results[(fid, SNAPSHOT_SELECTS[name])] for name in selects}
+            if entry.get("current") is None:
+                continue
+
+            name, parser = FEATURE_PARSERS.get(fid, (f"fid_{fid:#04x}", None))
+            entry["name"] = name
+            entry["decoded"] = parser(entry["current"]) if parser else {"raw_dword0": hex(entry["current"])}
+            if entry.get("capabilities") is not None:
+                entry["capabilities"] = decode_capabilities(entry["capabilities"])
+            snapshot[fid] = entry
+
+        self.logger.info(f"Feature snapshot: {len(snapshot)} of {len(self.fids)} features supported")
+        return snapshot
+
+    def diff(self, before, after):
+        """
+        Compare the current values of two snapshots.
+
+        Args:
+            before (dict): Earlier snapshot.
+            after (dict): Later snapshot.
+
+        Returns:
+            dict: FID -> {"name", "before", "after", "fields"} for every feature that changed;
+                  "fields" maps each decoded field to its (before, after) values.
+        """
+
+        changes = {}
+        for fid in sorted(set(before) | set(after)):
+            old = before.get(fid, {})
+            new = after.get(fid, {})
+            if old.get("current") == new.get("current"):
+                continue
+
+            old_fields = old.get("decoded", {})
+            new_fields = new.get("decoded", {})
+            changes[fid] = {
+                "name": old.get("name") or new.get("name"),
+                "before": old.get("current"),
+                "after": new.get("current"),
+                "fields": {key: (old_fields.get(key), new_fields.get(key))
+                           for key in sorted(set(old_fields) | set(new_fields))
+                           if old_fields.get(key) != new_fields.get(key)},
+            }
+
+        return changes
+
+    def restore(self, snapshot):
+        """
+        Set back every changeable feature whose current value differs from the snapshot.
+
+        Args:
+            snapshot (dict): Snapshot taken with snapshot().
+
+        Returns:
+            int: Number of features that could not be restored.
+        """
+
+        # One round to learn the live values, one round to set back the changed ones.
+        live = self.snapshot(selects=("current",))
+        changes = self.diff(snapshot, live)
+
+        restorable = []
+        for fid, change in changes.items():
+            caps = snapshot.get(fid, {}).get("capabilities")
+            if change["before"] is None or (caps and not caps["changeable"]):
+                self.logger.error(f"Feature {change['name']} changed but cannot be restored")
+                continue
+            restorable.append((fid, change))
+
+        if not restorable:
+            return len(changes)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(
+                lambda item: self.admin.set_feature(fid=item[0], value=item[1]["before"], nsid=self.nsid),
+                restorable))
+
+        failures = len(changes) - len(restorable)
+        for (fid, change), result in zip(restorable, results):
+            if result is None:
+                self.logger.error(f"Failed to restore feature {change['name']}")
+                failures += 1
+            else:
+                self.logger.info(f"Restored feature {change['name']} to {change['before']:#x}")
+
+        return failures
+
+    @contextmanager
+    def preserve(self):
+        """
+        Snapshot the features on entry and restore them on exit, even if the body raises.
+
+        The number of features left changed is kept in `restore_failures`.
+
+        Yields:
+            dict: The snapshot taken on entry.
+        """
+
+        snapshot = self.snapshot()
+        try:
+            yield snapshot
+        finally:
+            self.restore_failures = self.restore(snapshot)
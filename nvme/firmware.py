@@ -0,0 +1,260 @@
+import mmap
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from nvme.admin_passthru_wrapper import (
+    FW_COMMIT_ACTIVATE_ON_RESET,
+    FW_COMMIT_REPLACE,
+    FW_COMMIT_REPLACE_AND_ACTIVATE_NOW,
+    FW_COMMIT_REPLACE_AND_ACTIVATE_ON_RESET,
+)
+
+"""
+Firmware Update Granularity (FWUG)
+"""
+# FWUG is reported in 4 KiB units; 0 means no information, 0xFF means no restriction.
+FWUG_UNIT_BYTES = 4096
+FWUG_NO_INFORMATION = 0x00
+FWUG_NO_RESTRICTION = 0xFF
+
+
+def update_granularity(fwug):
+    """
+    Convert the Identify Controller FWUG field into bytes.
+
+    Args:
+        fwug (int): Firmware Update Granularity field.
+
+    Returns:
+        int | None: Granularity in bytes, or None if there is no restriction.
+    """
+
+    if fwug == FWUG_NO_RESTRICTION:
+        return None
+    if fwug == FWUG_NO_INFORMATION:
+        return FWUG_UNIT_BYTES
+    return fwug * FWUG_UNIT_BYTES
+
+
+class FirmwareUpdater:
+    """
+    Downloads, commits and verifies a firmware image on one controller.
+
+    The image is memory-mapped and sent in pieces that respect the controller's firmware
+    update granularity and maximum transfer size. nvme-cli reads each piece from a file, so
+    the next piece is staged into a second scratch file while the current one is being
+    transferred.
+
+    Attributes:
+        nvme (NvmeCommands): NVMe wrapper of the controller, used for the reset.
+        admin (AdminCommands): Admin passthru wrapper of the controller.
+        logger (logging.Logger): Logger instance.
+        name (str): Label used in messages, e.g. the serial number.
+    """
+
+    def __init__(self, nvme, admin, logger, name=None):
+        """
+        Initializes the FirmwareUpdater.
+
+        Args:
+            nvme (NvmeCommands): NVMe wrapper of the controller.
+            admin (AdminCommands): Admin passthru wrapper of the controller.
+            logger (logging.Logger): Logger instance.
+            name (str|None): Label used in messages. Defaults to the device path.
+        """
+
+        self.nvme = nvme
+        self.admin = admin
+        self.logger = logger
+        self.name = name or admin.device
+
+    def chunk_size(self, ctrl):
+        """
+        Largest piece size that is a multiple of the update granularity and fits in MDTS.
+
+        Args:
+            ctrl (dict): Parsed Identify Controller data.
+
+        Returns:
+            int | None: Piece size in bytes, or None if the granularity is larger than MDTS.
+        """
+
+        max_transfer = self.admin.max_transfer_size()
+        granularity = update_granularity(ctrl.get("fwug", FWUG_NO_INFORMATION))
+        if granularity is None:
+            return max_transfer
+
+        if granularity > max_transfer:
+            # No piece can be both a multiple of the granularity and fit in a single transfer.
+            self.logger.error(f"{self.name}: update granularity {granularity} exceeds the maximum "
+                              f"transfer size {max_transfer}")
+            return None
+
+        return (max_transfer // granularity) * granularity
+
+    def validate_slot(self, ctrl, slot, action):
+        """
+        Check the target slot and commit action against the controller capabilities.
+
+        Args:
+            ctrl (dict): Parsed Identify Controller data.
+            slot (int): Target firmware slot.
+            action (int): Commit Action.
+
+        Returns:
+            bool: True if the update can proceed.
+        """
+
+        frmw = ctrl.get("frmw", 0)
+        slots = (frmw >> 1) & 0x7
+
+        if not 1 <= slot <= slots:
+            self.logger.error(f"{self.name}: slot {slot} out of range, the controller has {slots} slots")
+            return False
+        if slot == 1 and frmw & 0x1 and action != FW_COMMIT_ACTIVATE_ON_RESET:
+            self.logger.error(f"{self.name}: slot 1 is read only")
+            return False
+        if action == FW_COMMIT_REPLACE_AND_ACTIVATE_NOW and not frmw & 0x10:
+            self.logger.error(f"{self.name}: activation without reset is not supported")
+            return False
+        return True
+
+    def download(self, image_path, chunk_size):
+        """
+        Transfer a firmware image in pieces, staging the next piece during each transfer.
+
+        Args:
+            image_path (str): Path to the firmware image.
+            chunk_size (int): Piece size in bytes.
+
+        Returns:
+            bool: True if every piece was accepted.
+        """
+
+        with open(image_path, 'rb') as image, tempfile.TemporaryDirectory(prefix="fw-") as scratch:
+            size = os.fstat(image.fileno()).st_size
+            if size == 0 or size % 4:
+                self.logger.error(f"{self.name}: firmware image size {size} is not a multiple of 4 bytes")
+                return False
+
+            staging = [os.path.join(scratch, "piece0"), os.path.join(scratch, "piece1")]
+            offsets = list(range(0, size, chunk_size))
+
+            with mmap.mmap(image.fileno(), 0, access=mmap.ACCESS_READ) as mapped, \
+                    ThreadPoolExecutor(max_workers=1) as stager:
+                view = memoryview(mapped)
+
+                def stage(index):
+                    # Copy one piece of the mapped image into its scratch file.
+                    offset = offsets[index]
+                    with open(staging[index % 2], 'wb') as piece:
+                        piece.write(view[offset:offset + chunk_size])
+                    return min(chunk_size, size - offset)
+
+                try:
+                    pending = stager.submit(stage, 0)
+                    for index, offset in enumerate(offsets):
+                        length = pending.result()
+                        if index + 1 < len(offsets):
+                            pending = stager.submit(stage, index + 1)
+
+                        if self.admin.fw_download(staging[index % 2], offset, length) is None:
+                            self.logger.error(f"{self.name}: firmware download failed at offset {offset}")
+                            return False
+                finally:
+                    # Wait for a staged piece still in flight before the mapping goes away.
+                    pending.result()
+                    view.release()
+
+        return True
+
+    def update(self, image_path, slot, action=FW_COMMIT_REPLACE_AND_ACTIVATE_ON_RESET):
+        """
+        Download a firmware image, commit it and verify the running revision.
+
+        Args:
+            image_path (str): Path to the firmware image.
+            slot (int): Target firmware slot.
+            action (int): Commit Action; activate-on-reset actions are followed by a controller reset,
+                          or by the reset the commit status asks for.
+
+        Returns:
+            dict: Per-step timings, revisions before and after, the reset used for the activation
+                  and the overall verdict.
+        """
+
+        summary = {"name": self.name, "ok": False, "fr_before": None, "fr_after": None, "reset": None,
+                   "timings": {}}
+        started = time.monotonic()
+
+        def step(label, func, *args):
+            begin = time.monotonic()
+            result = func(*args)
+            summary["timings"][label] = time.monotonic() - begin
+            return result
+
+        ctrl = self.admin.id_ctrl()
+        if not ctrl:
+            self.logger.error(f"{self.name}: unable to read Identify Controller")
+            return summary
+        summary["fr_before"] = ctrl["fr"]
+
+        if not self.validate_slot(ctrl, slot, action):
+            return summary
+
+        slots_before = self.admin.fw_slot_log()
+        if slots_before:
+            self.logger.info(f"{self.name}: active slot {slots_before['active_slot']}, "
+                             f"slot {slot} holds '{slots_before['frs'][slot]}'")
+
+        if action != FW_COMMIT_ACTIVATE_ON_RESET:
+            chunk_size = self.chunk_size(ctrl)
+            if chunk_size is None:
+                return summary
+            self.logger.info(f"{self.name}: downloading {image_path} in {chunk_size} byte pieces")
+            if not step("download", self.download, image_path, chunk_size):
+                return summary
+
+        commit = step("commit", self.admin.fw_commit, slot, action)
+        if commit is None:
+            self.logger.error(f"{self.name}: firmware commit failed")
+            return summary
+
+        # The commit status may name the reset the activation needs; activate-on-reset actions
+        # otherwise use a controller reset.
+        reset = commit["reset"]
+        if reset is None and action in (FW_COMMIT_REPLACE_AND_ACTIVATE_ON_RESET, FW_COMMIT_ACTIVATE_ON_RESET):
+            reset = "controller"
+        summary["reset"] = reset
+
+        if reset == "conventional":
+            # A conventional reset (power cycle, PCIe reset) cannot be issued through nvme-cli.
+            self.logger.warning(f"{self.name}: firmware activation requires a conventional reset")
+        elif reset:
+            func = self.nvme.subsystem_reset if reset == "subsystem" else self.nvme.reset
+            if step("reset", func) is None:
+                self.logger.error(f"{self.name}: {reset} reset failed")
+                return summary
+
+        # Verify: the slot holds the new revision and, once activated, the controller runs it.
+        slots_after = step("verify", self.admin.fw_slot_log)
+        ctrl = self.admin.id_ctrl()
+        if not slots_after or not ctrl:
+            self.logger.error(f"{self.name}: unable to verify the firmware update")
+            return summary
+
+        summary["fr_after"] = ctrl["fr"]
+        expected = slots_after["frs"][slot]
+        if action == FW_COMMIT_REPLACE or reset == "conventional":
+            # Not activated yet: the slot holding the new revision is all that can be checked.
+            summary["ok"] = bool(expected)
+        else:
+            summary["ok"] = ctrl["fr"] == expected and slots_after["active_slot"] == slot
+
+        summary["timings"]["total"] = time.monotonic() - started
+        verdict = "succeeded" if summary["ok"] else "failed"
+        self.logger.info(f"{self.name}: firmware update {verdict}: {summary['fr_before']} -> {summary['fr_after']} "
+                         f"(slot {slot} holds '{expected}') in {summary['timings']['total']:.1f} seconds")
+        return summary
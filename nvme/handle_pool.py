@@ -0,0 +1,248 @@
+import errno
+import os
+import threading
+
+from nvme.buffer_pool import open_block_device
+
+"""
+Stale Handle Errors
+"""
+# Errors of a transfer on a descriptor whose device went away (namespace deleted, controller reset).
+STALE_ERRNOS = (errno.ENODEV, errno.ENXIO, errno.EBADF, errno.ESTALE)
+
+
+def _close(fd):
+    """
+    Close a pooled descriptor; one that already failed as stale may not close cleanly.
+
+    Args:
+        fd (int): File descriptor.
+    """
+
+    try:
+        os.close(fd)
+    except OSError:
+        pass
+
+
+class DeviceHandle:
+    """
+    An open controller or namespace descriptor shared through a DeviceHandlePool.
+
+    Attributes:
+        path (str): Device path the descriptor was opened on.
+        write (bool): Whether it was opened for writing.
+        fd (int): File descriptor.
+        direct (bool): Whether O_DIRECT is active on the descriptor.
+        refs (int): Number of users currently holding the handle.
+        stale (bool): Whether the device changed; the descriptor is closed once unused.
+        key (tuple): Pool key (path, write, requested O_DIRECT).
+    """
+
+    __slots__ = ("path", "write", "fd", "direct", "refs", "stale", "key")
+
+    def __init__(self, path, write, fd, direct, key):
+        self.path = path
+        self.write = write
+        self.fd = fd
+        self.direct = direct
+        self.refs = 0
+        self.stale = False
+        self.key = key
+
+
+class DeviceHandlePool:
+    """
+    Per-process pool of open controller and namespace descriptors.
+
+    Opening /dev/nvmeX or /dev/nvmeXnY for every command costs a path lookup and a device
+    open/close each time. The pool keeps the descriptors open and reference-counts their
+    users, so concurrent threads share them (pread/pwrite do not use the file offset).
+    After a namespace delete/create/attach/detach, a format or a controller reset the
+    affected handles are invalidated: unused ones are closed at once, in-use ones when their
+    last user releases them, and the next user opens the device again. Transfers that fail
+    with a stale-device error can also invalidate the handle and retry (see retry_stale).
+
+    Attributes:
+        counters (dict): Instrumentation counters: opens, reuses, reopens, closes, stale.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty DeviceHandlePool.
+        """
+
+        self._handles = {}
+        self._lock = threading.Lock()
+        self._invalidated = set()
+        self.counters = {"opens": 0, "reuses": 0, "reopens": 0, "closes": 0, "stale": 0}
+
+    def acquire(self, path, write=False, direct=True):
+        """
+        Get a handle on a device, opening it only if no valid handle is pooled.
+
+        Args:
+            path (str): Controller or namespace path (or regular file stand-in).
+            write (bool): Whether the descriptor must allow writes.
+            direct (bool): Whether to try O_DIRECT (falls back to buffered I/O).
+
+        Returns:
+            DeviceHandle: The handle; give it back with release().
+
+        Raises:
+            OSError: If the device cannot be opened.
+        """
+
+        key = (path, write, direct)
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is not None and not handle.stale:
+                handle.refs += 1
+                self.counters["reuses"] += 1
+                return handle
+
+        # Open outside the lock: opening a device may block, other paths must not wait.
+        fd, active = open_block_device(path, write=write, direct=direct)
+        with self._lock:
+            handle = self._handles.get(key)
+            if handle is not None and not handle.stale:
+                # Another thread opened it meanwhile: use its handle.
+                os.close(fd)
+                handle.refs += 1
+                self.counters["reuses"] += 1
+                return handle
+
+            self.counters["opens"] += 1
+            if key in self._invalidated:
+                self._invalidated.discard(key)
+                self.counters["reopens"] += 1
+            handle = DeviceHandle(path, write, fd, active, key)
+            handle.refs = 1
+            self._handles[key] = handle
+            return handle
+
+    def release(self, handle):
+        """
+        Give a handle back; stale handles are closed by their last user.
+
+        Args:
+            handle (DeviceHandle): Handle returned by acquire().
+        """
+
+        with self._lock:
+            handle.refs -= 1
+            close = handle.stale and handle.refs == 0
+            if close:
+                self.counters["closes"] += 1
+        if close:
+            _close(handle.fd)
+
+    def _invalidate(self, handle, key):
+        """
+        Mark a pooled handle stale and drop it from the pool (lock held).
+
+        Returns:
+            bool: True if the caller must close the descriptor now.
+        """
+
+        handle.stale = True
+        self._handles.pop(key, None)
+        self._invalidated.add(key)
+        self.counters["stale"] += 1
+        if handle.refs == 0:
+            self.counters["closes"] += 1
+            return True
+        return False
+
+    def invalidate(self, device, nsid=None):
+        """
+        Invalidate the handles of a controller and its namespaces, or of one namespace.
+
+        Args:
+            device (str): Controller path (e.g. /dev/nvme0).
+            nsid (int | None): Namespace ID; None (or the broadcast ID) for every namespace
+                               and the controller itself.
+
+        Returns:
+            int: Number of handles invalidated.
+        """
+
+        if nsid == 0xFFFFFFFF:
+            nsid = None
+
+        def affected(path):
+            if nsid is not None:
+                return path == f"{device}n{nsid}"
+            return path == device or (path.startswith(f"{device}n") and path[len(device) + 1:].isdigit())
+
+        invalidated = 0
+        to_close = []
+        with self._lock:
+            for key, handle in list(self._handles.items()):
+                if not affected(handle.path):
+                    continue
+                invalidated += 1
+                if self._invalidate(handle, key):
+                    to_close.append(handle.fd)
+        for fd in to_close:
+            _close(fd)
+        return invalidated
+
+    def discard(self, handle):
+        """
+        Invalidate one handle, e.g. after a transfer failed with a stale-device error.
+
+        Args:
+            handle (DeviceHandle): Handle currently held by the caller.
+        """
+
+        with self._lock:
+            if self._handles.get(handle.key) is handle:
+                self._invalidate(handle, handle.key)
+            else:
+                handle.stale = True
+
+    def retry_stale(self, path, operation, write=False, direct=True):
+        """
+        Run an operation on a pooled descriptor, reopening the device once if it went stale.
+
+        Args:
+            path (str): Controller or namespace path.
+            operation (callable): operation(handle) -> result.
+            write (bool): Whether the descriptor must allow writes.
+            direct (bool): Whether to try O_DIRECT.
+
+        Returns:
+            object: The result of the operation.
+
+        Raises:
+            OSError: If the operation fails for another reason, or again after reopening.
+        """
+
+        for attempt in (1, 2):
+            handle = self.acquire(path, write=write, direct=direct)
+            try:
+                return operation(handle)
+            except OSError as error:
+                if attempt == 2 or error.errno not in STALE_ERRNOS:
+                    raise
+                self.discard(handle)
+            finally:
+                self.release(handle)
+
+    def stats(self):
+        """
+        Snapshot of the instrumentation counters.
+
+        Returns:
+            dict: Counters plus the number of open descriptors ('open').
+        """
+
+        with self._lock:
+            stats = dict(self.counters)
+            stats["open"] = len(self._handles)
+        return stats
+
+
+# Process-wide pool used by the wrappers.
+handle_pool = DeviceHandlePool()
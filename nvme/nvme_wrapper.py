@@ -1,7 +1,80 @@
+import errno
+import os
 import subprocess
 import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 from logger.log_manager import LogManager
+from nvme.buffer_pool import AlignedBufferPool, lba_size_from_id_ns
+from nvme.handle_pool import handle_pool
+
+"""
+Dataset Management Limits
+"""
+DSM_MAX_RANGES = 256
+DSM_MAX_RANGE_BLOCKS = 0xFFFFFFFF
+
+"""
+NVM Command Limits
+"""
+# Number of Logical Blocks (NLB) is a 16-bit zero-based field.
+NVM_MAX_COMMAND_BLOCKS = 0x10000
+
+
+def coalesce_ranges(ranges, max_blocks=DSM_MAX_RANGE_BLOCKS):
+    """
+    Sorts and merges overlapping or adjacent LBA ranges.
+
+    Args:
+        ranges (iterable): (start_block, block_count) tuples, block count one-based.
+        max_blocks (int): Largest block count a single range may describe; longer
+                          merged ranges are split.
+
+    Returns:
+        list: Disjoint (start_block, block_count) tuples in ascending order.
+    """
+
+    merged = []
+    for start, count in sorted(r for r in ranges if r[1] > 0):
+        # Extend the previous range when this one overlaps or touches it.
+        if merged and start <= merged[-1][0] + merged[-1][1]:
+            prev_start, prev_count = merged[-1]
+            merged[-1] = (prev_start, max(prev_count, start + count - prev_start))
+        else:
+            merged.append((start, count))
+
+    # Split ranges whose length does not fit in a single range descriptor.
+    result = []
+    for start, count in merged:
+        while count > max_blocks:
+            result.append((start, max_blocks))
+            start += max_blocks
+            count -= max_blocks
+        result.append((start, count))
+
+    return result
+
+
+def split_range(start_block, block_count, max_blocks=NVM_MAX_COMMAND_BLOCKS):
+    """
+    Splits an LBA range into chunks that each fit in a single command.
+
+    Args:
+        start_block (int): Starting logical block address.
+        block_count (int): Number of logical blocks, one-based.
+        max_blocks (int): Largest number of blocks per chunk.
+
+    Returns:
+        list: (start_block, block_count) tuples covering the whole range.
+    """
+
+    return [(start, min(max_blocks, start_block + block_count - start))
+            for start in range(start_block, start_block + block_count, max_blocks)]
+
 
 class NvmeCommands():
     """
@@ -23,6 +96,38 @@ class NvmeCommands():
 
         self.logger = logger
         self.device = device
+        # Objects notified of every executed command, see add_observer().
+        self.observers = []
+        self.buffer_pool = None
+        self.direct_io = True
+        # Controller and namespace descriptors shared by every wrapper of the process.
+        self.handles = handle_pool
+
+    def add_observer(self, observer):
+        """
+        Registers an observer notified after every executed command.
+
+        Args:
+            observer (object): Object with an on_command(cmd, elapsed, success) method.
+        """
+
+        self.observers.append(observer)
+
+    def _notify_observers(self, cmd, elapsed, success):
+        """
+        Reports an executed command to the observers; observer failures are only logged.
+
+        Args:
+            cmd (list): The executed command.
+            elapsed (float): Command latency in seconds.
+            success (bool): Whether the command succeeded.
+        """
+
+        for observer in self.observers:
+            try:
+                observer.on_command(cmd, elapsed, success)
+            except Exception as ex:
+                self.logger.error(f"Exception in command observer: {ex}")
 
     def _execute_cmd(self, cmd: list):
         """
@@ -41,11 +146,15 @@ class NvmeCommands():
         # Log the command to be executed.
         self.logger.info(f"Executing: {cmd_str}")
 
+        start = time.perf_counter()
+        success = False
+
         try:
             # Execute the command capturing stdout and stderr. Enable exception raise if command fails. 
             result = subprocess.run(cmd, capture_output=True, text=True, check=True)
 
             # Return the stdout if the command succeed.
+            success = True
             return result.stdout
         except subprocess.CalledProcessError as error:
             # Log the command that failed.
@@ -55,7 +164,10 @@ class NvmeCommands():
             self.logger.error(f"stderr: {error.stderr}")
 
             return None
-        
+        finally:
+            # Report the command latency to the observers.
+            self._notify_observers(cmd, time.perf_counter() - start, success)
+
     def id_ctrl(self, json_output=False, vendor=False):
         """
         Retrieves the controller identification data of the NVMe device.
@@ -205,6 +317,622 @@ class NvmeCommands():
 
         return cmd_output
         
+    def configure_buffer_pool(self, id_ns=None, lba_size=512, buffer_size=128 * 1024, count=32):
+        """
+        Sets up the aligned buffer pool used by the in-process block I/O paths.
+
+        Args:
+            id_ns (dict | None): Parsed Identify Namespace data. When given, the LBA size is
+                                 taken from the formatted LBA format (`flbas`/`lbafs`).
+            lba_size (int): LBA size in bytes used when no Identify Namespace data is given.
+            buffer_size (int): Size in bytes of every pooled buffer.
+            count (int): Maximum number of pooled buffers.
+
+        Returns:
+            AlignedBufferPool: The configured pool.
+        """
+
+        # Release the buffers of a previous configuration.
+        if self.buffer_pool is not None:
+            self.buffer_pool.close()
+
+        if id_ns:
+            self.buffer_pool = AlignedBufferPool.from_id_ns(id_ns, buffer_size=buffer_size, count=count,
+                                                            logger=self.logger)
+        else:
+            self.buffer_pool = AlignedBufferPool(lba_size, buffer_size=buffer_size, count=count,
+                                                 logger=self.logger)
+
+        return self.buffer_pool
+
+    def _namespace_buffer_pool(self, nsid, admin=None):
+        """
+        Returns the buffer pool, sizing it from Identify Namespace on first use.
+
+        Block offsets are computed from the pool LBA size, so it is never assumed: without a
+        configured pool the formatted LBA size must be read through `admin`.
+
+        Args:
+            nsid (int): Identifier of the namespace about to be accessed.
+            admin (AdminCommands | None): Used to read Identify Namespace.
+
+        Returns:
+            AlignedBufferPool | None: The pool, or None if the LBA size is unknown.
+        """
+
+        if self.buffer_pool is not None:
+            return self.buffer_pool
+
+        id_ns = admin.id_ns(nsid) if admin else None
+        if not id_ns:
+            self.logger.error(f"LBA size of namespace {nsid} is unknown: configure the buffer pool "
+                              f"with Identify Namespace data or pass admin.")
+            return None
+
+        return self.configure_buffer_pool(id_ns=id_ns)
+
+    def invalidate_handles(self, nsid=None):
+        """
+        Drops the pooled descriptors of a namespace, or of the controller and all its namespaces.
+
+        Called after commands that delete/recreate namespaces or reset the controller, so the
+        next transfer opens the new device instead of using a stale descriptor.
+
+        Args:
+            nsid (int | str | None): Namespace ID, None for the whole controller.
+        """
+
+        try:
+            nsid = int(nsid, 0) if isinstance(nsid, str) else nsid
+        except ValueError:
+            nsid = None
+        count = self.handles.invalidate(self.device, nsid)
+        if count:
+            self.logger.debug(f"Invalidated {count} device handle(s) of {self.device}")
+
+    def handle_stats(self):
+        """
+        Open/reuse counters of the device handle pool.
+
+        Returns:
+            dict: opens, reuses, reopens, closes, stale and open descriptor counts.
+        """
+
+        return self.handles.stats()
+
+    def _block_io(self, nsid, offset, view, write):
+        """
+        Transfers one aligned buffer to or from a namespace.
+
+        Args:
+            nsid (int): Identifier of the desired namespace.
+            offset (int): Byte offset on the namespace.
+            view (memoryview): Buffer memory to transfer.
+            write (bool): True to write the buffer, False to read into it.
+
+        Returns:
+            int: Number of bytes transferred.
+        """
+
+        device_path = f"{self.device}n{nsid}"
+
+        def transfer(handle):
+            if self.direct_io and not handle.direct:
+                self.logger.warning(f"O_DIRECT not supported on {device_path}, using buffered I/O.")
+                self.direct_io = False
+            if write:
+                return os.pwritev(handle.fd, [view], offset)
+            return os.preadv(handle.fd, [view], offset)
+
+        # Pooled descriptor, reopened once if the namespace was recreated or the controller reset.
+        try:
+            return self.handles.retry_stale(device_path, transfer, write=write, direct=self.direct_io)
+        except OSError as error:
+            # Some filesystems accept O_DIRECT on open but reject the transfer itself.
+            if not self.direct_io or error.errno != errno.EINVAL:
+                raise
+            self.logger.warning("O_DIRECT transfer rejected, retrying with buffered I/O.")
+            self.direct_io = False
+            return self.handles.retry_stale(device_path, transfer, write=write, direct=False)
+
+    @contextmanager
+    def read_blocks(self, nsid=1, start_block=0, block_count=1, admin=None):
+        """
+        Reads blocks in-process into a pooled aligned buffer, without copying them.
+
+        Unlike `read`, the block count is one-based and the data does not go through nvme-cli.
+        A single call transfers at most one pool buffer.
+
+        Args:
+            nsid (int): Identifier of the desired namespace.
+            start_block (int): Starting logical block address.
+            block_count (int): Number of logical blocks to read.
+            admin (AdminCommands | None): Used to size the buffer pool if none is configured.
+
+        Yields:
+            memoryview | None: A view over the data read, or None if the read failed.
+        """
+
+        pool = self._namespace_buffer_pool(nsid, admin)
+        if pool is None:
+            yield None
+            return
+
+        with pool.buffer(block_count * pool.lba_size) as view:
+            try:
+                count = self._block_io(nsid, start_block * pool.lba_size, view, write=False)
+            except OSError as error:
+                self.logger.error(f"Block read failed on namespace {nsid}: {error}")
+                yield None
+                return
+
+            data = view[:count]
+            try:
+                yield data
+            finally:
+                data.release()
+
+    def block_read(self, nsid=1, start_block=0, block_count=1, admin=None):
+        """
+        Reads blocks in-process and returns a copy of the data.
+
+        Args:
+            nsid (int): Identifier of the desired namespace.
+            start_block (int): Starting logical block address.
+            block_count (int): Number of logical blocks to read (one-based).
+            admin (AdminCommands | None): Used to size the buffer pool if none is configured.
+
+        Returns:
+            bytes | None: The data read, or None if the read failed.
+        """
+
+        with self.read_blocks(nsid, start_block, block_count, admin) as view:
+            return bytes(view) if view is not None else None
+
+    def block_write(self, nsid=1, start_block=0, data=b"", admin=None):
+        """
+        Writes blocks in-process through pooled aligned buffers.
+
+        Data that already lives in a buffer of the pool (e.g. a view from
+        `buffer_pool.buffer()`) is written without being copied.
+
+        Args:
+            nsid (int): Identifier of the desired namespace.
+            start_block (int): Starting logical block address.
+            data (bytes-like): Data to write, a whole number of logical blocks.
+            admin (AdminCommands | None): Used to size the buffer pool if none is configured.
+
+        Returns:
+            int | None: Number of bytes written, or None if the write failed.
+        """
+
+        pool = self._namespace_buffer_pool(nsid, admin)
+        if pool is None:
+            return None
+
+        data = memoryview(data)
+        if len(data) % pool.lba_size:
+            self.logger.error(f"Write size {len(data)} is not a multiple of the LBA size {pool.lba_size}.")
+            return None
+
+        offset = start_block * pool.lba_size
+        try:
+            # Zero-copy path: the data is already an aligned pool buffer.
+            if pool.owns(data.obj) and len(data) <= pool.buffer_size:
+                return self._block_io(nsid, offset, data, write=True)
+
+            # Stage the data through aligned buffers one pool buffer at a time.
+            written = 0
+            while written < len(data):
+                with data[written:written + pool.buffer_size] as chunk, pool.buffer(len(chunk)) as view:
+                    view[:] = chunk
+                    written += self._block_io(nsid, offset + written, view, write=True)
+            return written
+        except OSError as error:
+            self.logger.error(f"Block write failed on namespace {nsid}: {error}")
+            return None
+        finally:
+            data.release()
+
+    def dsm(self, nsid=1, ranges=(), deallocate=True):
+        """
+        Sends a single Dataset Management command for up to 256 LBA ranges.
+
+        Args:
+            nsid (int): Identifier of the desired namespace.
+            ranges (list): (start_block, block_count) tuples, block count one-based.
+            deallocate (bool): Set the Attribute - Deallocate (AD) bit.
+
+        Returns:
+            str | None: Command output if successful, else None.
+        """
+
+        if not ranges or len(ranges) > DSM_MAX_RANGES:
+            self.logger.error(f"DSM needs between 1 and {DSM_MAX_RANGES} ranges, got {len(ranges)}.")
+            return None
+
+        # Get the path to the selected namespace.
+        device_path = f"{self.device}n{nsid}"
+
+        # Mandatory command structure: nvme dsm {device_path}.
+        cmd = ["nvme", "dsm", device_path]
+
+        # Add the Namespace ID to the command.
+        cmd.append(f"--namespace-id={nsid}")
+
+        # Add the Starting LBAs and Block Counts of every range to the command.
+        cmd.append("--slbs=" + ",".join(str(start) for start, _ in ranges))
+        cmd.append("--blocks=" + ",".join(str(count) for _, count in ranges))
+
+        # Add the Deallocate attribute to the command.
+        if deallocate:
+            cmd.append("--ad")
+
+        # Execute the command
+        cmd_output = self._execute_cmd(cmd)
+
+        return cmd_output
+
+    def deallocate(self, nsid=1, ranges=(), admin=None, max_workers=4):
+        """
+        Deallocates (TRIMs) an arbitrary list of LBA ranges.
+
+        Ranges are coalesced, packed into commands of up to 256 range descriptors and the
+        commands are submitted concurrently. When an AdminCommands instance is given, the
+        namespace utilization (`nuse` from Identify Namespace) is compared before and after.
+
+        Args:
+            nsid (int): Identifier of the desired namespace.
+            ranges (iterable): (start_block, block_count) tuples, block count one-based.
+            admin (AdminCommands | None): Used to verify the result through `nuse`.
+            max_workers (int): Maximum number of DSM commands in flight.
+
+        Returns:
+            dict | None: Summary of the operation, or None if any command failed.
+        """
+
+        ranges = coalesce_ranges(ranges)
+        if not ranges:
+            self.logger.error("No LBA ranges to deallocate.")
+            return None
+
+        # Pack the ranges into batches of one command each.
+        batches = [ranges[i:i + DSM_MAX_RANGES] for i in range(0, len(ranges), DSM_MAX_RANGES)]
+
+        before = admin.id_ns(nsid) if admin else None
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            outputs = list(executor.map(lambda batch: self.dsm(nsid, batch, deallocate=True), batches))
+        elapsed = time.monotonic() - start
+
+        failed = sum(1 for output in outputs if output is None)
+        summary = {
+            "ranges": len(ranges),
+            "blocks": sum(count for _, count in ranges),
+            "commands": len(batches),
+            "failed": failed,
+            "seconds": elapsed,
+            "ranges_per_sec": len(ranges) / elapsed if elapsed else float("inf"),
+        }
+        self.logger.info(f"Deallocated {summary['ranges']} ranges ({summary['blocks']} blocks) in "
+                         f"{summary['commands']} commands: {summary['ranges_per_sec']:.0f} ranges/sec")
+
+        if failed:
+            self.logger.error(f"{failed} of {len(batches)} DSM commands failed.")
+            return None
+
+        # Verify the namespace utilization did not grow. Without thin provisioning
+        # (NSFEAT bit 0 clear) NUSE always equals NCAP and cannot reflect the deallocation.
+        if before:
+            after = admin.id_ns(nsid)
+            if not after:
+                self.logger.error("Unable to read nuse after deallocation.")
+                return None
+
+            summary["nuse_before"] = before["nuse"]
+            summary["nuse_after"] = after["nuse"]
+            if not before["nsfeat"] & 0x1:
+                self.logger.info("Namespace does not report thin provisioning, nuse is not checked.")
+            elif after["nuse"] > before["nuse"]:
+                self.logger.error(f"nuse grew after deallocation: {before['nuse']} -> {after['nuse']}")
+                return None
+            else:
+                self.logger.info(f"nuse: {before['nuse']} -> {after['nuse']}")
+
+        return summary
+
+    def write_zeroes(self, nsid=1, start_block=0, block_count=0, deallocate=False):
+        """
+        Sets a range of logical blocks to zero without transferring data.
+
+        Args:
+            nsid (int): Identifier of the desired namespace.
+            start_block (int): Starting logical block address.
+            block_count (int): Number of logical blocks, zero-based as in `write`.
+            deallocate (bool): Request the controller to deallocate the blocks (DEAC).
+
+        Returns:
+            str | None: Command output if successful, else None.
+        """
+
+        # Get the path to the selected namespace.
+        device_path = f"{self.device}n{nsid}"
+
+        # Mandatory command structure: nvme write-zeroes {device_path}.
+        cmd = ["nvme", "write-zeroes", device_path]
+
+        # Add the Namespace ID, Start Block and Block Count to the command.
+        cmd.append(f"--namespace-id={nsid}")
+        cmd.append(f"--start-block={start_block}")
+        cmd.append(f"--block-count={block_count}")
+
+        # Add the Deallocate flag to the command.
+        if deallocate:
+            cmd.append("--deac")
+
+        # Execute the command
+        cmd_output = self._execute_cmd(cmd)
+
+        return cmd_output
+
+    def verify(self, nsid=1, start_block=0, block_count=0):
+        """
+        Verifies the integrity of stored data and metadata on the device side.
+
+        Args:
+            nsid (int): Identifier of the desired namespace.
+            start_block (int): Starting logical block address.
+            block_count (int): Number of logical blocks, zero-based as in `read`.
+
+        Returns:
+            str | None: Command output if successful, else None.
+        """
+
+        # Get the path to the selected namespace.
+        device_path = f"{self.device}n{nsid}"
+
+        # Mandatory command structure: nvme verify {device_path}.
+        cmd = ["nvme", "verify", device_path]
+
+        # Add the Namespace ID, Start Block and Block Count to the command.
+        cmd.append(f"--namespace-id={nsid}")
+        cmd.append(f"--start-block={start_block}")
+        cmd.append(f"--block-count={block_count}")
+
+        # Execute the command
+        cmd_output = self._execute_cmd(cmd)
+
+        return cmd_output
+
+    def compare(self, nsid=1, start_block=0, block_count=0, data_size=512, input_file=None):
+        """
+        Compares blocks on the device against data from a file; the comparison runs on the
+        device and no data is transferred back to the host.
+
+        Args:
+            nsid (int): Identifier of the desired namespace.
+            start_block (int): Starting logical block address.
+            block_count (int): Number of logical blocks, zero-based as in `write`.
+            data_size (int): Size of data in bytes.
+            input_file (str): Path to the file holding the expected data.
+
+        Returns:
+            str | None: Command output if the data matches, else None.
+        """
+
+        # Get the path to the selected namespace.
+        device_path = f"{self.device}n{nsid}"
+
+        # Mandatory command structure: nvme compare {device_path}.
+        cmd = ["nvme", "compare", device_path]
+
+        # Add the Start Block, Block Count, Data Size and Data File to the command.
+        cmd.append(f"--start-block={start_block}")
+        cmd.append(f"--block-count={block_count}")
+        cmd.append(f"--data-size={data_size}")
+        cmd.append(f"--data={input_file}")
+
+        # Execute the command
+        cmd_output = self._execute_cmd(cmd)
+
+        return cmd_output
+
+    def _run_batched(self, label, func, chunks, max_workers=4, progress_step=10):
+        """
+        Runs a per-chunk operation concurrently and reports progress.
+
+        Args:
+            label (str): Operation name used in progress messages.
+            func (callable): Called as func(start_block, block_count); None means failure.
+            chunks (list): (start_block, block_count) tuples.
+            max_workers (int): Maximum number of chunks in flight.
+            progress_step (int): Progress is logged every `progress_step` percent.
+
+        Returns:
+            dict: Summary with the number of blocks, commands, failures and elapsed time.
+        """
+
+        total = sum(count for _, count in chunks)
+        state = {"done": 0, "next_report": progress_step}
+        failures = []
+        start = time.monotonic()
+
+        def task(chunk):
+            ok = func(*chunk) is not None
+            with lock:
+                if not ok:
+                    failures.append(chunk)
+                state["done"] += chunk[1]
+                percent = 100 * state["done"] // total if total else 100
+                if percent >= state["next_report"]:
+                    state["next_report"] = percent - percent % progress_step + progress_step
+                    self.logger.info(f"{label}: {percent}% ({state['done']}/{total} blocks, "
+                                     f"{time.monotonic() - start:.1f}s)")
+
+        lock = threading.Lock()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(task, chunks))
+        elapsed = time.monotonic() - start
+
+        if failures:
+            self.logger.error(f"{label}: {len(failures)} of {len(chunks)} commands failed, "
+                              f"first at block {failures[0][0]}")
+
+        return {
+            "blocks": total,
+            "commands": len(chunks),
+            "failed": len(failures),
+            "seconds": elapsed,
+        }
+
+    def write_zeroes_range(self, nsid=1, start_block=0, block_count=1, deallocate=False,
+                           max_blocks=NVM_MAX_COMMAND_BLOCKS, max_workers=4):
+        """
+        Zeroes an arbitrarily large LBA range in command-sized batches.
+
+        Args:
+            nsid (int): Identifier of the desired namespace.
+            start_block (int): Starting logical block address.
+            block_count (int): Number of logical blocks, one-based.
+            deallocate (bool): Request the controller to deallocate the blocks (DEAC).
+            max_blocks (int): Largest number of blocks per command.
+            max_workers (int): Maximum number of commands in flight.
+
+        Returns:
+            dict: Summary of the operation.
+        """
+
+        chunks = split_range(start_block, block_count, max_blocks)
+        return self._run_batched(
+            "Write Zeroes",
+            lambda start, count: self.write_zeroes(nsid, start, count - 1, deallocate=deallocate),
+            chunks, max_workers)
+
+    def verify_range(self, nsid=1, start_block=0, block_count=1, max_blocks=NVM_MAX_COMMAND_BLOCKS,
+                     max_workers=4):
+        """
+        Verifies an arbitrarily large LBA range in command-sized batches.
+
+        Args:
+            nsid (int): Identifier of the desired namespace.
+            start_block (int): Starting logical block address.
+            block_count (int): Number of logical blocks, one-based.
+            max_blocks (int): Largest number of blocks per command.
+            max_workers (int): Maximum number of commands in flight.
+
+        Returns:
+            dict: Summary of the operation.
+        """
+
+        chunks = split_range(start_block, block_count, max_blocks)
+        return self._run_batched(
+            "Verify",
+            lambda start, count: self.verify(nsid, start, count - 1),
+            chunks, max_workers)
+
+    def compare_range(self, nsid=1, start_block=0, block_count=1, lba_size=512, pattern_file=None,
+                      chunk_blocks=256, max_workers=4):
+        """
+        Compares an LBA range against a repeating pattern, one chunk per command.
+
+        Every chunk is compared against the start of `pattern_file`, which must hold at
+        least `chunk_blocks` logical blocks of expected data.
+
+        Args:
+            nsid (int): Identifier of the desired namespace.
+            start_block (int): Starting logical block address.
+            block_count (int): Number of logical blocks, one-based.
+            lba_size (int): Logical block size in bytes.
+            pattern_file (str): Path to the file holding the expected pattern.
+            chunk_blocks (int): Number of blocks per command.
+            max_workers (int): Maximum number of commands in flight.
+
+        Returns:
+            dict: Summary of the operation; miscompares are counted as failures.
+        """
+
+        chunks = split_range(start_block, block_count, min(chunk_blocks, NVM_MAX_COMMAND_BLOCKS))
+        return self._run_batched(
+            "Compare",
+            lambda start, count: self.compare(nsid, start, count - 1, data_size=count * lba_size,
+                                              input_file=pattern_file),
+            chunks, max_workers)
+
+    def fill_namespace(self, nsid=1, block_count=None, passes=2, random_order=False,
+                       chunk_blocks=None, max_workers=8, admin=None):
+        """
+        Preconditions a namespace to steady state by overwriting it several times.
+
+        Writes go through the in-process block path with pooled aligned buffers, one
+        outstanding write per worker. Sequential preconditioning writes the namespace front to
+        back; random preconditioning writes every chunk once per pass in shuffled order.
+
+        Args:
+            nsid (int): Identifier of the desired namespace.
+            block_count (int | None): Blocks to write from LBA 0. Defaults to the whole namespace (`nsze`).
+            passes (int): Number of full-capacity passes.
+            random_order (bool): Shuffle the chunk order of every pass.
+            chunk_blocks (int | None): Blocks per write. Defaults to one pool buffer.
+            max_workers (int): Number of writes in flight.
+            admin (AdminCommands): Used to read the LBA size and size of the namespace.
+
+        Returns:
+            dict | None: Summary of the fill, or None if any write failed.
+        """
+
+        id_ns = admin.id_ns(nsid) if admin else None
+        if not id_ns:
+            self.logger.error(f"Identify Namespace data of namespace {nsid} is required to fill it.")
+            return None
+
+        lba_size = lba_size_from_id_ns(id_ns)
+        capacity = id_ns["nsze"] * lba_size
+        block_count = block_count or id_ns["nsze"]
+        if block_count * lba_size > capacity:
+            self.logger.error(f"Fill of {block_count * lba_size} bytes exceeds the {capacity} bytes "
+                              f"of namespace {nsid}.")
+            return None
+
+        if self.buffer_pool is None:
+            self.configure_buffer_pool(id_ns=id_ns, count=max_workers)
+        elif self.buffer_pool.lba_size != lba_size:
+            self.logger.error(f"Buffer pool LBA size {self.buffer_pool.lba_size} does not match the "
+                              f"{lba_size}-byte format of namespace {nsid}.")
+            return None
+
+        pool = self.buffer_pool
+        chunk_blocks = chunk_blocks or pool.buffer_size // pool.lba_size
+        if chunk_blocks * pool.lba_size > pool.buffer_size:
+            self.logger.error(f"Chunk of {chunk_blocks} blocks exceeds the pool buffer size "
+                              f"({pool.buffer_size // pool.lba_size} blocks).")
+            return None
+
+        def write_chunk(start, count):
+            # Random payload so compressing or deduplicating drives still do the full work.
+            with pool.buffer(count * pool.lba_size) as view:
+                view[:] = os.urandom(len(view))
+                return self.block_write(nsid, start, view)
+
+        summary = {"blocks": 0, "commands": 0, "failed": 0, "seconds": 0.0}
+        for pass_number in range(1, passes + 1):
+            chunks = split_range(0, block_count, chunk_blocks)
+            if random_order:
+                random.shuffle(chunks)
+
+            result = self._run_batched(f"Fill pass {pass_number}/{passes}", write_chunk, chunks, max_workers)
+            for key in summary:
+                summary[key] += result[key]
+
+            if result["failed"]:
+                return None
+
+        summary["mbps"] = summary["blocks"] * lba_size / summary["seconds"] / 1e6 if summary["seconds"] else 0
+        self.logger.info(f"Filled namespace {nsid} {passes}x: {summary['blocks'] * lba_size / 1e9:.2f} GB "
+                         f"at {summary['mbps']:.1f} MB/s")
+
+        return summary
+
     def create_ns(self, size, blocksize):
         
         cmd = [ "nvme", "create-ns", self.device]
@@ -225,6 +953,9 @@ class NvmeCommands():
             if char.isdigit():
                 nsid += char
 
+        # A recreated namespace may reuse the ID of a deleted one.
+        self.invalidate_handles(nsid)
+
         return nsid, calc
     
     def attach_ns(self, nsID, controller="0"):
@@ -242,6 +973,7 @@ class NvmeCommands():
 
         # Execute the command
         cmd_output = self._execute_cmd(cmd)
+        self.invalidate_handles(nsID)
 
         # Parse and convert the JSON formatted string to a dictionary
         if cmd_output == None:
@@ -263,6 +995,7 @@ class NvmeCommands():
     
         # Ejecutar el comando
         cmd_output = self._execute_cmd(cmd)
+        self.invalidate_handles(nsID)
     
         if cmd_output is None:
             self.logger.error(f"Didn't detach namespace {nsID}")
@@ -284,6 +1017,7 @@ class NvmeCommands():
     
         # Ejecutar el comando
         cmd_output = self._execute_cmd(cmd)
+        self.invalidate_handles(nsID)
     
         if cmd_output is None:
             self.logger.error(f"Didn't delete namespace {nsID}")
@@ -309,12 +1043,54 @@ class NvmeCommands():
     
         # Ejecutar el comando
         cmd_output = self._execute_cmd(cmd)
+        # The LBA format (and so the block size) of the namespace changed.
+        self.invalidate_handles(nsID)
+        if self.buffer_pool is not None:
+            # The pool LBA size may no longer match: size it again on the next transfer.
+            self.buffer_pool.close()
+            self.buffer_pool = None
     
         if cmd_output is None:
             self.logger.error(f"Didn't format namespace {nsID}")
             return False
         return True
 
+    def reset(self):
+        """
+        Resets the NVMe controller (e.g. to activate committed firmware).
+
+        Returns:
+            str | None: Command output if successful, else None.
+        """
+
+        # Mandatory command structure: nvme reset {device_path}.
+        cmd = ["nvme", "reset", self.device]
+
+        # Execute the command
+        cmd_output = self._execute_cmd(cmd)
+        # Descriptors opened before the reset may no longer be usable.
+        self.invalidate_handles()
+
+        return cmd_output
+
+    def subsystem_reset(self):
+        """
+        Resets the NVM subsystem of the controller (e.g. to activate committed firmware).
+
+        Returns:
+            str | None: Command output if successful, else None.
+        """
+
+        # Mandatory command structure: nvme subsystem-reset {device_path}.
+        cmd = ["nvme", "subsystem-reset", self.device]
+
+        # Execute the command
+        cmd_output = self._execute_cmd(cmd)
+        # Every controller of the subsystem is reset.
+        self.invalidate_handles()
+
+        return cmd_output
+
     def get_feature(self, fid):
         
         cmd = ["nvme","get-feature", self.device,"-f"]
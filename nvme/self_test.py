@@ -0,0 +1,226 @@
+import heapq
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from nvme.admin_passthru_wrapper import (
+    SELF_TEST_CODE_ABORT,
+    SELF_TEST_CODE_EXTENDED,
+    SELF_TEST_CODE_SHORT,
+    SELF_TEST_RESULT_NO_ERROR,
+)
+
+"""
+Self-test Durations
+"""
+# The specification limits a short self-test to two minutes.
+SHORT_SELF_TEST_SECONDS = 120
+# Used when Identify Controller does not report EDSTT.
+DEFAULT_EXTENDED_SELF_TEST_SECONDS = 30 * 60
+
+"""
+Polling Intervals
+"""
+MIN_POLL_INTERVAL_SECONDS = 1.0
+MAX_POLL_INTERVAL_SECONDS = 60.0
+POLLS_PER_REMAINING_TIME = 10
+
+
+class SelfTestMonitor:
+    """
+    Starts a device self-test on one controller and tracks it without blocking.
+
+    poll() reads the Device Self-test log once and returns immediately; next_interval()
+    suggests when to poll again, from the progress rate observed so far, so a chassis of
+    extended self-tests can be followed with a handful of log reads per drive.
+
+    Attributes:
+        admin (AdminCommands): Admin passthru wrapper of the controller.
+        logger (logging.Logger): Logger instance.
+        code (int): Self-test code (short or extended).
+        name (str): Label used in messages, e.g. the serial number.
+        status (dict|None): Last polled status.
+        previous (list|None): Result entries logged before the self-test was started.
+    """
+
+    def __init__(self, admin, logger, code=SELF_TEST_CODE_SHORT, name=None):
+        """
+        Initializes the SelfTestMonitor.
+
+        Args:
+            admin (AdminCommands): Admin passthru wrapper of the controller.
+            logger (logging.Logger): Logger instance.
+            code (int): Self-test code (short or extended).
+            name (str|None): Label used in messages. Defaults to the device path.
+        """
+
+        self.admin = admin
+        self.logger = logger
+        self.code = code
+        self.name = name or admin.device
+        self.status = None
+        self.expected_seconds = SHORT_SELF_TEST_SECONDS
+        self.started = None
+        self.previous = None
+
+    def start(self):
+        """
+        Start the self-test.
+
+        Returns:
+            bool: True if the self-test was started.
+        """
+
+        if self.code == SELF_TEST_CODE_EXTENDED:
+            ctrl = self.admin.id_ctrl()
+            edstt = ctrl.get("edstt") if ctrl else None
+            self.expected_seconds = edstt * 60 if edstt else DEFAULT_EXTENDED_SELF_TEST_SECONDS
+
+        # Remember the existing results so poll() only accepts the entry of this self-test.
+        log = self.admin.self_test_log()
+        if log is None:
+            self.logger.error(f"{self.name}: unable to read the self-test log before starting")
+            return False
+        self.previous = log["results"]
+
+        if self.admin.device_self_test(self.code) is None:
+            self.logger.error(f"{self.name}: failed to start the device self-test")
+            return False
+
+        self.started = time.monotonic()
+        self.status = {"running": True, "progress": 0, "result": None}
+        self.logger.info(f"{self.name}: self-test {self.code:#x} started, expected {self.expected_seconds // 60} min")
+        return True
+
+    def abort(self):
+        """
+        Abort the self-test in progress.
+
+        Returns:
+            bool: True if the abort command succeeded.
+        """
+
+        return self.admin.device_self_test(SELF_TEST_CODE_ABORT) is not None
+
+    def poll(self):
+        """
+        Read the self-test log once.
+
+        Returns:
+            dict | None: {"running", "progress", "result"}; "result" is the entry logged by this
+                         self-test once it finished. None if the log could not be read.
+        """
+
+        log = self.admin.self_test_log()
+        if log is None:
+            return None
+
+        if log["current_operation"]:
+            self.status = {"running": True, "progress": log["completion"], "result": None}
+            return self.status
+
+        # Idle: finished only once a new entry with our self-test code was logged.
+        results = log["results"]
+        if results and results != self.previous and results[0]["code"] == self.code:
+            self.status = {"running": False, "progress": 100, "result": results[0]}
+        elif time.monotonic() - self.started < self.expected_seconds:
+            # Not reported as started yet.
+            self.status = {"running": True, "progress": 0, "result": None}
+        else:
+            self.logger.error(f"{self.name}: self-test {self.code:#x} is not running and logged no result")
+            self.status = {"running": False, "progress": 0, "result": None}
+
+        return self.status
+
+    def next_interval(self):
+        """
+        Suggest how long to wait before the next poll.
+
+        Returns:
+            float: Seconds until the next poll.
+        """
+
+        elapsed = time.monotonic() - self.started if self.started else 0
+        progress = self.status["progress"] if self.status else 0
+
+        # Estimate the remaining time from the observed rate, or from the expected duration.
+        if progress > 0 and elapsed > 0:
+            remaining = elapsed * (100 - progress) / progress
+        else:
+            remaining = max(self.expected_seconds - elapsed, 0)
+
+        return min(MAX_POLL_INTERVAL_SECONDS, max(MIN_POLL_INTERVAL_SECONDS, remaining / POLLS_PER_REMAINING_TIME))
+
+    def passed(self):
+        """
+        Whether the finished self-test completed without error.
+
+        Returns:
+            bool: True if the newest result entry reports no error.
+        """
+
+        result = self.status["result"] if self.status else None
+        return bool(result) and result["result"] == SELF_TEST_RESULT_NO_ERROR
+
+
+def run_self_tests(monitors, logger, timeout=None, max_workers=16):
+    """
+    Start self-tests on many controllers and follow them concurrently.
+
+    Every monitor is polled at its own adaptive interval; polls that come due together
+    are sent in parallel.
+
+    Args:
+        monitors (list): SelfTestMonitor instances, one per controller.
+        logger (logging.Logger): Logger instance.
+        timeout (float|None): Abort the self-tests still running after this many seconds.
+        max_workers (int): Maximum number of commands in flight.
+
+    Returns:
+        dict: Monitor name -> final status (None if it could not be started or polled).
+    """
+
+    results = {}
+    deadline = time.monotonic() + timeout if timeout else None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        started = list(executor.map(lambda monitor: monitor.start(), monitors))
+
+        # Min-heap of (next poll time, index) for the monitors that started.
+        schedule = []
+        for index, (monitor, ok) in enumerate(zip(monitors, started)):
+            if ok:
+                heapq.heappush(schedule, (time.monotonic() + monitor.next_interval(), index))
+            else:
+                results[monitor.name] = None
+
+        while schedule:
+            now = time.monotonic()
+            if deadline and now >= deadline:
+                for _, index in schedule:
+                    logger.error(f"{monitors[index].name}: self-test timed out, aborting")
+                    monitors[index].abort()
+                    results[monitors[index].name] = monitors[index].status
+                break
+
+            # Sleep until the earliest poll, then poll everything that is due.
+            wake = min(schedule[0][0], deadline) if deadline else schedule[0][0]
+            time.sleep(max(0, wake - now))
+            due = []
+            while schedule and schedule[0][0] <= time.monotonic():
+                due.append(heapq.heappop(schedule)[1])
+
+            for index, status in zip(due, executor.map(lambda i: monitors[i].poll(), due)):
+                monitor = monitors[index]
+                if status is None:
+                    logger.error(f"{monitor.name}: unable to read the self-test log")
+                    results[monitor.name] = None
+                elif status["running"]:
+                    logger.info(f"{monitor.name}: self-test {status['progress']}% complete")
+                    heapq.heappush(schedule, (time.monotonic() + monitor.next_interval(), index))
+                else:
+                    verdict = "passed" if monitor.passed() else "failed"
+                    logger.info(f"{monitor.name}: self-test {verdict} after "
+                                f"{time.monotonic() - monitor.started:.0f} seconds")
+                    results[monitor.name] = status
+
+    return results
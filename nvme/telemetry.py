@@ -0,0 +1,230 @@
+import json
+import os
+import time
+
+from nvme.admin_passthru_wrapper import NSID_BROADCAST
+
+"""
+Telemetry Log Pages
+"""
+LOG_PAGE_ID_TELEMETRY_HOST = 0x07
+LOG_PAGE_ID_TELEMETRY_CTRL = 0x08
+TELEMETRY_BLOCK_SIZE_BYTES = 512
+TELEMETRY_HEADER_SIZE_BYTES = 512
+
+"""
+Telemetry Host-Initiated - Log Specific Field
+"""
+TELEMETRY_LSP_CREATE = 0x1
+
+"""
+Capture Defaults
+"""
+DEFAULT_DATA_AREA = 3
+DEFAULT_FSYNC_EVERY_CHUNKS = 8
+
+
+def parse_telemetry_header(data):
+    """
+    Decode the 512-byte header shared by the host- and controller-initiated telemetry logs.
+
+    Args:
+        data (bytes): The first 512 bytes of the log page.
+
+    Returns:
+        dict: Decoded header fields.
+    """
+
+    return {
+        "lid": data[0],                                       # Log Identifier
+        "ieee": int.from_bytes(data[5:8], 'little'),          # IEEE OUI Identifier
+        "da1_last": int.from_bytes(data[8:10], 'little'),     # Data Area 1 Last Block
+        "da2_last": int.from_bytes(data[10:12], 'little'),    # Data Area 2 Last Block
+        "da3_last": int.from_bytes(data[12:14], 'little'),    # Data Area 3 Last Block
+        "da4_last": int.from_bytes(data[16:20], 'little'),    # Data Area 4 Last Block
+        "host_gen": data[381],                                # Host-Initiated Data Generation Number
+        "ctrl_avail": data[382],                              # Controller-Initiated Data Available
+        "ctrl_gen": data[383],                                # Controller-Initiated Data Generation Number
+        "reason": data[384:512].hex(),                        # Reason Identifier
+    }
+
+
+class TelemetryCapture:
+    """
+    Captures telemetry logs to disk in large chunks, resumable after an interruption.
+
+    Progress is kept in a `<path>.progress` JSON file next to the capture. It is only
+    updated after the data it describes has been fsync'ed, so a resumed capture never
+    trusts bytes that did not reach the disk. Capturing to a stable path (e.g. keyed on the
+    serial number and LID) and renaming it to `final_path` once complete lets a later call
+    pick up an interrupted capture.
+
+    Attributes:
+        admin (AdminCommands): Admin passthru wrapper used to read the log pages.
+        logger (logging.Logger): Logger instance.
+        data_area (int): Last data area to capture (1 to 4).
+        chunk_size (int|None): Bytes per Get Log Page command; defaults to the controller MDTS.
+        fsync_every (int): Number of chunks between fsync and progress updates.
+    """
+
+    def __init__(self, admin, logger, data_area=DEFAULT_DATA_AREA, chunk_size=None,
+                 fsync_every=DEFAULT_FSYNC_EVERY_CHUNKS):
+        """
+        Initializes the TelemetryCapture.
+
+        Args:
+            admin (AdminCommands): Admin passthru wrapper.
+            logger (logging.Logger): Logger instance.
+            data_area (int): Last data area to capture (1 to 4).
+            chunk_size (int|None): Bytes per Get Log Page command.
+            fsync_every (int): Number of chunks between fsync and progress updates.
+        """
+
+        self.admin = admin
+        self.logger = logger
+        self.data_area = data_area
+        self.chunk_size = chunk_size
+        self.fsync_every = fsync_every
+
+    def read_header(self, controller_initiated=False, create=False):
+        """
+        Read and decode the telemetry log header.
+
+        Args:
+            controller_initiated (bool): Read LID 0x08 instead of the host-initiated LID 0x07.
+            create (bool): Ask the controller to collect new host-initiated telemetry data.
+
+        Returns:
+            dict | None: Decoded header, or None on failure.
+        """
+
+        lid = LOG_PAGE_ID_TELEMETRY_CTRL if controller_initiated else LOG_PAGE_ID_TELEMETRY_HOST
+        lsp = TELEMETRY_LSP_CREATE if create and not controller_initiated else 0
+
+        data = self.admin.get_log_page(lid, nsid=NSID_BROADCAST, log_len=TELEMETRY_HEADER_SIZE_BYTES,
+                                       lsp=lsp, rae=True)
+        if data is None:
+            self.logger.error(f"Failed to read telemetry header (LID {lid:#x}).")
+            return None
+
+        return parse_telemetry_header(data)
+
+    def _log_size(self, header):
+        """
+        Size in bytes of the log up to the configured data area.
+
+        Args:
+            header (dict): Decoded telemetry header.
+
+        Returns:
+            int: Number of bytes, header block included.
+        """
+
+        last_block = header[f"da{self.data_area}_last"]
+        return (last_block + 1) * TELEMETRY_BLOCK_SIZE_BYTES
+
+    def _save_progress(self, progress_path, progress):
+        """
+        Atomically persist the capture progress.
+
+        Args:
+            progress_path (str): Path of the progress file.
+            progress (dict): Progress record.
+        """
+
+        tmp_path = f"{progress_path}.tmp"
+        with open(tmp_path, 'w') as progress_file:
+            json.dump(progress, progress_file)
+        os.replace(tmp_path, progress_path)
+
+    def capture(self, path, controller_initiated=False, resume=True, final_path=None):
+        """
+        Capture a telemetry log to a file.
+
+        Args:
+            path (str): Destination file, kept in place while the capture is incomplete.
+            controller_initiated (bool): Capture LID 0x08 instead of the host-initiated LID 0x07.
+            resume (bool): Continue an interrupted capture of the same data generation.
+            final_path (str|None): Name the file is renamed to once the capture is complete.
+
+        Returns:
+            dict | None: Summary with size, elapsed time and throughput, or None on failure.
+        """
+
+        lid = LOG_PAGE_ID_TELEMETRY_CTRL if controller_initiated else LOG_PAGE_ID_TELEMETRY_HOST
+        gen_key = "ctrl_gen" if controller_initiated else "host_gen"
+        progress_path = f"{path}.progress"
+
+        # Resume only if the device still holds the same generation of telemetry data.
+        progress = None
+        if resume and os.path.exists(progress_path) and os.path.exists(path):
+            with open(progress_path, 'r') as progress_file:
+                progress = json.load(progress_file)
+            header = self.read_header(controller_initiated, create=False)
+            if header is None:
+                return None
+            if progress.get("lid") != lid or progress.get("generation") != header[gen_key]:
+                self.logger.info("Telemetry data changed since the interrupted capture, starting over.")
+                progress = None
+
+        if progress is None:
+            header = self.read_header(controller_initiated, create=not controller_initiated)
+            if header is None:
+                return None
+            progress = {"lid": lid, "generation": header[gen_key], "total": self._log_size(header), "done": 0}
+            self._save_progress(progress_path, progress)
+            mode = 'wb'
+        else:
+            self.logger.info(f"Resuming telemetry capture at {progress['done']} of {progress['total']} bytes")
+            mode = 'r+b'
+
+        total = progress["total"]
+        chunk_size = self.chunk_size or self.admin.max_transfer_size()
+        resumed_at = progress["done"]
+        start = time.monotonic()
+
+        with open(path, mode) as capture_file:
+            capture_file.seek(progress["done"])
+            chunks = 0
+            while progress["done"] < total:
+                length = min(chunk_size, total - progress["done"])
+                # Keep the asynchronous event retained until the last chunk has been read.
+                last = progress["done"] + length >= total
+                written = self.admin.get_log_page(lid, nsid=NSID_BROADCAST, log_len=length,
+                                                  offset=progress["done"], rae=not last,
+                                                  out=capture_file, chunk_size=length)
+                if written is None:
+                    self.logger.error(f"Telemetry capture interrupted at {progress['done']} of {total} bytes.")
+                    return None
+
+                progress["done"] += written
+                chunks += 1
+
+                # Write through periodically and only then record the progress.
+                if chunks % self.fsync_every == 0 or last:
+                    capture_file.flush()
+                    os.fsync(capture_file.fileno())
+                    self._save_progress(progress_path, progress)
+
+            capture_file.truncate(total)
+
+        if final_path:
+            os.replace(path, final_path)
+            path = final_path
+        os.remove(progress_path)
+
+        elapsed = time.monotonic() - start
+        transferred = total - resumed_at
+        summary = {
+            "path": path,
+            "lid": lid,
+            "bytes": total,
+            "transferred": transferred,
+            "seconds": elapsed,
+            "mbps": transferred / elapsed / 1e6 if elapsed else 0,
+            "header": header,
+        }
+        self.logger.info(f"Telemetry LID {lid:#x} captured to {path}: {total} bytes, "
+                         f"{summary['mbps']:.1f} MB/s")
+
+        return summary
@@ -0,0 +1,205 @@
+import json
+import os
+import pickle
+import re
+
+#Golden baselines live in tests/baselines, one JSON file per model (and optionally firmware)
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "baselines")
+CACHE_FILE_NAME = ".compiled.pickle"
+CACHE_VERSION = 1
+
+#Field rules accepted in a baseline file
+RULE_IGNORE = "ignore"
+RULE_EXACT = "exact"
+RULE_RANGE = "range"
+RULE_REGEX = "regex"
+RULE_TOLERANCE = "tolerance"
+
+_MISSING = object()
+
+def normalize(value):
+    '''Identify Controller strings are space padded; compare them without the padding'''
+    return value.strip() if isinstance(value, str) else value
+
+class CompiledBaseline(object):
+    '''Baseline compiled into one flat list per rule type, so a comparison is a few tight loops
+    Atributes:
+            name (str): Baseline file the rules come from
+            exact (tuple): (field, value) pairs compared for equality
+            ranges (tuple): (field, min, max) inclusive bounds (None for an open bound)
+            regexes (tuple): (field, compiled pattern) that must fully match
+            tolerances (tuple): (field, value, allowed deviation)
+            ignored (frozenset): Fields that are never compared'''
+
+    __slots__ = ("name", "exact", "ranges", "regexes", "tolerances", "ignored")
+
+    def __init__(self, name, fields, rules):
+        '''Compile the expected fields and their rules
+        Args:
+            name (str): Baseline name used in messages
+            fields (dict): Expected Identify Controller values
+            rules (dict): Field -> rule ("ignore", "exact" or a dict with a "rule" key)'''
+
+        self.name = name
+        exact, ranges, regexes, tolerances, ignored = [], [], [], [], set()
+
+        for field in list(fields) + [field for field in rules if field not in fields]:
+            rule = rules.get(field, RULE_EXACT)
+            if isinstance(rule, str):
+                rule = {"rule": rule}
+            kind = rule.get("rule", RULE_EXACT)
+
+            if kind == RULE_IGNORE:
+                ignored.add(field)
+            elif kind == RULE_EXACT:
+                exact.append((field, normalize(rule.get("value", fields.get(field)))))
+            elif kind == RULE_RANGE:
+                ranges.append((field, rule.get("min"), rule.get("max")))
+            elif kind == RULE_REGEX:
+                regexes.append((field, re.compile(rule["pattern"])))
+            elif kind == RULE_TOLERANCE:
+                value = rule.get("value", fields.get(field))
+                #Allowed deviation: absolute part plus a fraction of the expected value
+                tolerances.append((field, value, rule.get("abs", 0) + abs(value) * rule.get("rel", 0)))
+            else:
+                raise ValueError(f"{name}: unknown rule '{kind}' for field '{field}'")
+
+        self.exact = tuple(exact)
+        self.ranges = tuple(ranges)
+        self.regexes = tuple(regexes)
+        self.tolerances = tuple(tolerances)
+        self.ignored = frozenset(ignored)
+
+    def __getstate__(self):
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+    def __setstate__(self, state):
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
+    def compare(self, found):
+        '''Compare an Identify Controller dictionary against the baseline in one pass
+        Args:
+            found (dict): Values reported by the drive
+        Returns:
+            list: One {"field", "rule", "expected", "found"} dict per mismatch (empty if it matches)'''
+
+        mismatches = []
+        for field, expected in self.exact:
+            value = normalize(found.get(field, _MISSING))
+            if value != expected:
+                mismatches.append({"field": field, "rule": RULE_EXACT, "expected": expected, "found": value})
+
+        for field, low, high in self.ranges:
+            value = found.get(field, _MISSING)
+            if value is _MISSING or (low is not None and value < low) or (high is not None and value > high):
+                mismatches.append({"field": field, "rule": RULE_RANGE, "expected": f"[{low}, {high}]",
+                                   "found": value})
+
+        for field, pattern in self.regexes:
+            value = found.get(field, _MISSING)
+            if value is _MISSING or not pattern.fullmatch(normalize(str(value))):
+                mismatches.append({"field": field, "rule": RULE_REGEX, "expected": pattern.pattern,
+                                   "found": value})
+
+        for field, expected, deviation in self.tolerances:
+            value = found.get(field, _MISSING)
+            if value is _MISSING or abs(value - expected) > deviation:
+                mismatches.append({"field": field, "rule": RULE_TOLERANCE,
+                                   "expected": f"{expected} +/- {deviation:g}", "found": value})
+
+        for mismatch in mismatches:
+            if mismatch["found"] is _MISSING:
+                mismatch["found"] = "<missing>"
+        return mismatches
+
+class BaselineStore(object):
+    '''Golden Identify Controller baselines keyed by model number and firmware revision
+    Every JSON file in the baseline directory holds:
+        "match":  {"mn": ..., "fr": ...}   (omit "fr" for a baseline shared by every firmware)
+        "fields": expected Identify Controller values (compared exactly unless a rule says otherwise)
+        "rules":  field -> "ignore" | "exact" | {"rule": "range", "min", "max"}
+                  | {"rule": "regex", "pattern"} | {"rule": "tolerance", "rel", "abs"}
+    The compiled baselines are cached with pickle next to the files and rebuilt when a file changes.
+    Atributes:
+            baseline_dir (str): Directory holding the baseline files
+            logger (obj): Logger instance
+            cache_path (str): Compiled cache file'''
+
+    def __init__(self, logger, baseline_dir=BASELINE_DIR, cache_path=None):
+        '''Initializes the store (the baselines are loaded on the first lookup)
+        Args:
+            logger (obj): Logger instance
+            baseline_dir (str): Directory holding the baseline files
+            cache_path (str): Compiled cache file (defaults to a hidden file in baseline_dir)'''
+
+        self.logger = logger
+        self.baseline_dir = baseline_dir
+        self.cache_path = cache_path or os.path.join(baseline_dir, CACHE_FILE_NAME)
+        self._baselines = None
+
+    def _signature(self):
+        '''Name, size and modification time of every baseline file, to validate the cache'''
+        signature = []
+        try:
+            for entry in os.scandir(self.baseline_dir):
+                if entry.name.endswith(".json") and entry.is_file():
+                    stat = entry.stat()
+                    signature.append((entry.name, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            pass
+        return sorted(signature)
+
+    def _compile(self, signature):
+        '''Compile every baseline file; files with errors are reported and skipped'''
+        baselines = {}
+        for name, _, _ in signature:
+            try:
+                with open(os.path.join(self.baseline_dir, name), 'r') as baseline_file:
+                    baseline = json.load(baseline_file)
+                match = baseline["match"]
+                key = (normalize(match["mn"]), normalize(match.get("fr")))
+                if key in baselines:
+                    self.logger.error(f"Baseline {name} duplicates {baselines[key].name}, ignoring it")
+                    continue
+                baselines[key] = CompiledBaseline(name, baseline.get("fields", {}), baseline.get("rules", {}))
+            except (OSError, ValueError, KeyError, TypeError, re.error) as ex:
+                self.logger.error(f"Invalid baseline {name}: {ex}")
+        return baselines
+
+    def load(self):
+        '''Load the compiled baselines from the cache, compiling them again if a file changed
+        Returns:
+            dict: (model, firmware or None) -> CompiledBaseline'''
+        signature = self._signature()
+        try:
+            with open(self.cache_path, 'rb') as cache_file:
+                cached = pickle.load(cache_file)
+            if cached["version"] == CACHE_VERSION and cached["signature"] == signature:
+                self._baselines = cached["baselines"]
+                return self._baselines
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError, AttributeError, TypeError):
+            pass
+
+        self._baselines = self._compile(signature)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as cache_file:
+                pickle.dump({"version": CACHE_VERSION, "signature": signature, "baselines": self._baselines},
+                            cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_path)
+        except OSError as ex:
+            self.logger.debug(f"Baseline cache not written: {ex}")
+        return self._baselines
+
+    def lookup(self, model, firmware):
+        '''Baseline of a drive: the model and firmware one, else the model-wide one
+        Args:
+            model (str): Model number (mn)
+            firmware (str): Firmware revision (fr)
+        Returns:
+            CompiledBaseline: The baseline, or None if the model has none'''
+        if self._baselines is None:
+            self.load()
+        model, firmware = normalize(model), normalize(firmware)
+        return self._baselines.get((model, firmware)) or self._baselines.get((model, None))
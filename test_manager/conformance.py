@@ -0,0 +1,286 @@
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from nvme.admin_passthru_wrapper import IDENTIFY_DATA_SIZE_BYTES
+from test_manager.baseline_store import BaselineStore, CompiledBaseline, normalize
+
+#SMART / Health Information log page size
+SMART_LOG_SIZE_BYTES = 512
+
+def _layout(fields, itemsize):
+    '''Build a structured dtype from (name, format, byte offset) tuples of a page layout'''
+    return np.dtype({"names": [name for name, _, _ in fields],
+                     "formats": [fmt for _, fmt, _ in fields],
+                     "offsets": [offset for _, _, offset in fields],
+                     "itemsize": itemsize})
+
+#Identify Controller data structure; names follow the nvme-cli JSON keys used by the baselines.
+#128-bit fields keep their low 64 bits, which covers every real capacity.
+ID_CTRL_DTYPE = _layout([
+    ("vid", "<u2", 0), ("ssvid", "<u2", 2), ("sn", "S20", 4), ("mn", "S40", 24), ("fr", "S8", 64),
+    ("rab", "u1", 72), ("ieee", "u1", 73), ("ieee1", "u1", 74), ("ieee2", "u1", 75), ("cmic", "u1", 76),
+    ("mdts", "u1", 77), ("cntlid", "<u2", 78), ("ver", "<u4", 80), ("rtd3r", "<u4", 84), ("rtd3e", "<u4", 88),
+    ("oaes", "<u4", 92), ("ctratt", "<u4", 96), ("rrls", "<u2", 100), ("cntrltype", "u1", 111),
+    ("crdt1", "<u2", 128), ("crdt2", "<u2", 130), ("crdt3", "<u2", 132), ("nvmsr", "u1", 253),
+    ("vwci", "u1", 254), ("mec", "u1", 255), ("oacs", "<u2", 256), ("acl", "u1", 258), ("aerl", "u1", 259),
+    ("frmw", "u1", 260), ("lpa", "u1", 261), ("elpe", "u1", 262), ("npss", "u1", 263), ("avscc", "u1", 264),
+    ("apsta", "u1", 265), ("wctemp", "<u2", 266), ("cctemp", "<u2", 268), ("mtfa", "<u2", 270),
+    ("hmpre", "<u4", 272), ("hmmin", "<u4", 276), ("tnvmcap", "<u8", 280), ("unvmcap", "<u8", 296),
+    ("rpmbs", "<u4", 312), ("edstt", "<u2", 316), ("dsto", "u1", 318), ("fwug", "u1", 319), ("kas", "<u2", 320),
+    ("hctma", "<u2", 322), ("mntmt", "<u2", 324), ("mxtmt", "<u2", 326), ("sanicap", "<u4", 328),
+    ("hmminds", "<u4", 332), ("hmmaxd", "<u2", 336), ("nsetidmax", "<u2", 338), ("endgidmax", "<u2", 340),
+    ("anatt", "u1", 342), ("anacap", "u1", 343), ("anagrpmax", "<u4", 344), ("nanagrpid", "<u4", 348),
+    ("pels", "<u4", 352), ("domainid", "<u2", 356), ("megcap", "<u8", 368), ("sqes", "u1", 512),
+    ("cqes", "u1", 513), ("maxcmd", "<u2", 514), ("nn", "<u4", 516), ("oncs", "<u2", 520), ("fuses", "<u2", 522),
+    ("fna", "u1", 524), ("vwc", "u1", 525), ("awun", "<u2", 526), ("awupf", "<u2", 528), ("icsvscc", "u1", 530),
+    ("nwpc", "u1", 531), ("acwu", "<u2", 532), ("ocfs", "<u2", 534), ("sgls", "<u4", 536), ("mnan", "<u4", 540),
+    ("maxdna", "<u8", 544), ("maxcna", "<u4", 560), ("oaqd", "<u4", 564), ("subnqn", "S256", 768),
+    ("ioccsz", "<u4", 1792), ("iorcsz", "<u4", 1796), ("icdoff", "<u2", 1800), ("fcatt", "u1", 1802),
+    ("msdbd", "u1", 1803), ("ofcs", "<u2", 1804),
+], IDENTIFY_DATA_SIZE_BYTES)
+
+#SMART / Health Information log page; names follow AdminCommands._parse_smart_log
+SMART_DTYPE = _layout([
+    ("cw", "u1", 0), ("ctemp", "<u2", 1), ("avsp", "u1", 3), ("avspt", "u1", 4), ("pused", "u1", 5),
+    ("dur", "<u8", 32), ("duw", "<u8", 48), ("hrc", "<u8", 64), ("hwc", "<u8", 80), ("cbt", "<u8", 96),
+    ("pwrc", "<u8", 112), ("poh", "<u8", 128), ("upl", "<u8", 144), ("mdie", "<u8", 160), ("neile", "<u8", 176),
+    ("wctt", "<u4", 192), ("cctt", "<u4", 196),
+], SMART_LOG_SIZE_BYTES)
+
+#Health rules applied to every SMART page (same thresholds as TestSmartLog)
+DEFAULT_SMART_RULES = {
+    "cw": {"rule": "exact", "value": 0},
+    "mdie": {"rule": "exact", "value": 0},
+    "poh": {"rule": "range", "max": 999},
+    "pused": {"rule": "range", "max": 99},
+}
+
+def decode_pages(pages, dtype):
+    '''Decode raw pages into a structured array without a per-page Python loop
+    Args:
+        pages (bytes|list|np.ndarray): Concatenated pages, a list of pages or an (n, page size) uint8 array
+        dtype (np.dtype): Page layout (ID_CTRL_DTYPE or SMART_DTYPE)
+    Returns:
+        np.ndarray: One record per page'''
+
+    if isinstance(pages, np.ndarray):
+        return np.ascontiguousarray(pages, dtype=np.uint8).reshape(-1).view(dtype)
+    if isinstance(pages, (list, tuple)):
+        pages = b"".join(pages)
+    return np.frombuffer(pages, dtype=dtype)
+
+def encode_page(values, dtype):
+    '''Build a raw page from a dictionary of field values (e.g. a baseline), mostly for benchmarks
+    Args:
+        values (dict): Field values; fields missing from the layout are ignored
+        dtype (np.dtype): Page layout
+    Returns:
+        bytes: The page'''
+
+    record = np.zeros(1, dtype=dtype)
+    for name in dtype.names:
+        if name == "ieee" and "ieee" in values:
+            #The IEEE OUI is 3 bytes long, little endian
+            record["ieee"], record["ieee1"], record["ieee2"] = (values["ieee"] >> (8 * i) & 0xFF for i in range(3))
+        elif name in values and not name.startswith("ieee"):
+            value = values[name]
+            record[name] = value.encode() if isinstance(value, str) else value
+    return record.tobytes()
+
+class _Columns(object):
+    '''Decoded columns of a batch, converted once and shared by every rule'''
+
+    def __init__(self, records):
+        self.records = records
+        self._cache = {}
+
+    def __contains__(self, field):
+        return field in self.records.dtype.names
+
+    def __getitem__(self, field):
+        if field not in self._cache:
+            if field == "ieee":
+                column = (self.records["ieee"].astype(np.uint32) | self.records["ieee1"].astype(np.uint32) << 8
+                          | self.records["ieee2"].astype(np.uint32) << 16)
+            elif self.records.dtype[field].kind == "S":
+                #Strings are space padded like the nvme-cli output; compare them stripped
+                column = np.char.strip(self.records[field])
+            else:
+                column = self.records[field]
+            self._cache[field] = column
+        return self._cache[field]
+
+def evaluate(baseline, columns, rows):
+    '''Evaluate every rule of a baseline over some rows of a batch as column operations
+    Args:
+        baseline (CompiledBaseline): Compiled rules
+        columns (_Columns): Decoded batch
+        rows (np.ndarray): Indices of the rows using this baseline
+    Returns:
+        dict: Field -> boolean mismatch vector over rows; fields missing from the layout are skipped'''
+
+    failed = {}
+    for field, expected in baseline.exact:
+        if field in columns and not isinstance(expected, (list, dict)):
+            column = columns[field][rows]
+            expected = normalize(expected)
+            failed[field] = column != (expected.encode() if isinstance(expected, str) else expected)
+
+    for field, low, high in baseline.ranges:
+        if field in columns:
+            column = columns[field][rows]
+            mismatch = np.zeros(len(rows), dtype=bool)
+            if low is not None:
+                mismatch |= column < low
+            if high is not None:
+                mismatch |= column > high
+            failed[field] = mismatch
+
+    for field, pattern in baseline.regexes:
+        if field in columns:
+            #Evaluate the regex once per distinct value and broadcast the result back
+            values, inverse = np.unique(columns[field][rows], return_inverse=True)
+            matched = np.array([bool(pattern.fullmatch(value.decode(errors='replace') if isinstance(value, bytes)
+                                                       else str(value))) for value in values], dtype=bool)
+            failed[field] = ~matched[inverse.reshape(-1)]
+
+    for field, expected, deviation in baseline.tolerances:
+        if field in columns:
+            failed[field] = np.abs(columns[field][rows].astype(np.float64) - expected) > deviation
+    return failed
+
+def check_conformance(id_ctrl_pages, store, smart_pages=None, smart_rules=DEFAULT_SMART_RULES):
+    '''Check many drives against their golden baselines (and SMART health rules) in one batch
+    Args:
+        id_ctrl_pages: Raw Identify Controller pages (see decode_pages)
+        store (BaselineStore): Baselines keyed by model and firmware
+        smart_pages: Raw SMART pages in the same drive order, or None
+        smart_rules (dict): Rules applied to every SMART page (baseline file "rules" format)
+    Returns:
+        dict: "serials", "fields" (matrix columns, SMART ones prefixed with 'smart.'), "matrix"
+              (drives x fields, True = mismatch), "mismatches" per drive, "field_failures" per field,
+              "baselines" name per drive (None = no baseline), "no_baseline" row indices'''
+
+    records = decode_pages(id_ctrl_pages, ID_CTRL_DTYPE)
+    columns = _Columns(records)
+    count = len(records)
+
+    #Group the drives by model and firmware so each baseline is evaluated once over its rows
+    keys = np.empty(count, dtype=[("mn", columns["mn"].dtype), ("fr", columns["fr"].dtype)])
+    keys["mn"], keys["fr"] = columns["mn"], columns["fr"]
+    groups, group_of = np.unique(keys, return_inverse=True)
+    group_of = group_of.reshape(-1)
+
+    failures = {}
+    baseline_names = np.full(count, None, dtype=object)
+    for index, key in enumerate(groups):
+        model, firmware = key["mn"].decode(errors='replace'), key["fr"].decode(errors='replace')
+        rows = np.flatnonzero(group_of == index)
+        baseline = store.lookup(model, firmware)
+        if baseline is None:
+            continue
+        baseline_names[rows] = baseline.name
+        for field, mismatch in evaluate(baseline, columns, rows).items():
+            failures.setdefault(field, np.zeros(count, dtype=bool))[rows] = mismatch
+
+    if smart_pages is not None:
+        smart_columns = _Columns(decode_pages(smart_pages, SMART_DTYPE))
+        health = CompiledBaseline("smart", {}, smart_rules)
+        for field, mismatch in evaluate(health, smart_columns, np.arange(count)).items():
+            failures[f"smart.{field}"] = mismatch
+
+    fields = sorted(failures)
+    matrix = np.column_stack([failures[field] for field in fields]) if fields else np.zeros((count, 0), dtype=bool)
+    return {
+        "serials": np.char.decode(columns["sn"], errors='replace'),
+        "fields": fields,
+        "matrix": matrix,
+        "mismatches": matrix.sum(axis=1),
+        "field_failures": dict(zip(fields, matrix.sum(axis=0).tolist())),
+        "baselines": baseline_names,
+        "no_baseline": np.flatnonzero(np.equal(baseline_names, None)),
+    }
+
+def summarize(report, logger=None):
+    '''Log (or print) one line per failing drive and the most frequently failing fields
+    Args:
+        report (dict): Result of check_conformance
+        logger (obj): Logger instance, or None to print
+    Returns:
+        int: Number of drives that do not conform'''
+
+    emit = logger.info if logger else print
+    failing = np.flatnonzero((report["mismatches"] > 0) | np.equal(report["baselines"], None))
+    for row in failing:
+        if report["baselines"][row] is None:
+            emit(f"{report['serials'][row]}: no baseline")
+            continue
+        fields = [report["fields"][column] for column in np.flatnonzero(report["matrix"][row])]
+        emit(f"{report['serials'][row]}: {len(fields)} mismatches: {', '.join(fields)}")
+
+    worst = sorted(report["field_failures"].items(), key=lambda item: -item[1])[:10]
+    emit(f"{len(report['serials']) - len(failing)}/{len(report['serials'])} drives conform; "
+         f"most failed fields: {', '.join(f'{field} ({failures})' for field, failures in worst if failures)}")
+    return len(failing)
+
+def benchmark(count=10000, store=None, seed=0):
+    '''Compare the batch check with the per-dictionary loop of TestIdCtrl on synthetic drives
+    Pages are encoded from the first baseline of the store with a few random deviations.
+    Args:
+        count (int): Number of drives
+        store (BaselineStore): Baselines (the tests/baselines store if None)
+        seed (int): Random seed
+    Returns:
+        dict: Seconds for decode+check in batch, for the dictionary loop, and mismatches found by each'''
+
+    store = store or BaselineStore(logging.getLogger("conformance"))
+    (model, firmware), baseline = next(iter(store.load().items()))
+    with open(os.path.join(store.baseline_dir, baseline.name), 'r') as baseline_file:
+        fields = json.load(baseline_file)["fields"]
+
+    template = np.frombuffer(encode_page(fields, ID_CTRL_DTYPE), dtype=np.uint8)
+    raw = np.tile(template, (count, 1))
+    #Deviate a few fields on some drives: mdts on 1%, wctemp on 0.5%
+    records = raw.reshape(-1).view(ID_CTRL_DTYPE)
+    rng = np.random.default_rng(seed)
+    records["mdts"][rng.random(count) < 0.01] += 1
+    records["wctemp"][rng.random(count) < 0.005] += 5
+    smart = np.zeros((count, SMART_LOG_SIZE_BYTES), dtype=np.uint8)
+
+    start = time.perf_counter()
+    report = check_conformance(raw, store, smart_pages=smart)
+    batch_seconds = time.perf_counter() - start
+
+    #Reference: the per-dictionary comparison (dictionaries built outside the timed section)
+    dicts = []
+    for record in records:
+        values = {name: (record[name].decode().strip() if isinstance(record[name], bytes) else record[name].item())
+                  for name in ID_CTRL_DTYPE.names if not name.startswith("ieee")}
+        values["ieee"] = int(record["ieee"]) | int(record["ieee1"]) << 8 | int(record["ieee2"]) << 16
+        dicts.append(values)
+    start = time.perf_counter()
+    loop_mismatches = sum(1 for values in dicts
+                          if [m for m in store.lookup(values["mn"], values["fr"]).compare(values)
+                              if m["field"] in ID_CTRL_DTYPE.names])
+    loop_seconds = time.perf_counter() - start
+
+    return {"count": count, "batch_seconds": batch_seconds, "loop_seconds": loop_seconds,
+            "batch_failing": int((report["mismatches"] > 0).sum()), "loop_failing": loop_mismatches}
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch Identify Controller / SMART conformance")
+    parser.add_argument("--benchmark", type=int, default=10000, help="Number of synthetic drives")
+    args = parser.parse_args()
+
+    result = benchmark(args.benchmark)
+    print(f"{result['count']} drives: batch {result['batch_seconds'] * 1000:.1f} ms "
+          f"({result['batch_failing']} failing), per-dict loop {result['loop_seconds'] * 1000:.1f} ms "
+          f"({result['loop_failing']} failing)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+import argparse
+import itertools
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+import time
+
+from nvme.nvme_wrapper import NvmeCommands
+from logger.log_manager import LogManager
+from logger.results_store import ResultsStore
+from test_manager.baseline_store import BaselineStore
+from test_manager.fleet import discover_devices
+from test_manager.test_manager import TestManager, tests_pool
+
+#Unix domain socket the daemon listens on
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), "nvme-test-runner.sock")
+#An unknown serial number triggers a new discovery at most this often
+DISCOVERY_REFRESH_SECONDS = 5.0
+
+#Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+
+class Job(object):
+    '''Test job submitted to the daemon
+    Atributes:
+            job_id (int): Job identifier
+            serial_number (str): SSD's serial number
+            testname (str): Name of the test case
+            device_path (str): Device path given by the client (None to use the discovery index)
+            state (str): queued, running or done
+            result (dict): Final result message once done
+            messages (Queue): Progress and result messages streamed to the client'''
+
+    def __init__(self, job_id, serial_number, testname, device_path=None):
+        self.job_id = job_id
+        self.serial_number = serial_number
+        self.testname = testname
+        self.device_path = device_path
+        self.state = JOB_QUEUED
+        self.result = None
+        self.submitted = time.time()
+        self.messages = queue.Queue()
+
+    def summary(self):
+        '''Job state as a JSON-serializable dictionary'''
+        return {"job": self.job_id, "serial": self.serial_number, "test": self.testname, "state": self.state,
+                "submitted": self.submitted, "verdict": self.result.get("verdict") if self.result else None}
+
+class _JobLogHandler(logging.Handler):
+    '''Forwards the log records of a running job to its client'''
+
+    def __init__(self, job):
+        super().__init__()
+        self.job = job
+
+    def emit(self, record):
+        self.job.messages.put({"type": "log", "job": self.job.job_id, "time": record.created,
+                               "level": record.levelname, "message": record.getMessage()})
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    '''One client connection: a JSON request per line, JSON messages per line back'''
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as ex:
+                self.send({"type": "error", "message": f"Invalid request: {ex}"})
+                continue
+            try:
+                for message in self.server.daemon.handle(request):
+                    self.send(message)
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+    def send(self, message):
+        self.wfile.write(json.dumps(message).encode() + b"\n")
+        self.wfile.flush()
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+class RunnerDaemon(object):
+    '''Long-lived test runner: keeps the test infrastructure warm and runs jobs sent over a Unix socket
+    Test modules, the device discovery index, the compiled baselines and the results store are
+    loaded once, so a job only pays for its own LogManager and wrappers. Jobs run one at a time
+    in submission order; their log lines and result are streamed back to the submitting client.
+    Protocol (one JSON object per line):
+        {"op": "run", "serial": ..., "test": ..., "device": optional} -> accepted, log..., result
+        {"op": "status"}                                              -> status (jobs, devices, tests)
+        {"op": "devices", "refresh": bool}                            -> devices
+        {"op": "shutdown"}                                            -> bye
+    Atributes:
+            socket_path (str): Unix domain socket path
+            logger (obj): Daemon logger
+            results (obj): ResultsStore shared by every job
+            baselines (obj): BaselineStore shared by every job
+            devices (dict): Serial number -> controller path discovery index'''
+
+    def __init__(self, socket_path=DEFAULT_SOCKET_PATH, console=True):
+        '''Initializes the daemon and warms up its caches
+        Args:
+            socket_path (str): Unix domain socket path
+            console (bool): Whether the daemon log is also printed to the console'''
+
+        self.socket_path = socket_path
+        self.log_manager = LogManager("runner_daemon", console=console)
+        self.logger = self.log_manager.get_logger()
+        self.nvme = NvmeCommands(None, self.logger)
+        self.results = ResultsStore(logger=self.logger)
+        self.baselines = BaselineStore(self.logger)
+        self.devices = {}
+        self.jobs = {}
+        self.server = None
+        self._discovered = 0
+        self._job_ids = itertools.count(1)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+
+        #Warm up: test catalog (and modules), baselines and discovery index
+        for name in tests_pool.names():
+            tests_pool.get(name)
+        self.baselines.load()
+        self.refresh_devices()
+
+    def refresh_devices(self):
+        '''Rediscover the drives
+        Returns:
+            dict: Serial number -> controller path'''
+        devices = discover_devices(self.nvme)
+        with self._lock:
+            self.devices = devices
+            self._discovered = time.monotonic()
+        self.logger.info(f"{len(devices)} drives discovered")
+        return devices
+
+    def device_path(self, serial_number):
+        '''Controller path of a serial number from the index, rediscovering on a miss (rate limited)
+        Args:
+            serial_number (str): SSD's serial number
+        Returns:
+            str: Controller path, or None if the drive is not present'''
+        path = self.devices.get(serial_number)
+        if path is None and time.monotonic() - self._discovered >= DISCOVERY_REFRESH_SECONDS:
+            path = self.refresh_devices().get(serial_number)
+        return path
+
+    def submit(self, serial_number, testname, device_path=None):
+        '''Queue a test job
+        Args:
+            serial_number (str): SSD's serial number
+            testname (str): Name of the test case
+            device_path (str): Optional device path that skips the discovery index
+        Returns:
+            Job: The queued job'''
+        job = Job(next(self._job_ids), serial_number, testname, device_path)
+        with self._lock:
+            self.jobs[job.job_id] = job
+        self._queue.put(job)
+        return job
+
+    def _worker(self):
+        '''Run the queued jobs one at a time'''
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            job.state = JOB_RUNNING
+            try:
+                job.result = self.run_job(job)
+            except Exception as ex:
+                self.logger.error(f"Job {job.job_id} failed: {ex}")
+                job.result = {"type": "result", "job": job.job_id, "verdict": None, "error": str(ex)}
+            job.state = JOB_DONE
+            job.messages.put(job.result)
+
+    def run_job(self, job):
+        '''Run a job through a TestManager that reuses the warm infrastructure
+        Args:
+            job (Job): Job to run
+        Returns:
+            dict: Result message (verdict, errors, log file, run id, timings)'''
+        start = time.perf_counter()
+        device_path = job.device_path or self.device_path(job.serial_number)
+        if device_path is None:
+            return {"type": "result", "job": job.job_id, "verdict": None,
+                    "error": f"Device with SN {job.serial_number} not found."}
+
+        manager = TestManager(job.serial_number, job.testname, device_path=device_path, results=self.results,
+                              resources={"baseline_store": self.baselines})
+        handler = _JobLogHandler(job)
+        manager.logger.addHandler(handler)
+        setup = time.perf_counter() - start
+        verdict = None
+        try:
+            if manager.test is None:
+                return {"type": "result", "job": job.job_id, "verdict": None, "error": "Unable to initialize",
+                        "log": manager.log_manager.log_file_path}
+            verdict = manager.execute()
+        finally:
+            manager.logger.removeHandler(handler)
+            manager.close()
+
+        return {"type": "result", "job": job.job_id, "verdict": verdict,
+                "errors": manager.test.errors, "run_id": manager.run_id,
+                "log": manager.log_manager.log_file_path, "setup_ms": setup * 1000,
+                "seconds": time.perf_counter() - start}
+
+    def handle(self, request):
+        '''Handle one client request
+        Args:
+            request (dict): Decoded request
+        Yields:
+            dict: Messages for the client'''
+        op = request.get("op")
+        if op == "run":
+            if not request.get("serial") or not request.get("test"):
+                yield {"type": "error", "message": "'serial' and 'test' are required"}
+                return
+            job = self.submit(request["serial"], request["test"], request.get("device"))
+            yield {"type": "accepted", "job": job.job_id, "queued": self._queue.qsize()}
+            #Stream the job messages until its result
+            while True:
+                message = job.messages.get()
+                yield message
+                if message["type"] == "result":
+                    return
+        elif op == "status":
+            with self._lock:
+                jobs = [job.summary() for job in self.jobs.values()]
+            yield {"type": "status", "jobs": jobs, "devices": self.devices, "tests": tests_pool.names()}
+        elif op == "devices":
+            devices = self.refresh_devices() if request.get("refresh") else self.devices
+            yield {"type": "devices", "devices": devices}
+        elif op == "shutdown":
+            yield {"type": "bye"}
+            threading.Thread(target=self.shutdown, daemon=True).start()
+        else:
+            yield {"type": "error", "message": f"Unknown op: {op}"}
+
+    def serve_forever(self):
+        '''Listen on the Unix socket until shutdown() is called'''
+        #A socket left behind by a crashed daemon is replaced; a live daemon is not
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+                probe.close()
+                raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.remove(self.socket_path)
+            finally:
+                probe.close()
+
+        worker = threading.Thread(target=self._worker, name="runner-jobs", daemon=True)
+        worker.start()
+        self.server = _Server(self.socket_path, _RequestHandler)
+        self.server.daemon = self
+        os.chmod(self.socket_path, 0o660)
+        self.logger.info(f"Runner daemon listening on {self.socket_path}")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            self._queue.put(None)
+            worker.join()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+            self.results.close()
+            self.log_manager.close()
+
+    def shutdown(self):
+        '''Stop serving (the job being run is finished first)'''
+        if self.server:
+            self.server.shutdown()
+
+def request(message, socket_path=DEFAULT_SOCKET_PATH):
+    '''Send one request to the daemon
+    Args:
+        message (dict): Request
+        socket_path (str): Unix domain socket path
+    Yields:
+        dict: Messages sent back by the daemon'''
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        client.connect(socket_path)
+        client.sendall(json.dumps(message).encode() + b"\n")
+        client.shutdown(socket.SHUT_WR)
+        with client.makefile('rb') as replies:
+            for line in replies:
+                yield json.loads(line)
+
+def run_test(serial_number, testname, device_path=None, socket_path=DEFAULT_SOCKET_PATH, output=print):
+    '''Run a test through the daemon, printing its log lines as they arrive
+    Args:
+        serial_number (str): SSD's serial number
+        testname (str): Name of the test case
+        device_path (str): Optional device path that skips the discovery index
+        socket_path (str): Unix domain socket path
+        output (callable): Called with every log line
+    Returns:
+        dict: Result message (None if the daemon closed the connection early)'''
+    message = {"op": "run", "serial": serial_number, "test": testname, "device": device_path}
+    for reply in request(message, socket_path):
+        if reply["type"] == "log":
+            output(f"{reply['level']} - {reply['message']}")
+        elif reply["type"] == "error":
+            output(f"ERROR {reply['message']}")
+            return None
+        elif reply["type"] == "result":
+            return reply
+    return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-lived test runner daemon and its client")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Unix domain socket path")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    subparsers.add_parser("serve", help="Run the daemon")
+    run = subparsers.add_parser("run", help="Run a test through the daemon")
+    run.add_argument("serial_number", help="SSD's serial number to test")
+    run.add_argument("testname", help="Testname")
+    run.add_argument("--device", default=None, help="Device path to use instead of the discovery index")
+    subparsers.add_parser("status", help="Show the jobs, drives and tests known to the daemon")
+    devices = subparsers.add_parser("devices", help="Show the discovered drives")
+    devices.add_argument("--refresh", action="store_true", help="Rediscover the drives first")
+    subparsers.add_parser("shutdown", help="Stop the daemon")
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        RunnerDaemon(args.socket).serve_forever()
+    elif args.command == "run":
+        result = run_test(args.serial_number, args.testname, args.device, args.socket)
+        if result is None:
+            sys.exit(2)
+        if result.get("error"):
+            print(f"ERROR {result['error']}")
+        else:
+            print(f"TEST {result['verdict']} ({result['errors']} errors), log: {result['log']}, "
+                  f"setup {result['setup_ms']:.1f} ms, total {result['seconds']:.1f} s")
+        sys.exit(0 if result.get("verdict") == "PASSED" else 1)
+    elif args.command in ("status", "devices", "shutdown"):
+        message = {"op": args.command}
+        if args.command == "devices":
+            message["refresh"] = args.refresh
+        for reply in request(message, args.socket):
+            print(json.dumps(reply, indent=2))
+
+if __name__ == "__main__":
+    main()
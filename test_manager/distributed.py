@@ -0,0 +1,578 @@
+import argparse
+import heapq
+import hmac
+import ipaddress
+import itertools
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from nvme.nvme_wrapper import NvmeCommands
+from logger.log_manager import LogManager
+from test_manager.fleet import discover_devices
+from test_manager.scheduler import DEFAULT_MAX_SHARED, Scheduler, TestManagerRunner
+
+#Coordinator TCP address: only local clients unless opened to the test floor with --host
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 7600
+#Shared token every worker and client sends in its first message (required off localhost)
+TOKEN_ENV = "NVME_TEST_TOKEN"
+TOKEN_FILE_ENV = "NVME_TEST_TOKEN_FILE"
+#Workers send a heartbeat this often; a worker silent for the timeout is considered dead
+HEARTBEAT_SECONDS = 2.0
+HEARTBEAT_TIMEOUT_SECONDS = 10.0
+#Jobs sent at once to a drive (the worker scheduler enforces the shared/exclusive access)
+DEFAULT_DRIVE_SLOTS = 2
+#A job is given up after being requeued this many times
+MAX_ATTEMPTS = 3
+#A queued job fails when no connected worker has a matching drive for this long
+DEFAULT_ORPHAN_SECONDS = 300.0
+
+#Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+
+def parse_address(address):
+    '''Split "host:port" (the port defaults to DEFAULT_PORT)
+    Args:
+        address (str): Coordinator address
+    Returns:
+        tuple: (host, port)'''
+    host, _, port = address.rpartition(":") if ":" in address else (address, None, None)
+    return host or "localhost", int(port) if port else DEFAULT_PORT
+
+def load_token(token=None, token_file=None):
+    '''Shared token of the test floor: the argument, else the token file, else the environment
+    (NVME_TEST_TOKEN, or the file named by NVME_TEST_TOKEN_FILE)
+    Args:
+        token (str): Token given explicitly
+        token_file (str): File holding the token
+    Returns:
+        str: Token, None if none is configured'''
+    if token:
+        return token
+    token_file = token_file or os.environ.get(TOKEN_FILE_ENV)
+    if token_file:
+        with open(token_file, 'r') as file:
+            return file.read().strip() or None
+    return os.environ.get(TOKEN_ENV) or None
+
+def _is_loopback(host):
+    '''Whether a listening address only accepts local connections'''
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+class Connection(object):
+    '''Newline-delimited JSON messages over a socket; sends are safe from several threads'''
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.reader = sock.makefile('rb')
+        self._send_lock = threading.Lock()
+
+    def send(self, message):
+        data = json.dumps(message).encode() + b"\n"
+        with self._send_lock:
+            self.sock.sendall(data)
+
+    def receive(self):
+        '''Next message, None once the peer closed the connection'''
+        line = self.reader.readline()
+        return json.loads(line) if line else None
+
+    def close(self):
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.reader.close()
+        self.sock.close()
+
+class DistributedJob(object):
+    '''Job queued in the coordinator
+    Atributes:
+            job_id (int): Job identifier
+            testname (str): Name of the test case
+            serial_number (str): Drive the job is pinned to, None for any drive
+            model (str): Model a floating job is restricted to
+            priority (int): Higher priorities run first
+            attempts (int): Times the job was assigned to a worker
+            worker (str): Worker running (or that ran) the job
+            drive (str): Serial number of the drive the job was assigned to
+            state (str): queued, running or done
+            result (dict): Result reported by the worker'''
+
+    def __init__(self, job_id, testname, serial_number=None, model=None, priority=0, client=None):
+        self.job_id = job_id
+        self.testname = testname
+        self.serial_number = serial_number
+        self.model = model
+        self.priority = priority
+        self.attempts = 0
+        self.worker = None
+        self.drive = None
+        self.state = JOB_QUEUED
+        self.result = None
+        self.client = client
+        #Since when no connected worker has a matching drive (None while one has)
+        self.orphaned_since = None
+
+    def sort_key(self):
+        return (-self.priority, self.job_id)
+
+    def summary(self):
+        return {"job": self.job_id, "test": self.testname, "serial": self.drive or self.serial_number,
+                "worker": self.worker, "state": self.state, "attempts": self.attempts, "result": self.result}
+
+class _Worker(object):
+    '''Coordinator side state of a connected worker'''
+
+    def __init__(self, name, connection, drives):
+        self.name = name
+        self.connection = connection
+        #Serial number -> model number
+        self.drives = drives
+        #Serial number -> jobs assigned and not finished
+        self.inflight = {serial: set() for serial in drives}
+        self.last_seen = time.monotonic()
+        self.alive = True
+
+class _Handler(socketserver.StreamRequestHandler):
+    '''First message decides the role of the connection: a worker hello or a client request'''
+
+    def handle(self):
+        connection = Connection(self.request)
+        self.server.coordinator.serve_connection(connection)
+
+class _Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+class Coordinator(object):
+    '''Distributes test jobs over the workers of a test floor
+    Workers connect over TCP and advertise their drives; the coordinator keeps the job queue
+    (highest priority first) and assigns every job to a worker that has the drive (or, for
+    floating jobs, the least loaded matching drive), at most drive_slots at a time per drive.
+    Results are streamed back to the client that submitted the job. When a worker dies
+    (connection lost or no heartbeat within the timeout) its unfinished jobs are requeued;
+    a job whose drive stays absent from every worker for orphan_timeout seconds fails.
+    When a token is set, the first message of every connection must carry it ("token"), or the
+    connection is refused; listening on an address other than loopback requires a token.
+    Protocol (one JSON object per line):
+        worker -> {"type": "hello", "worker", "drives": {serial: model}}, heartbeat, result
+        coordinator -> worker {"type": "run", "job", "test", "serial", "priority"}
+        client -> {"type": "submit", "jobs": [{"test", "serial"?, "model"?, "priority"?}]}
+                  -> accepted, one result per job, done
+        client -> {"type": "status"} -> status
+    Atributes:
+            host (str): Listening address
+            port (int): Listening port
+            drive_slots (int): Jobs sent at once to a drive
+            heartbeat_timeout (float): Seconds without news after which a worker is dead
+            orphan_timeout (float): Seconds a job may wait for a worker with a matching drive
+            token (str): Shared token required from workers and clients (None accepts any local peer)
+            logger (obj): Logger instance'''
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, drive_slots=DEFAULT_DRIVE_SLOTS,
+                 heartbeat_timeout=HEARTBEAT_TIMEOUT_SECONDS, orphan_timeout=DEFAULT_ORPHAN_SECONDS, token=None,
+                 logger=None):
+        self.host = host
+        self.port = port
+        self.drive_slots = drive_slots
+        self.heartbeat_timeout = heartbeat_timeout
+        self.orphan_timeout = orphan_timeout
+        self.token = token
+        self.logger = logger
+        self.workers = {}
+        self.jobs = {}
+        self.server = None
+        self._queue = []
+        self._job_ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+
+    def _log(self, message, error=False):
+        if self.logger:
+            (self.logger.error if error else self.logger.info)(message)
+
+    def serve_connection(self, connection):
+        '''Serve one worker or client connection until it closes'''
+        try:
+            message = connection.receive()
+            if message is None:
+                return
+            if self.token and not hmac.compare_digest(str(message.get("token", "")).encode(), self.token.encode()):
+                self._log(f"Refused {message.get('type')} from {connection.sock.getpeername()[0]}: invalid token",
+                          error=True)
+                connection.send({"type": "error", "message": "Invalid token"})
+                return
+            if message.get("type") == "hello":
+                self._serve_worker(connection, message)
+            elif message.get("type") == "submit":
+                self._serve_submit(connection, message)
+            elif message.get("type") == "status":
+                connection.send(self.status())
+            else:
+                connection.send({"type": "error", "message": f"Unknown message: {message.get('type')}"})
+        except (OSError, ValueError) as ex:
+            self._log(f"Connection error: {ex}", error=True)
+        finally:
+            connection.close()
+
+    def _serve_worker(self, connection, hello):
+        '''Register a worker and process its messages; requeue its jobs when it goes away'''
+        worker = _Worker(hello["worker"], connection, hello.get("drives", {}))
+        with self._lock:
+            previous = self.workers.get(worker.name)
+            if previous is not None:
+                self._drop_worker(previous, "reconnected")
+            self.workers[worker.name] = worker
+            self._log(f"Worker {worker.name} joined with drives {sorted(worker.drives)}")
+            self._dispatch()
+
+        try:
+            while worker.alive:
+                message = connection.receive()
+                if message is None:
+                    break
+                worker.last_seen = time.monotonic()
+                if message.get("type") == "result":
+                    self._finish(worker, message["job"], message.get("result"))
+        except (OSError, ValueError):
+            pass
+        finally:
+            with self._lock:
+                self._drop_worker(worker, "disconnected")
+
+    def _drop_worker(self, worker, reason):
+        '''Forget a worker and requeue its unfinished jobs (lock held)'''
+        if self.workers.get(worker.name) is worker:
+            del self.workers[worker.name]
+        if not worker.alive:
+            return
+        worker.alive = False
+        requeued = 0
+        for jobs in worker.inflight.values():
+            for job_id in jobs:
+                job = self.jobs[job_id]
+                if job.state != JOB_RUNNING:
+                    continue
+                if job.attempts >= MAX_ATTEMPTS:
+                    self._complete(job, {"verdict": None, "error": f"Gave up after {job.attempts} attempts"})
+                else:
+                    job.state = JOB_QUEUED
+                    job.worker = job.drive = None
+                    heapq.heappush(self._queue, (job.sort_key(), job_id))
+                    requeued += 1
+            jobs.clear()
+        self._log(f"Worker {worker.name} {reason}, {requeued} jobs requeued", error=bool(requeued))
+        self._dispatch()
+
+    def _serve_submit(self, connection, request):
+        '''Queue the jobs of a client and stream their results back'''
+        results = queue.Queue()
+        with self._lock:
+            jobs = []
+            for spec in request.get("jobs", []):
+                job = DistributedJob(next(self._job_ids), spec["test"], spec.get("serial"), spec.get("model"),
+                                     spec.get("priority", 0), client=results)
+                self.jobs[job.job_id] = job
+                heapq.heappush(self._queue, (job.sort_key(), job.job_id))
+                jobs.append(job.job_id)
+            connection.send({"type": "accepted", "jobs": jobs})
+            self._dispatch()
+
+        for _ in jobs:
+            connection.send(results.get())
+        connection.send({"type": "done"})
+
+    def _matches(self, job, serial, model):
+        if job.serial_number is not None:
+            return job.serial_number == serial
+        return job.model is None or job.model == model
+
+    def _dispatch(self):
+        '''Assign the queued jobs to drives with a free slot, highest priority first (lock held)'''
+        waiting = []
+        while self._queue:
+            key, job_id = heapq.heappop(self._queue)
+            job = self.jobs[job_id]
+            if job.state != JOB_QUEUED:
+                continue
+            matching = [(len(worker.inflight[serial]), name, serial)
+                        for name, worker in self.workers.items() if worker.alive
+                        for serial, model in worker.drives.items() if self._matches(job, serial, model)]
+            job.orphaned_since = None if matching else (job.orphaned_since or time.monotonic())
+            candidates = [candidate for candidate in matching if candidate[0] < self.drive_slots]
+            if not candidates:
+                waiting.append((key, job_id))
+                continue
+            _, name, serial = min(candidates)
+            worker = self.workers[name]
+            job.state = JOB_RUNNING
+            job.worker = name
+            job.drive = serial
+            job.attempts += 1
+            worker.inflight[serial].add(job_id)
+            try:
+                worker.connection.send({"type": "run", "job": job_id, "test": job.testname, "serial": serial,
+                                        "priority": job.priority})
+            except OSError:
+                #The worker handler notices the broken connection and requeues the job
+                pass
+        for entry in waiting:
+            heapq.heappush(self._queue, entry)
+
+    def _finish(self, worker, job_id, result):
+        '''Record the result of a job reported by a worker'''
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.state != JOB_RUNNING or job.worker != worker.name:
+                return
+            worker.inflight.get(job.drive, set()).discard(job_id)
+            self._complete(job, result)
+            self._dispatch()
+
+    def _complete(self, job, result):
+        job.state = JOB_DONE
+        job.result = result
+        if job.client is not None:
+            job.client.put({"type": "result", **job.summary()})
+
+    def _monitor(self):
+        '''Drop the workers that stopped sending heartbeats'''
+        while not self._stop.wait(HEARTBEAT_SECONDS):
+            now = time.monotonic()
+            with self._lock:
+                for worker in list(self.workers.values()):
+                    if now - worker.last_seen > self.heartbeat_timeout:
+                        self._drop_worker(worker, "timed out")
+                        worker.connection.close()
+                #Queued jobs whose drive is on no connected worker
+                self._dispatch()
+                for job in self.jobs.values():
+                    if (job.state == JOB_QUEUED and job.orphaned_since is not None
+                            and now - job.orphaned_since > self.orphan_timeout):
+                        self._complete(job, {"verdict": None, "error": "No worker has a matching drive"})
+
+    def status(self):
+        '''Workers, drives and job counts
+        Returns:
+            dict: Status message'''
+        with self._lock:
+            states = {}
+            for job in self.jobs.values():
+                states[job.state] = states.get(job.state, 0) + 1
+            workers = {name: {serial: len(jobs) for serial, jobs in worker.inflight.items()}
+                       for name, worker in self.workers.items()}
+        return {"type": "status", "workers": workers, "jobs": states}
+
+    def start(self):
+        '''Start listening in background threads
+        Returns:
+            int: Listening port (useful with port 0)'''
+        if not self.token and not _is_loopback(self.host):
+            raise ValueError(f"A token is required to listen on {self.host} (set {TOKEN_ENV} or {TOKEN_FILE_ENV})")
+        self.server = _Server((self.host, self.port), _Handler)
+        self.server.coordinator = self
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, name="coordinator", daemon=True).start()
+        threading.Thread(target=self._monitor, name="coordinator-monitor", daemon=True).start()
+        self._log(f"Coordinator listening on {self.host}:{self.port}")
+        return self.port
+
+    def shutdown(self):
+        self._stop.set()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+class Worker(object):
+    '''Runs the jobs a coordinator assigns to the drives of this host
+    The assigned jobs go through a local Scheduler, which enforces the shared/exclusive access
+    of each test per controller, and every result is sent back as soon as the job finishes.
+    Atributes:
+            name (str): Worker name (unique on the test floor)
+            devices (dict): Serial number -> controller path
+            models (dict): Serial number -> model number
+            scheduler (obj): Local Scheduler running the jobs
+            token (str): Shared token of the coordinator'''
+
+    def __init__(self, address, devices, runner, models=None, name=None, max_shared=DEFAULT_MAX_SHARED,
+                 logger=None, token=None):
+        self.address = parse_address(address) if isinstance(address, str) else address
+        self.devices = devices
+        self.models = models or {}
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.logger = logger
+        self.scheduler = Scheduler(devices, runner, max_shared=max_shared, models=self.models, logger=logger)
+        self.connection = None
+        self.token = token
+        self._stop = threading.Event()
+
+    def _heartbeat(self):
+        while not self._stop.wait(HEARTBEAT_SECONDS):
+            try:
+                self.connection.send({"type": "heartbeat"})
+            except OSError:
+                return
+
+    def _report(self, job_id, job):
+        '''Wait for a job and send its result'''
+        result = job.wait()
+        try:
+            self.connection.send({"type": "result", "job": job_id, "result": result})
+        except OSError:
+            pass
+
+    def run(self):
+        '''Connect to the coordinator and run the assigned jobs until it goes away'''
+        self.connection = Connection(socket.create_connection(self.address))
+        self.connection.send({"type": "hello", "worker": self.name, "token": self.token,
+                              "drives": {serial: self.models.get(serial) for serial in self.devices}})
+        self.scheduler.start()
+        threading.Thread(target=self._heartbeat, name="worker-heartbeat", daemon=True).start()
+        if self.logger:
+            self.logger.info(f"Worker {self.name} connected to {self.address[0]}:{self.address[1]}")
+        try:
+            while True:
+                message = self.connection.receive()
+                if message is None:
+                    break
+                if message.get("type") == "error":
+                    raise ConnectionError(f"Coordinator refused the worker: {message.get('message')}")
+                if message.get("type") == "run":
+                    job = self.scheduler.submit(message["test"], message["serial"], message.get("priority", 0))
+                    threading.Thread(target=self._report, args=(message["job"], job), daemon=True).start()
+        finally:
+            self._stop.set()
+            self.connection.close()
+            self.scheduler.shutdown()
+
+def submit(address, jobs, token=None):
+    '''Submit jobs to a coordinator and stream their results
+    Args:
+        address (str): Coordinator "host:port"
+        jobs (list): Job dictionaries {"test", "serial"?, "model"?, "priority"?}
+        token (str): Shared token of the coordinator
+    Yields:
+        dict: One result message per job, as they finish'''
+    connection = Connection(socket.create_connection(parse_address(address)))
+    try:
+        connection.send({"type": "submit", "jobs": jobs, "token": token})
+        while True:
+            message = connection.receive()
+            if message is None or message["type"] == "done":
+                return
+            if message["type"] == "error":
+                raise ConnectionError(f"Coordinator refused the jobs: {message.get('message')}")
+            if message["type"] == "result":
+                yield message
+    finally:
+        connection.close()
+
+def request_status(address, token=None):
+    '''Workers and job counts of a coordinator
+    Args:
+        address (str): Coordinator "host:port"
+        token (str): Shared token of the coordinator
+    Returns:
+        dict: Status message (or an error message)'''
+    connection = Connection(socket.create_connection(parse_address(address)))
+    try:
+        connection.send({"type": "status", "token": token})
+        return connection.receive()
+    finally:
+        connection.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Distribute test jobs over several hosts",
+                                     epilog=f"The shared token is read from --token-file, {TOKEN_FILE_ENV} or {TOKEN_ENV}")
+    parser.add_argument("--token-file", default=None, help="File holding the shared token of the test floor")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    coordinator = subparsers.add_parser("coordinator", help="Run the coordinator")
+    coordinator.add_argument("--host", default=DEFAULT_HOST,
+                             help="Listening address (e.g. 0.0.0.0 for the test floor, requires a token)")
+    coordinator.add_argument("--port", type=int, default=DEFAULT_PORT)
+    coordinator.add_argument("--drive-slots", type=int, default=DEFAULT_DRIVE_SLOTS, help="Jobs sent at once to a drive")
+    coordinator.add_argument("--orphan-timeout", type=float, default=DEFAULT_ORPHAN_SECONDS,
+                             help="Seconds a job waits for a worker with a matching drive")
+
+    worker = subparsers.add_parser("worker", help="Run a worker for the drives of this host")
+    worker.add_argument("coordinator", help="Coordinator host:port")
+    worker.add_argument("--name", default=None, help="Worker name (default host:pid)")
+    worker.add_argument("--device", action="append", default=[], metavar="SERIAL=PATH",
+                        help="Use these drives instead of discovering them (e.g. stand-ins)")
+    worker.add_argument("--max-shared", type=int, default=DEFAULT_MAX_SHARED)
+
+    client = subparsers.add_parser("submit", help="Submit a job file and print the results")
+    client.add_argument("coordinator", help="Coordinator host:port")
+    client.add_argument("jobs", help='JSON file with a list of jobs: {"test", "serial"?, "model"?, "priority"?}')
+
+    status = subparsers.add_parser("status", help="Show the workers and job counts")
+    status.add_argument("coordinator", help="Coordinator host:port")
+
+    args = parser.parse_args()
+    token = load_token(token_file=args.token_file)
+
+    if args.command == "coordinator":
+        log_manager = LogManager("coordinator")
+        server = Coordinator(args.host, args.port, args.drive_slots, orphan_timeout=args.orphan_timeout,
+                             token=token, logger=log_manager.get_logger())
+        try:
+            server.start()
+        except ValueError as ex:
+            log_manager.get_logger().error(str(ex))
+            log_manager.close()
+            sys.exit(2)
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
+            log_manager.close()
+    elif args.command == "worker":
+        log_manager = LogManager("worker")
+        logger = log_manager.get_logger()
+        if args.device:
+            devices, models = dict(device.split("=", 1) for device in args.device), {}
+        else:
+            nvme = NvmeCommands(None, logger)
+            devices, models = discover_devices(nvme), {}
+            for serial, path in devices.items():
+                nvme.device = path
+                identify = nvme.id_ctrl(json_output=True)
+                if identify:
+                    models[serial] = identify.get("mn", "").strip()
+        runner = TestManagerRunner(logger)
+        try:
+            Worker(args.coordinator, devices, runner, models, args.name, args.max_shared, logger, token).run()
+        finally:
+            runner.close()
+            log_manager.close()
+    elif args.command == "submit":
+        with open(args.jobs, 'r') as jobs_file:
+            jobs = json.load(jobs_file)
+        failed = 0
+        for message in submit(args.coordinator, jobs, token):
+            result = message["result"] or {}
+            verdict = result.get("verdict")
+            failed += verdict != "PASSED"
+            print(f"Job {message['job']} {message['test']} on {message['serial']} ({message['worker']}, "
+                  f"attempt {message['attempts']}): {verdict or result.get('error')}")
+        sys.exit(1 if failed else 0)
+    elif args.command == "status":
+        print(json.dumps(request_status(args.coordinator, token), indent=2))
+
+if __name__ == "__main__":
+    main()
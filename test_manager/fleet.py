@@ -0,0 +1,280 @@
+import argparse
+import csv
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from nvme.nvme_wrapper import NvmeCommands
+from logger.log_manager import LogManager
+from nvme.admin_passthru_wrapper import AdminCommands, SELF_TEST_CODE_SHORT, SELF_TEST_CODE_EXTENDED, \
+    IDENTIFY_DATA_SIZE_BYTES, IDENTIFY_STRUCTURE_CONTROLLER, IDENTIFY_STRUCTURE_NAMESPACE, LOG_PAGE_ID_SMART
+from nvme.admin_passthru_wrapper import FW_COMMIT_REPLACE, FW_COMMIT_REPLACE_AND_ACTIVATE_ON_RESET, \
+    FW_COMMIT_ACTIVATE_ON_RESET, FW_COMMIT_REPLACE_AND_ACTIVATE_NOW
+
+#Self-test codes accepted on the command line
+SELF_TEST_CODES = {"short": SELF_TEST_CODE_SHORT,
+                   "extended": SELF_TEST_CODE_EXTENDED
+                   }
+
+#Firmware commit actions accepted on the command line
+FW_COMMIT_ACTIONS = {"replace": FW_COMMIT_REPLACE,
+                     "activate-on-reset": FW_COMMIT_REPLACE_AND_ACTIVATE_ON_RESET,
+                     "activate-slot": FW_COMMIT_ACTIVATE_ON_RESET,
+                     "activate-now": FW_COMMIT_REPLACE_AND_ACTIVATE_NOW
+                     }
+
+#The self-test, firmware and feature modules are imported by the subcommands that use them:
+#discover_devices() is also used to start every single drive test
+def discover_devices(nvme):
+    '''Map every serial number reported by nvme list to its controller path
+    Args:
+        nvme (obj): Instance of the NvmeCommands Class
+    Returns:
+        dict: Serial number -> controller path without namespace suffix'''
+
+    devices = {}
+    output = nvme.list(json_output=True)
+    if output:
+        for device in output.get("Devices", []):
+            serial = device.get("SerialNumber")
+            full_path = device.get("DevicePath")
+            if serial and full_path:
+                #Regular Expression: Remove the namespace suffix
+                devices.setdefault(serial, re.sub(r"n\d+$", "", full_path))
+    return devices
+
+def self_test_drives(serial_numbers, code=SELF_TEST_CODE_SHORT, logger=None, timeout=None):
+    '''Run a device self-test on many drives at the same time
+    Args:
+        serial_numbers (list): Serial numbers of the drives to test
+        code (int): Self-test code (short or extended)
+        logger (obj): Logger instance (a new fleet log is created if None)
+        timeout (float): Abort the self-tests still running after this many seconds
+    Returns:
+        dict: Serial number -> final self-test status (None if it could not run)'''
+
+    from nvme.self_test import SelfTestMonitor, run_self_tests
+
+    logger = logger or LogManager("fleet_self_test").get_logger()
+    devices = discover_devices(NvmeCommands(None, logger))
+
+    monitors = []
+    results = {}
+    for serial in serial_numbers:
+        if serial not in devices:
+            logger.error(f"Device with SN {serial} not found.")
+            results[serial] = None
+            continue
+        monitors.append(SelfTestMonitor(AdminCommands(devices[serial], logger), logger, code=code, name=serial))
+
+    results.update(run_self_tests(monitors, logger, timeout=timeout))
+    return results
+
+def update_firmware_drives(serial_numbers, image_path, slot, action=FW_COMMIT_REPLACE_AND_ACTIVATE_ON_RESET,
+                           logger=None, max_workers=8):
+    '''Download, commit and verify a firmware image on many drives at the same time
+    Args:
+        serial_numbers (list): Serial numbers of the drives to update
+        image_path (str): Path to the firmware image
+        slot (int): Target firmware slot
+        action (int): Firmware commit action
+        logger (obj): Logger instance (a new fleet log is created if None)
+        max_workers (int): Maximum number of drives updated at once
+    Returns:
+        dict: Serial number -> update summary (None if the drive was not found)'''
+
+    from nvme.firmware import FirmwareUpdater
+
+    logger = logger or LogManager("fleet_fw_update").get_logger()
+    devices = discover_devices(NvmeCommands(None, logger))
+
+    updaters = []
+    results = {}
+    for serial in serial_numbers:
+        if serial not in devices:
+            logger.error(f"Device with SN {serial} not found.")
+            results[serial] = None
+            continue
+        updaters.append(FirmwareUpdater(NvmeCommands(devices[serial], logger),
+                                        AdminCommands(devices[serial], logger), logger, name=serial))
+
+    #Every drive runs its own download/commit/reset sequence in a worker thread
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for updater, summary in zip(updaters, executor.map(lambda u: u.update(image_path, slot, action), updaters)):
+            results[updater.name] = summary
+    return results
+
+#SMART / Health Information log page size
+SMART_LOG_SIZE_BYTES = 512
+#Columns of the survey CSV summary
+SURVEY_CSV_COLUMNS = ["serial", "device", "ok", "model", "firmware", "capacity_bytes", "namespaces",
+                      "temperature_c", "percent_used", "power_on_hours", "media_errors", "critical_warning",
+                      "seconds"]
+
+def survey_drive(serial, device, logger):
+    '''Collect the raw Identify Controller, Identify Namespace (every active namespace), SMART
+    and current feature values of one controller
+    Args:
+        serial (str): Serial number of the drive
+        device (str): Controller path
+        logger (obj): Logger instance
+    Returns:
+        dict: serial, device, ok, seconds, id_ctrl, smart, namespaces [(nsid, data)], features {name: dword0}'''
+
+    from nvme.feature_manager import FeatureManager
+
+    start = time.monotonic()
+    admin = AdminCommands(device, logger)
+    record = {"serial": serial, "device": device, "ok": False, "id_ctrl": None, "smart": None,
+              "namespaces": [], "features": {}}
+
+    record["id_ctrl"] = admin.identify_data(nsid=0, cns=IDENTIFY_STRUCTURE_CONTROLLER)
+    record["smart"] = admin.get_log_page(LOG_PAGE_ID_SMART, log_len=SMART_LOG_SIZE_BYTES)
+    for nsid in admin.active_namespaces() or []:
+        data = admin.identify_data(nsid=nsid, cns=IDENTIFY_STRUCTURE_NAMESPACE)
+        if data is not None:
+            record["namespaces"].append((nsid, data))
+    snapshot = FeatureManager(admin, logger, max_workers=4).snapshot(selects=("current",))
+    record["features"] = {entry["name"]: entry["current"] for entry in snapshot.values()}
+
+    record["ok"] = record["id_ctrl"] is not None and record["smart"] is not None
+    record["seconds"] = time.monotonic() - start
+    if not record["ok"]:
+        logger.error(f"{serial}: survey incomplete")
+    return record
+
+def write_survey(records, output):
+    '''Write the survey as NumPy columns (<output>.npz) and a CSV summary (<output>.csv)
+    The .npz holds one row per drive (serial, device, ok, seconds, id_ctrl and smart raw pages,
+    feature_<name> DWORD0 with -1 when unavailable) and one row per namespace (ns_serial,
+    ns_nsid, id_ns raw pages); every column is a flat array that converts directly to Arrow.
+    Args:
+        records (list): Results of survey_drive
+        output (str): Path prefix of the dataset
+    Returns:
+        tuple: Paths of the .npz and .csv files'''
+
+    #NumPy is only needed by the survey output, keep it out of the single drive path
+    import numpy as np
+    from test_manager.conformance import ID_CTRL_DTYPE, SMART_DTYPE, decode_pages
+
+    def pages(items, size):
+        #Missing pages are left zeroed; the ok column tells them apart
+        array = np.zeros((len(items), size), dtype=np.uint8)
+        for row, data in enumerate(items):
+            if data is not None:
+                array[row] = np.frombuffer(data, dtype=np.uint8)
+        return array
+
+    columns = {
+        "serial": np.array([record["serial"] for record in records], dtype=str),
+        "device": np.array([record["device"] for record in records], dtype=str),
+        "ok": np.array([record["ok"] for record in records], dtype=bool),
+        "seconds": np.array([record["seconds"] for record in records], dtype=np.float64),
+        "id_ctrl": pages([record["id_ctrl"] for record in records], IDENTIFY_DATA_SIZE_BYTES),
+        "smart": pages([record["smart"] for record in records], SMART_LOG_SIZE_BYTES),
+    }
+    for name in sorted({name for record in records for name in record["features"]}):
+        columns[f"feature_{name}"] = np.array([record["features"].get(name, -1) for record in records],
+                                              dtype=np.int64)
+
+    namespaces = [(record["serial"], nsid, data) for record in records for nsid, data in record["namespaces"]]
+    columns["ns_serial"] = np.array([serial for serial, _, _ in namespaces], dtype=str)
+    columns["ns_nsid"] = np.array([nsid for _, nsid, _ in namespaces], dtype=np.uint32)
+    columns["id_ns"] = pages([data for _, _, data in namespaces], IDENTIFY_DATA_SIZE_BYTES)
+
+    npz_path = f"{output}.npz"
+    np.savez_compressed(npz_path, **columns)
+
+    #CSV summary decoded from the same raw pages
+    ctrl = decode_pages(columns["id_ctrl"], ID_CTRL_DTYPE)
+    smart = decode_pages(columns["smart"], SMART_DTYPE)
+    csv_path = f"{output}.csv"
+    with open(csv_path, 'w', newline='') as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(SURVEY_CSV_COLUMNS)
+        for row, record in enumerate(records):
+            #Columns of a page that was not read stay empty instead of showing its zero fill
+            identity = ["", "", ""]
+            if record["id_ctrl"] is not None:
+                identity = [ctrl["mn"][row].decode(errors='replace').strip(),
+                            ctrl["fr"][row].decode(errors='replace').strip(),
+                            int(ctrl["tnvmcap"][row])]
+            health = ["", "", "", "", ""]
+            if record["smart"] is not None:
+                health = [int(smart["ctemp"][row]) - 273, int(smart["pused"][row]), int(smart["poh"][row]),
+                          int(smart["mdie"][row]), int(smart["cw"][row])]
+            writer.writerow([record["serial"], record["device"], record["ok"]] + identity +
+                            [len(record["namespaces"])] + health +
+                            [f"{record['seconds']:.3f}"])
+    return npz_path, csv_path
+
+def survey_drives(output, logger=None, max_workers=24):
+    '''Survey every controller of the host concurrently and write the dataset
+    Drives are collected in parallel (commands to one controller stay sequential), so the survey
+    of a full chassis takes about as long as the slowest drive.
+    Args:
+        output (str): Path prefix of the dataset (<output>.npz and <output>.csv)
+        logger (obj): Logger instance (a new fleet log is created if None)
+        max_workers (int): Maximum number of drives surveyed at once
+    Returns:
+        list: One survey record per drive'''
+
+    logger = logger or LogManager("fleet_survey").get_logger()
+    devices = discover_devices(NvmeCommands(None, logger))
+    if not devices:
+        logger.error("No NVMe controllers found.")
+        return []
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        records = list(executor.map(lambda item: survey_drive(item[0], item[1], logger), sorted(devices.items())))
+    elapsed = time.monotonic() - start
+
+    npz_path, csv_path = write_survey(records, output)
+    slowest = max(record["seconds"] for record in records)
+    logger.info(f"Surveyed {len(records)} drives in {elapsed:.1f} s (slowest drive {slowest:.1f} s): "
+                f"{npz_path}, {csv_path}")
+    return records
+
+def main():
+    parser = argparse.ArgumentParser(description="Operations over many drives")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    self_test = subparsers.add_parser("self-test", help="Run a device self-test on several drives")
+    self_test.add_argument("serial_numbers", nargs="+", help="SSD serial numbers")
+    self_test.add_argument("--code", choices=SELF_TEST_CODES, default="short", help="Self-test type")
+    self_test.add_argument("--timeout", type=float, default=None, help="Abort after this many seconds")
+
+    fw_update = subparsers.add_parser("fw-update", help="Update the firmware of several drives")
+    fw_update.add_argument("image", help="Firmware image file")
+    fw_update.add_argument("serial_numbers", nargs="+", help="SSD serial numbers")
+    fw_update.add_argument("--slot", type=int, default=2, help="Target firmware slot")
+    fw_update.add_argument("--action", choices=FW_COMMIT_ACTIONS, default="activate-on-reset",
+                           help="Firmware commit action")
+
+    survey = subparsers.add_parser("survey", help="Collect Identify, SMART and feature data of every drive")
+    survey.add_argument("output", help="Path prefix of the dataset (.npz and .csv are added)")
+    survey.add_argument("--max-workers", type=int, default=24, help="Drives surveyed at once")
+
+    args = parser.parse_args()
+
+    if args.command == "self-test":
+        results = self_test_drives(args.serial_numbers, SELF_TEST_CODES[args.code], timeout=args.timeout)
+        for serial, status in results.items():
+            result = status["result"] if status else None
+            print(f"{serial}: {'not run' if result is None else 'result ' + hex(result['result'])}")
+    elif args.command == "survey":
+        records = survey_drives(args.output, max_workers=args.max_workers)
+        print(f"{sum(record['ok'] for record in records)}/{len(records)} drives surveyed")
+    elif args.command == "fw-update":
+        results = update_firmware_drives(args.serial_numbers, args.image, args.slot, FW_COMMIT_ACTIONS[args.action])
+        for serial, summary in results.items():
+            if summary is None:
+                print(f"{serial}: not found")
+            else:
+                print(f"{serial}: {'ok' if summary['ok'] else 'FAILED'} {summary['fr_before']} -> "
+                      f"{summary['fr_after']} in {summary['timings'].get('total', 0):.1f} s")
+
+if __name__ == "__main__":
+    main()
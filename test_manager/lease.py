@@ -0,0 +1,194 @@
+import fcntl
+import glob
+import itertools
+import json
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+
+#Lock files (one per controller and per namespace) are shared by every runner of the host
+LEASE_DIR = os.path.join(tempfile.gettempdir(), "nvme-test-leases")
+#Seconds to wait for a device used by another runner before giving up
+DEFAULT_WAIT_SECONDS = 300.0
+#Polling interval while waiting (doubles up to the maximum)
+POLL_SECONDS = 0.05
+MAX_POLL_SECONDS = 1.0
+
+#Lease modes, matching the access declared by the test classes
+LEASE_SHARED = "shared"
+LEASE_EXCLUSIVE = "exclusive"
+LOCK_OPERATIONS = {LEASE_SHARED: fcntl.LOCK_SH, LEASE_EXCLUSIVE: fcntl.LOCK_EX}
+
+#Holder files record who holds a lock: <lock file>.<host>.<pid>.<lease id>
+_lease_ids = itertools.count(1)
+_lease_ids_lock = threading.Lock()
+
+def lock_name(device_path, nsid=None):
+    '''Lock file name of a controller or one of its namespaces
+    Args:
+        device_path (str): Controller path (e.g. /dev/nvme0) or stand-in file
+        nsid (int): Namespace ID, None for the controller
+    Returns:
+        str: e.g. nvme0.lock or nvme0n1.lock'''
+    base = re.sub(r"[^\w.-]", "_", os.path.basename(device_path.rstrip("/")) or "device")
+    return f"{base}.lock" if nsid is None else f"{base}n{nsid}.lock"
+
+def _pid_alive(pid):
+    '''Whether a local process exists'''
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+class DeviceLease(object):
+    '''Advisory cross-process lease of a controller and some of its namespaces (flock based)
+    The controller lock is taken first and then the namespace locks in ascending order, so
+    runners never deadlock. Shared leases coexist; an exclusive lease excludes every other
+    one. The kernel drops the locks of a process that dies, and the holder files it leaves
+    behind are detected as stale (dead pid) and removed by the next runner.
+    Atributes:
+            device_path (str): Controller path
+            mode (str): "shared" or "exclusive" controller lease
+            namespaces (dict): Namespace ID -> "shared" or "exclusive"
+            lease_dir (str): Directory of the lock files
+            timeout (float): Seconds to wait for the locks
+            owner (dict): Description of the holder written next to the lock (test, serial, ...)
+            logger (obj): Logger instance'''
+
+    def __init__(self, device_path, mode=LEASE_EXCLUSIVE, namespaces=None, lease_dir=LEASE_DIR,
+                 timeout=DEFAULT_WAIT_SECONDS, owner=None, logger=None):
+        '''Initializes the lease (nothing is locked until acquire())
+        Args:
+            device_path (str): Controller path
+            mode (str): "shared" or "exclusive" controller lease
+            namespaces (dict|list): Namespace ID -> mode, or a list of namespace IDs leased in mode
+            lease_dir (str): Directory of the lock files
+            timeout (float): Seconds to wait for the locks (0 fails at once)
+            owner (dict): Description of the holder (test, serial, ...)
+            logger (obj): Logger instance'''
+
+        if not isinstance(namespaces, dict):
+            namespaces = {nsid: mode for nsid in namespaces or []}
+        self.device_path = device_path
+        self.mode = mode
+        self.namespaces = namespaces
+        self.lease_dir = lease_dir
+        self.timeout = timeout
+        self.owner = owner or {}
+        self.logger = logger
+        self._held = []
+        with _lease_ids_lock:
+            self._lease_id = next(_lease_ids)
+
+    def _locks(self):
+        '''(lock path, mode) pairs in acquisition order'''
+        locks = [(os.path.join(self.lease_dir, lock_name(self.device_path)), self.mode)]
+        for nsid in sorted(self.namespaces):
+            locks.append((os.path.join(self.lease_dir, lock_name(self.device_path, nsid)), self.namespaces[nsid]))
+        return locks
+
+    def holders(self, lock_path):
+        '''Holders recorded for a lock; stale holder files (dead local process) are removed
+        Args:
+            lock_path (str): Lock file
+        Returns:
+            list: Holder dictionaries (pid, host, mode, acquired, test, ...)'''
+        holders = []
+        host = socket.gethostname()
+        for holder_path in glob.glob(f"{glob.escape(lock_path)}.*.holder"):
+            try:
+                with open(holder_path, 'r') as holder_file:
+                    holder = json.load(holder_file)
+            except (OSError, ValueError):
+                continue
+            if holder.get("host") == host and not _pid_alive(holder.get("pid", 0)):
+                if self.logger:
+                    self.logger.warning(f"Removing stale lease of pid {holder.get('pid')} on {lock_path}")
+                try:
+                    os.remove(holder_path)
+                except OSError:
+                    pass
+                continue
+            holders.append(holder)
+        return holders
+
+    def _describe(self, lock_path):
+        '''Who holds a lock, for the wait and timeout messages'''
+        holders = self.holders(lock_path)
+        if not holders:
+            return "an unregistered process"
+        return ", ".join(f"{holder.get('test', '?')} ({holder['mode']}, pid {holder['pid']} on {holder['host']}, "
+                         f"since {time.strftime('%H:%M:%S', time.localtime(holder['acquired']))})"
+                         for holder in holders)
+
+    def acquire(self):
+        '''Take every lock of the lease, waiting up to the timeout
+        Returns:
+            bool: True if the lease is held, False on timeout (nothing stays locked)'''
+        os.makedirs(self.lease_dir, exist_ok=True)
+        deadline = time.monotonic() + self.timeout
+        for lock_path, mode in self._locks():
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o666)
+            delay = POLL_SECONDS
+            waiting = False
+            while True:
+                try:
+                    fcntl.flock(fd, LOCK_OPERATIONS[mode] | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    pass
+                if time.monotonic() >= deadline:
+                    if self.logger:
+                        self.logger.error(f"Timed out after {self.timeout:g} s waiting for {mode} access to "
+                                          f"{lock_path}, held by {self._describe(lock_path)}")
+                    os.close(fd)
+                    self.release()
+                    return False
+                if not waiting and self.logger:
+                    self.logger.info(f"Waiting for {mode} access to {lock_path}, held by {self._describe(lock_path)}")
+                waiting = True
+                time.sleep(min(delay, max(0, deadline - time.monotonic())))
+                delay = min(delay * 2, MAX_POLL_SECONDS)
+
+            #Locked: clean up the holder files of crashed runners and register this one
+            self.holders(lock_path)
+            holder_path = f"{lock_path}.{socket.gethostname()}.{os.getpid()}.{self._lease_id}.holder"
+            holder = dict(self.owner, pid=os.getpid(), host=socket.gethostname(), mode=mode, acquired=time.time())
+            try:
+                with open(holder_path, 'w') as holder_file:
+                    json.dump(holder, holder_file)
+            except OSError:
+                holder_path = None
+            self._held.append((fd, holder_path))
+        return True
+
+    def release(self):
+        '''Release every lock held by the lease (in reverse order)'''
+        while self._held:
+            fd, holder_path = self._held.pop()
+            if holder_path:
+                try:
+                    os.remove(holder_path)
+                except OSError:
+                    pass
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def held(self):
+        '''Whether the lease is currently held'''
+        return bool(self._held)
+
+    def __enter__(self):
+        if not self.acquire():
+            raise TimeoutError(f"Lease of {self.device_path} not acquired within {self.timeout} s")
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.release()
+        return False
@@ -0,0 +1,250 @@
+import argparse
+import importlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+
+#Test case modules live in the tests package and are named <name>_test.py
+TESTS_PACKAGE = "tests"
+TESTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), TESTS_PACKAGE)
+TEST_MODULE_SUFFIX = "_test.py"
+INDEX_FILE_NAME = ".test_index.json"
+INDEX_VERSION = 1
+
+#Installed packages may publish extra test cases under this entry point group
+#(name = "module:Class", e.g. test_vendor_log = "vendor_tests.log_test:TestVendorLog")
+ENTRY_POINT_GROUP = "nvme_test_manager.tests"
+
+#Regular Expression: Test classes are top level classes whose name starts with Test
+TEST_CLASS_PATTERN = re.compile(r"^class\s+(Test\w*)\s*[(:]", re.MULTILINE)
+
+def test_name_for_module(file_name):
+    '''Name a test case after its module: id_ctrl_test.py -> test_id_ctrl
+    Args:
+        file_name (str): Module file name
+    Returns:
+        str: Test name used on the command line'''
+
+    return "test_" + file_name[:-len(TEST_MODULE_SUFFIX)]
+
+class TestRegistry(object):
+    '''Catalog of the available test cases that imports a test module only when it is selected
+    The tests directory is scanned as text (no imports) and the result is kept in a JSON index
+    next to the modules. Only modules whose size or modification time changed are scanned again,
+    so listing or selecting a test costs one directory listing however large the catalog grows.
+    Atributes:
+            tests_dir (str): Directory holding the test case modules
+            package (str): Package name the test modules are imported from
+            index_path (str): JSON index of the scanned modules
+            entry_point_group (str): Entry point group of externally installed tests'''
+
+    def __init__(self, tests_dir=TESTS_DIR, package=TESTS_PACKAGE, index_path=None,
+                 entry_point_group=ENTRY_POINT_GROUP):
+        '''Initializes the registry (nothing is scanned or imported until it is used)
+        Args:
+            tests_dir (str): Directory holding the test case modules
+            package (str): Package name the test modules are imported from
+            index_path (str): JSON index location (defaults to a hidden file in tests_dir)
+            entry_point_group (str): Entry point group of externally installed tests, None to disable'''
+
+        self.tests_dir = tests_dir
+        self.package = package
+        self.index_path = index_path or os.path.join(tests_dir, INDEX_FILE_NAME)
+        self.entry_point_group = entry_point_group
+        self._tests = None
+        self._entry_points = None
+        self._loaded = {}
+
+    def _load_index(self):
+        '''Read the cached index (empty if it is missing, corrupt or from another version)'''
+        try:
+            with open(self.index_path, 'r') as index_file:
+                index = json.load(index_file)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        if index.get("version") != INDEX_VERSION:
+            return {}
+        return index.get("modules", {})
+
+    def _save_index(self, modules):
+        '''Atomically replace the cached index; a read-only tests directory only loses the cache'''
+        tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'w') as index_file:
+                json.dump({"version": INDEX_VERSION, "modules": modules}, index_file, indent=2)
+            os.replace(tmp_path, self.index_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _scan_module(self, path):
+        '''Find the test class of a module by reading its source
+        Args:
+            path (str): Module file path
+        Returns:
+            str: Test class name, or None if the module does not define one'''
+        with open(path, 'r', encoding='utf-8', errors='replace') as module_file:
+            match = TEST_CLASS_PATTERN.search(module_file.read())
+        return match.group(1) if match else None
+
+    def refresh(self):
+        '''Bring the index up to date with the tests directory
+        Returns:
+            dict: Test name -> {"module", "class"}'''
+        cached = self._load_index()
+        modules = {}
+        changed = False
+
+        try:
+            entries = list(os.scandir(self.tests_dir))
+        except OSError:
+            entries = []
+
+        for entry in entries:
+            if not entry.name.endswith(TEST_MODULE_SUFFIX) or not entry.is_file():
+                continue
+            stat = entry.stat()
+            record = cached.get(entry.name)
+            #Only rescan modules whose size or modification time changed
+            if record is None or record["mtime_ns"] != stat.st_mtime_ns or record["size"] != stat.st_size:
+                record = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "class": self._scan_module(entry.path)}
+                changed = True
+            modules[entry.name] = record
+
+        if changed or modules.keys() != cached.keys():
+            self._save_index(modules)
+
+        self._tests = {}
+        for file_name, record in sorted(modules.items()):
+            if record["class"]:
+                module = f"{self.package}.{file_name[:-len('.py')]}"
+                self._tests[test_name_for_module(file_name)] = {"module": module, "class": record["class"]}
+        return self._tests
+
+    def _external_tests(self):
+        '''Test cases published by installed packages through entry points (looked up once, on demand)'''
+        if self._entry_points is None:
+            self._entry_points = {}
+            if self.entry_point_group:
+                from importlib.metadata import entry_points
+                for entry_point in entry_points(group=self.entry_point_group):
+                    self._entry_points[entry_point.name] = entry_point
+        return self._entry_points
+
+    def local_names(self):
+        '''Names of the test cases in the tests directory'''
+        if self._tests is None:
+            self.refresh()
+        return list(self._tests)
+
+    def names(self):
+        '''Names of every available test case, local ones first'''
+        external = [name for name in self._external_tests() if name not in self.local_names()]
+        return self.local_names() + sorted(external)
+
+    def __contains__(self, name):
+        if self._tests is None:
+            self.refresh()
+        #Entry points are only consulted for names that are not local
+        return name in self._tests or name in self._external_tests()
+
+    def get(self, name):
+        '''Import the module of a test case and return its class
+        Args:
+            name (str): Test name
+        Returns:
+            type: Test case class, or None if the name is unknown'''
+        if name in self._loaded:
+            return self._loaded[name]
+        if name not in self:
+            return None
+
+        if name in self._tests:
+            spec = self._tests[name]
+            test_class = getattr(importlib.import_module(spec["module"]), spec["class"])
+        else:
+            test_class = self._external_tests()[name].load()
+
+        self._loaded[name] = test_class
+        return test_class
+
+    def __getitem__(self, name):
+        test_class = self.get(name)
+        if test_class is None:
+            raise KeyError(name)
+        return test_class
+
+def benchmark(counts=(10, 100, 500), repeat=5):
+    '''Measure how the startup of main.py (import and selecting one test) grows with the size of the catalog
+    Synthetic test modules are generated in a temporary package and installed as the test pool
+    of the test manager; every measurement runs in a fresh interpreter so imports are not
+    shared between them.
+    Args:
+        counts (tuple): Catalog sizes to measure
+        repeat (int): Runs per measurement (the best one is reported)
+    Returns:
+        dict: Catalog size -> {"import", "cold", "warm"} seconds: importing main.py, and importing
+              it plus building/reading the index and importing one test'''
+
+    probe = ("import sys, time; sys.path[:0] = sys.argv[1:3]; start = time.perf_counter(); "
+             "import main; imported = time.perf_counter() - start; "
+             "import test_manager.test_manager as manager; "
+             "from test_manager.registry import TestRegistry; "
+             "manager.tests_pool = TestRegistry(sys.argv[3], 'synthetic_tests'); "
+             "manager.tests_pool.get('test_case_0'); "
+             "print(imported, time.perf_counter() - start)")
+    repo_root = os.path.dirname(TESTS_DIR)
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="registry-") as work_dir:
+        tests_dir = os.path.join(work_dir, "synthetic_tests")
+        index_path = os.path.join(tests_dir, INDEX_FILE_NAME)
+        command = [sys.executable, "-c", probe, repo_root, work_dir, tests_dir]
+
+        for count in counts:
+            shutil.rmtree(tests_dir, ignore_errors=True)
+            os.makedirs(tests_dir)
+            for i in range(count):
+                with open(os.path.join(tests_dir, f"case_{i}{TEST_MODULE_SUFFIX}"), 'w') as module_file:
+                    module_file.write(f"import json\n\nclass TestCase{i}():\n    errors = 0\n")
+
+            #Cold: the index is rebuilt from the sources. Warm: the cached index is reused
+            imports, cold, warm = [], [], []
+            for _ in range(repeat):
+                if os.path.exists(index_path):
+                    os.remove(index_path)
+                imported, elapsed = map(float, subprocess.run(command, capture_output=True, text=True, check=True).stdout.split())
+                imports.append(imported)
+                cold.append(elapsed)
+                imported, elapsed = map(float, subprocess.run(command, capture_output=True, text=True, check=True).stdout.split())
+                imports.append(imported)
+                warm.append(elapsed)
+            results[count] = {"import": min(imports), "cold": min(cold), "warm": min(warm)}
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Available test cases")
+    parser.add_argument("--refresh", action="store_true", help="Rebuild the test index")
+    parser.add_argument("--benchmark", type=int, nargs="*", default=None,
+                        help="Measure main.py startup time for synthetic catalogs of these sizes")
+    args = parser.parse_args()
+
+    if args.benchmark is not None:
+        for count, timing in benchmark(tuple(args.benchmark) or (10, 100, 500)).items():
+            print(f"{count:>5} tests: import main {timing['import'] * 1000:.1f} ms, "
+                  f"startup with cold index {timing['cold'] * 1000:.1f} ms, "
+                  f"warm index {timing['warm'] * 1000:.1f} ms")
+        return
+
+    registry = TestRegistry()
+    if args.refresh and os.path.exists(registry.index_path):
+        os.remove(registry.index_path)
+    for name in registry.names():
+        print(name)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+import argparse
+import heapq
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from nvme.nvme_wrapper import NvmeCommands
+from logger.log_manager import LogManager
+from logger.results_store import ResultsStore, percentile
+from test_manager.baseline_store import BaselineStore
+from test_manager.fleet import discover_devices
+from test_manager.test_manager import TestManager, tests_pool
+
+#Device access declared by a test class with its "access" attribute
+ACCESS_SHARED = "shared"
+ACCESS_EXCLUSIVE = "exclusive"
+#Tests that do not declare their access may change the drive: run them alone
+DEFAULT_ACCESS = ACCESS_EXCLUSIVE
+#Read-only tests run at once on a controller
+DEFAULT_MAX_SHARED = 4
+
+def test_access(testname):
+    '''Device access declared by a test case
+    Args:
+        testname (str): Name of the test case
+    Returns:
+        str: "shared" or "exclusive"'''
+    test_class = tests_pool.get(testname)
+    access = getattr(test_class, "access", DEFAULT_ACCESS) if test_class else DEFAULT_ACCESS
+    return access if access in (ACCESS_SHARED, ACCESS_EXCLUSIVE) else DEFAULT_ACCESS
+
+class SchedulerJob(object):
+    '''Test job queued in the scheduler
+    Atributes:
+            job_id (int): Job identifier (submission order)
+            testname (str): Name of the test case
+            serial_number (str): Drive the job is pinned to, None to run it on any drive
+            model (str): Model a floating job is restricted to (None for any model)
+            priority (int): Higher priorities run first
+            access (str): "shared" or "exclusive"
+            device (str): Serial number of the drive the job ran on
+            stolen (bool): Whether an idle drive took the job from another drive's queue
+            result (dict): Result of the runner once finished'''
+
+    def __init__(self, job_id, testname, serial_number=None, model=None, priority=0, access=DEFAULT_ACCESS):
+        self.job_id = job_id
+        self.testname = testname
+        self.serial_number = serial_number
+        self.model = model
+        self.priority = priority
+        self.access = access
+        self.device = None
+        self.stolen = False
+        self.result = None
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+        self._done = threading.Event()
+
+    def sort_key(self):
+        '''Heap key: highest priority first, then submission order'''
+        return (-self.priority, self.job_id)
+
+    def queue_wait(self):
+        '''Seconds the job waited in the queue (None while still queued)'''
+        return None if self.started is None else self.started - self.submitted
+
+    def wait(self, timeout=None):
+        '''Wait until the job finished
+        Args:
+            timeout (float): Seconds to wait (None waits forever)
+        Returns:
+            dict: Result of the job, None on timeout'''
+        self._done.wait(timeout)
+        return self.result
+
+class _Device(object):
+    '''Scheduling state of one drive: its job queue and the jobs running on it'''
+
+    def __init__(self, serial_number, path, model=None):
+        self.serial_number = serial_number
+        self.path = path
+        self.model = model
+        self.queue = []
+        self.shared = 0
+        self.exclusive = False
+        self.jobs = 0
+        self.stolen = 0
+        self.busy = 0.0
+        self.busy_since = None
+
+    def running(self):
+        return self.shared + (1 if self.exclusive else 0)
+
+    def can_start(self, job, max_shared):
+        '''Exclusive jobs need an idle drive; shared jobs need no exclusive job and a free slot'''
+        if job.access == ACCESS_EXCLUSIVE:
+            return self.running() == 0
+        return not self.exclusive and self.shared < max_shared
+
+class Scheduler(object):
+    '''Priority job queue over TestManager with per-controller access control and work stealing
+    Every drive has its own priority queue. Jobs pinned to a serial number go to that drive;
+    floating jobs (no serial number, optionally restricted to a model) go to the least loaded
+    drive, and a drive that runs out of work steals the best floating job of the most loaded
+    drive. Exclusive (destructive) tests run alone on a controller; shared (read-only) tests
+    run together up to max_shared. A queued exclusive job blocks the shared jobs behind it so
+    it is not starved.
+    Atributes:
+            devices (dict): Serial number -> device scheduling state
+            runner (callable): runner(job, device_path) -> result dict
+            max_shared (int): Shared jobs run at once on a controller
+            logger (obj): Logger instance'''
+
+    def __init__(self, devices, runner, max_shared=DEFAULT_MAX_SHARED, models=None, logger=None):
+        '''Initializes the scheduler (call start() to begin dispatching)
+        Args:
+            devices (dict): Serial number -> controller path
+            runner (callable): runner(job, device_path) -> result dict, run on a worker thread
+            max_shared (int): Shared jobs run at once on a controller
+            models (dict): Serial number -> model number, for model restricted floating jobs
+            logger (obj): Logger instance'''
+
+        models = models or {}
+        self.devices = {serial: _Device(serial, path, models.get(serial)) for serial, path in devices.items()}
+        self.runner = runner
+        self.max_shared = max_shared
+        self.logger = logger
+        self.jobs = []
+        self._job_ids = itertools.count(1)
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, len(self.devices) * max_shared))
+        self._dispatcher = None
+        self._running = False
+        self._started = None
+
+    def _matches(self, job, device):
+        '''Whether a job may run on a drive'''
+        if job.serial_number is not None:
+            return job.serial_number == device.serial_number
+        return job.model is None or job.model == device.model
+
+    def submit(self, testname, serial_number=None, priority=0, model=None, access=None):
+        '''Queue a test job
+        Args:
+            testname (str): Name of the test case
+            serial_number (str): Drive to run it on, None for any (matching) drive
+            priority (int): Higher priorities run first
+            model (str): Restrict a floating job to drives of this model
+            access (str): Override the access declared by the test class
+        Returns:
+            SchedulerJob: The queued job (finished at once with an error if no drive matches)'''
+        job = SchedulerJob(next(self._job_ids), testname, serial_number, model, priority,
+                           access or test_access(testname))
+        with self._condition:
+            self.jobs.append(job)
+            candidates = [device for device in self.devices.values() if self._matches(job, device)]
+            if not candidates:
+                self._finish(job, {"verdict": None, "error": "No matching drive"})
+                return job
+            #Floating jobs start on the least loaded drive; idle drives may steal them later
+            device = min(candidates, key=lambda device: len(device.queue) + device.running())
+            heapq.heappush(device.queue, (job.sort_key(), job))
+            self._condition.notify()
+        return job
+
+    def _steal(self, device):
+        '''Move the best floating job this drive can run from the most loaded other drive
+        Returns:
+            bool: True if a job was stolen'''
+        victims = sorted((other for other in self.devices.values() if other is not device and other.queue),
+                         key=lambda other: len(other.queue), reverse=True)
+        for victim in victims:
+            floating = [entry for entry in victim.queue
+                        if entry[1].serial_number is None and self._matches(entry[1], device)]
+            if floating:
+                entry = min(floating)
+                victim.queue.remove(entry)
+                heapq.heapify(victim.queue)
+                entry[1].stolen = True
+                device.stolen += 1
+                heapq.heappush(device.queue, entry)
+                return True
+        return False
+
+    def _ready(self):
+        '''Pop every job that can start now, marking it running on its drive
+        Returns:
+            list: (job, device) pairs to start'''
+        ready = []
+        now = time.monotonic()
+        for device in self.devices.values():
+            while True:
+                if not device.queue:
+                    if device.running() or not self._steal(device):
+                        break
+                job = device.queue[0][1]
+                if not device.can_start(job, self.max_shared):
+                    break
+                heapq.heappop(device.queue)
+                if job.access == ACCESS_EXCLUSIVE:
+                    device.exclusive = True
+                else:
+                    device.shared += 1
+                if device.busy_since is None:
+                    device.busy_since = now
+                device.jobs += 1
+                job.device = device.serial_number
+                job.started = now
+                ready.append((job, device))
+        return ready
+
+    def _dispatch_loop(self):
+        '''Dispatcher thread: start the jobs that can run whenever the state changes'''
+        with self._condition:
+            while self._running:
+                for job, device in self._ready():
+                    self._executor.submit(self._run, job, device)
+                self._condition.wait()
+
+    def _run(self, job, device):
+        '''Worker thread: run one job and release its drive'''
+        try:
+            result = self.runner(job, device.path)
+        except Exception as ex:
+            if self.logger:
+                self.logger.error(f"Job {job.job_id} ({job.testname}) failed: {ex}")
+            result = {"verdict": None, "error": str(ex)}
+
+        with self._condition:
+            if job.access == ACCESS_EXCLUSIVE:
+                device.exclusive = False
+            else:
+                device.shared -= 1
+            if device.running() == 0:
+                device.busy += time.monotonic() - device.busy_since
+                device.busy_since = None
+            self._finish(job, result)
+            self._condition.notify_all()
+
+    def _finish(self, job, result):
+        job.result = result
+        job.finished = time.monotonic()
+        job._done.set()
+
+    def start(self):
+        '''Start dispatching the queued jobs'''
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._started = time.monotonic()
+        self._dispatcher = threading.Thread(target=self._dispatch_loop, name="scheduler", daemon=True)
+        self._dispatcher.start()
+
+    def wait(self):
+        '''Wait until every submitted job finished'''
+        for job in list(self.jobs):
+            job.wait()
+
+    def shutdown(self):
+        '''Stop dispatching; running jobs are finished, queued ones are left queued'''
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._dispatcher:
+            self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    def stats(self):
+        '''Queue wait times and drive utilization since start()
+        Returns:
+            dict: {"jobs", "finished", "elapsed", "queue_wait": {mean, p50, p99, max} (seconds),
+                   "devices": serial -> {jobs, stolen, busy, utilization}}'''
+        with self._condition:
+            now = time.monotonic()
+            elapsed = now - self._started if self._started else 0.0
+            waits = sorted(job.queue_wait() for job in self.jobs if job.started is not None)
+            devices = {}
+            for serial, device in self.devices.items():
+                busy = device.busy + (now - device.busy_since if device.busy_since is not None else 0.0)
+                devices[serial] = {"jobs": device.jobs, "stolen": device.stolen, "busy": busy,
+                                   "utilization": busy / elapsed if elapsed else 0.0}
+            finished = sum(1 for job in self.jobs if job.finished is not None)
+
+        queue_wait = None
+        if waits:
+            queue_wait = {"mean": sum(waits) / len(waits), "p50": percentile(waits, 50),
+                          "p99": percentile(waits, 99), "max": waits[-1]}
+        return {"jobs": len(self.jobs), "finished": finished, "elapsed": elapsed, "queue_wait": queue_wait,
+                "devices": devices}
+
+class TestManagerRunner(object):
+    '''Scheduler runner executing jobs through TestManager with shared results and baselines
+    Atributes:
+            results (obj): ResultsStore shared by every job
+            baselines (obj): BaselineStore shared by every job
+            console (bool): Whether the job logs are printed to the console'''
+
+    def __init__(self, logger, console=False):
+        self.results = ResultsStore(logger=logger)
+        self.baselines = BaselineStore(logger)
+        self.console = console
+
+    def __call__(self, job, device_path):
+        #A private logger per run lets the same test run on several drives at once
+        manager = TestManager(job.device, job.testname, device_path=device_path, results=self.results,
+                              resources={"baseline_store": self.baselines}, console=self.console,
+                              isolated_log=True)
+        try:
+            if manager.test is None:
+                return {"verdict": None, "error": "Unable to initialize", "log": manager.log_manager.log_file_path}
+            verdict = manager.execute()
+            return {"verdict": verdict, "errors": manager.test.errors, "run_id": manager.run_id,
+                    "log": manager.log_manager.log_file_path}
+        finally:
+            manager.close()
+
+    def close(self):
+        self.results.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Schedule test jobs across the drives of a host")
+    parser.add_argument("jobs", help='JSON file with a list of jobs: {"test", "serial"?, "model"?, "priority"?}')
+    parser.add_argument("--max-shared", type=int, default=DEFAULT_MAX_SHARED,
+                        help="Read-only tests run at once on a controller")
+    parser.add_argument("--device", action="append", default=[], metavar="SERIAL=PATH",
+                        help="Use these drives instead of discovering them (e.g. stand-ins)")
+    args = parser.parse_args()
+
+    log_manager = LogManager("scheduler")
+    logger = log_manager.get_logger()
+    with open(args.jobs, 'r') as jobs_file:
+        jobs = json.load(jobs_file)
+
+    #Drives given on the command line, or every discovered drive with its model
+    if args.device:
+        devices = dict(device.split("=", 1) for device in args.device)
+        models = {}
+    else:
+        nvme = NvmeCommands(None, logger)
+        devices = discover_devices(nvme)
+        models = {}
+        for serial, path in devices.items():
+            nvme.device = path
+            identify = nvme.id_ctrl(json_output=True)
+            if identify:
+                models[serial] = identify.get("mn", "").strip()
+
+    runner = TestManagerRunner(logger)
+    scheduler = Scheduler(devices, runner, max_shared=args.max_shared, models=models, logger=logger)
+    for job in jobs:
+        scheduler.submit(job["test"], job.get("serial"), job.get("priority", 0), job.get("model"))
+    scheduler.start()
+    scheduler.wait()
+    scheduler.shutdown()
+    runner.close()
+
+    for job in scheduler.jobs:
+        result = job.result or {}
+        logger.info(f"Job {job.job_id} {job.testname} on {job.device}: {result.get('verdict') or result.get('error')}"
+                    f"{' (stolen)' if job.stolen else ''}")
+    stats = scheduler.stats()
+    if stats["queue_wait"]:
+        wait = stats["queue_wait"]
+        logger.info(f"Queue wait: mean {wait['mean']:.2f} s, p50 {wait['p50']:.2f} s, "
+                    f"p99 {wait['p99']:.2f} s, max {wait['max']:.2f} s")
+    for serial, device in stats["devices"].items():
+        logger.info(f"{serial}: {device['jobs']} jobs ({device['stolen']} stolen), "
+                    f"utilization {device['utilization'] * 100:.0f}%")
+    log_manager.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,23 @@
 import json
+import os
 import sys
 import re
+from datetime import datetime
 
+#Modules used only by optional paths (discovery by serial number, own results store, feature
+#preservation, self-tests, telemetry of failures) are imported where they are used, so
+#starting a test does not pay for them (test_manager.fleet defers its own heavy imports too)
 from nvme.nvme_wrapper import NvmeCommands
 from logger.log_manager import LogManager
 from nvme.admin_passthru_wrapper import AdminCommands
+from nvme.error_log import ErrorLogReader
+from nvme.admin_passthru_wrapper import SELF_TEST_CODE_SHORT
+from test_manager.lease import DeviceLease, DEFAULT_WAIT_SECONDS, LEASE_EXCLUSIVE
 
-#Test Case imports
-from tests.id_ctrl_test import TestIdCtrl
-from tests.id_ns_test import TestIdNs
-from tests.smart_log_test import TestSmartLog
+from test_manager.registry import TestRegistry
 
-#Define set of available tests
-tests_pool = {"test_id_ctrl": TestIdCtrl,
-              "test_id_ns": TestIdNs,
-              "test_smart_log": TestSmartLog
-              }
+#Define set of available tests (discovered in tests/, imported only when selected)
+tests_pool = TestRegistry()
 
 class TestManager(object):
     '''TestManagegr coordinates the execution of NVMe test cases
@@ -24,24 +26,51 @@ class TestManager(object):
             testname (str): Name of the test case (In tests pool)
             nvme (obj): Instance of the NVMeCommands Class
             physical path (str): Controller device path
-            logger (obj): Instance of the LogManager Class
+            log_manager (obj): Instance of the LogManager Class
+            logger (obj): Logger configured by the LogManager
+            events (obj): Structured event stream of the LogManager (commands, phases, verdict)
             admin (obj): Instance of the AdminCommands Class
-            test (obj): Instance of the corresponding Test Case Class'''
+            test (obj): Instance of the corresponding Test Case Class
+            results (obj): Instance of the ResultsStore Class (run, command latencies, SMART)
+            run_id (str): Identifier of this run in the results store
+            lease (obj): Cross-process lease of the device (DeviceLease), held until close()'''
     
-    def __init__(self, serial_number, testname):
+    def __init__(self, serial_number, testname, device_path=None, results=None, resources=None, console=True,
+                 isolated_log=False, lease_timeout=DEFAULT_WAIT_SECONDS):
         '''Initializes the Test Manager and prepares the environment
         Args:
             serial_number (str): SSD's serial number to target
             testname (str): Name of the test case
+            device_path (str): Optional device path that skips serial number discovery
+                               (e.g. a file or loop-device stand-in)
+            results (obj): Optional shared ResultsStore (e.g. kept open by the runner daemon);
+                           it is not closed by close()
+            resources (dict): Optional shared objects handed by keyword to the test classes that
+                              accept them (e.g. {"baseline_store": ...})
+            console (bool): Whether the log is also printed to the console
+            isolated_log (bool): Use a logger private to this run, so the same test can run
+                                 concurrently on several drives (e.g. from the scheduler)
+            lease_timeout (float): Seconds to wait for the device when another runner holds it
         '''
         
         self.serial_number = serial_number
         self.testname = testname
         self.nvme = None
+        self.device_path = device_path
         self.physical_path = None
-        self.logger = LogManager(self.testname).get_logger()
+        self.log_manager = LogManager(self.testname, console=console, isolated=isolated_log)
+        self.logger = self.log_manager.get_logger()
+        self.events = self.log_manager.get_events()
         self.admin = None
+        self.error_log = None
         self.test = None
+        self.results = results
+        self.owns_results = results is None
+        self.resources = resources or {}
+        self.run_id = None
+        self.lease = None
+        self.lease_timeout = lease_timeout
+        self.handle_baseline = None
 
         #If initialization fails (invalid SN or test name), the object may not be ready to run tests.
         if self.initialize() is None:
@@ -52,15 +81,9 @@ class TestManager(object):
         '''Retrieve the NVMe device's controller path without namespace suffix.
         Uses nvme list in JSON format to match the device's serial number.'''
 
-        output = self.nvme.list(json_output=True)
-        if output:
-            for device in output.get("Devices", []):
-                if device.get("SerialNumber") == self.serial_number:
-                    full_path = device.get("DevicePath")
-                    if full_path:
-                        #Regular Expression: Remove the namespace suffix
-                        return re.sub(r"n\d+$", "", full_path)
-        return None
+        from test_manager.fleet import discover_devices
+
+        return discover_devices(self.nvme).get(self.serial_number)
 
     def initialize(self):
         '''Define and initialize wrappers, etc...
@@ -73,8 +96,8 @@ class TestManager(object):
         #Create NVMe wrapper without device (will be assigned after physical path)
         self.nvme = NvmeCommands(self.physical_path, self.logger)
 
-        #Get physical path of the ssd
-        self.physical_path = self.get_device_path()
+        #Get physical path of the ssd (a forced device path skips the discovery)
+        self.physical_path = self.device_path or self.get_device_path()
         if not self.physical_path:
             self.logger.error(f"Device with SN {self.serial_number} not found.")
             return None
@@ -84,16 +107,51 @@ class TestManager(object):
 
         #Validate that testcase name exists
         if self.testname not in tests_pool:
-            test_list = list(tests_pool.keys())
+            test_list = tests_pool.names()
             self.logger.error(f"Unknown test name: {self.testname}")
             self.logger.info(f"Tests Available: {test_list}")
             self.logger.info(f"Make sure the test you are trying to execute has been defined.")
             return None
+
+        #Lease the device so other runners of the host cannot use it at the same time:
+        #shared for read-only tests, exclusive for the rest, plus the namespaces the test declares
+        test_class = tests_pool.get(self.testname)
+        self.lease = DeviceLease(self.physical_path, getattr(test_class, "access", LEASE_EXCLUSIVE),
+                                 namespaces=getattr(test_class, "namespaces", None), timeout=self.lease_timeout,
+                                 owner={"test": self.testname, "serial": self.serial_number}, logger=self.logger)
+        if not self.lease.acquire():
+            self.logger.error(f"Device {self.physical_path} is in use by another runner.")
+            return None
         
         #Initialize the instance of AddminCommands Class
         self.admin = AdminCommands(self.physical_path,self.logger)
+        #Incremental reader of the Error Information log used by the drive checks
+        self.error_log = ErrorLogReader(self.admin, self.logger)
+        #Record the run, and the latency of every command the wrappers execute, in the results store
+        if self.results is None:
+            from logger.results_store import ResultsStore
+            self.results = ResultsStore(logger=self.logger)
+        self.run_id = self.results.start_run(self.testname, serial=self.serial_number, device=self.physical_path)
+        #Device handle pool counters are process-wide: keep their value at the start of the run
+        self.handle_baseline = self.nvme.handle_stats()
+        self.nvme.add_observer(self.results.observer(self.run_id))
+        self.admin.add_observer(self.results.observer(self.run_id))
+        #Write every command to the structured event stream too
+        if self.events:
+            self.events.set_context(run=self.run_id, serial=self.serial_number, device=self.physical_path)
+            self.nvme.add_observer(self.events.observer())
+            self.admin.add_observer(self.events.observer())
+        #Tests with hot command loops may aggregate their command lines (see run())
+        self.nvme.add_observer(self.log_manager.aggregator)
+        self.admin.add_observer(self.log_manager.aggregator)
         #Update test case and initialize it with instances of logger, nvme and admin classes
-        self.test = tests_pool[self.testname](self.logger, self.nvme, self.admin)
+        #(plus the shared resources its constructor accepts)
+        options = {}
+        if self.resources:
+            import inspect
+            parameters = inspect.signature(test_class).parameters
+            options = {name: value for name, value in self.resources.items() if name in parameters}
+        self.test = test_class(self.logger, self.nvme, self.admin, **options)
         return self.test
 
     def drive_check(self, discovery):
@@ -113,22 +171,31 @@ class TestManager(object):
                 return
 
         self.logger.info(f"[====== Start {stage} Drive Status ======]")
+        self.emit_phase(stage, "start")
         #Execute id ctrl command with vendor parameter (solidigm)
         output = self.nvme.id_ctrl(json_output=True, vendor=True)
         if not output:
             self.logger.error("Failed to retrieve controller info.")
+            self.emit_phase(stage, "end", ok=False)
             return
         sn = output.get("sn", "Unknown")
         mn = output.get("mn", "Unknown")
         fw = output.get("fr", "Unknown")
         health = output.get("health", "Unknown")
+        if discovery and self.results:
+            self.results.set_identity(self.run_id, serial=sn.strip(), model=mn.strip(), firmware=fw.strip())
+        if discovery and self.events:
+            self.events.set_context(serial=sn.strip(), model=mn.strip(), firmware=fw.strip())
         #Cleaning the health field
         health = health.replace("\x00", "")
 
         if health.lower().strip() == "healthy":
             self.logger.info(f"SN: {sn}, FW: {fw}, Health: {health}, Model: {mn}")
+            self.check_error_log(sn, output.get("elpe", 0), stage)
             self.logger.info(f"[====== End {stage} Drive Status ======]")
+            self.emit_phase(stage, "end", ok=True, health=health.strip())
         else:
+            self.emit_phase(stage, "end", ok=False, health=health.strip())
             if discovery:
                 self.logger.error("Drive health unknown during Pre-Check.")
                 self.logger.error("Drive is not healthy. Aborting test.")
@@ -138,23 +205,169 @@ class TestManager(object):
                 self.logger.error("Drive is not healthy. Aborting test.")
                 return
         
+    def emit_phase(self, name, state, **fields):
+        '''Write a phase event to the structured event stream (if enabled)
+        Args:
+            name (str): Phase name (Pre-Check, Post-Check, Test)
+            state (str): "start" or "end"'''
+        if self.events:
+            self.events.phase(name, state, **fields)
+
+    def check_error_log(self, sn, elpe, stage=None):
+        '''Report the Error Information log entries added since the previous drive check.
+        Only the SMART log is read when the error counter did not move.
+        Args:
+            sn (str): Serial number of the drive
+            elpe (int): Error Log Page Entries from Identify Controller (zero-based)
+            stage (str): Drive check stage, used to label the SMART snapshot in the results store'''
+        if self.error_log is None:
+            return
+
+        smart = self.admin.smart_log()
+        if not smart:
+            self.logger.error("Failed to retrieve SMART log for the error log check.")
+            return
+        if stage and self.results:
+            self.results.record_smart(self.run_id, stage, smart)
+
+        entries = self.error_log.read_new(sn, smart["neile"], elpe)
+        if entries is None:
+            return
+        if not entries:
+            self.logger.info(f"No new error log entries (total: {smart['neile']})")
+            return
+
+        self.logger.error(f"{len(entries)} new error log entries:")
+        for entry in entries:
+            self.logger.error(f"Error {entry['error_count']}: SQID {entry['sqid']}, CID {entry['cid']}, "
+                              f"SCT {entry['sct']:#x}, SC {entry['sc']:#x}, NSID {entry['nsid']}, LBA {entry['lba']}")
+
+    def self_test(self, code=SELF_TEST_CODE_SHORT, timeout=None):
+        '''Run a device self-test on the drive, polling its progress at an adaptive interval
+        (use test_manager.fleet.self_test_drives to overlap self-tests across many drives)
+        Args:
+            code (int): Self-test code (short or extended)
+            timeout (float): Abort the self-test if still running after this many seconds
+        Returns:
+            bool: True if the self-test completed without error'''
+        if self.admin is None:
+            self.logger.error("Device not initialized. It is not possible to run a self-test")
+            return False
+
+        from nvme.self_test import SelfTestMonitor, run_self_tests
+
+        monitor = SelfTestMonitor(self.admin, self.logger, code=code, name=self.serial_number)
+        run_self_tests([monitor], self.logger, timeout=timeout)
+        return monitor.passed()
+
     def run(self):
         #Show a start message, run the selected test and show a end test message
         if self.test:
             self.logger.info(f"[====== Start Test: {self.testname} ======]")
-            self.test.run()
+            self.emit_phase("Test", "start")
+            #Tests with hot command loops get their "Executing:" lines collapsed into summaries
+            with self.log_manager.command_aggregation(getattr(self.test, "aggregate_commands", False)):
+                #Tests that change features get them snapshotted and restored, even if they raise
+                if getattr(self.test, "preserve_features", False):
+                    from nvme.feature_manager import FeatureManager
+                    features = FeatureManager(self.admin, self.logger)
+                    try:
+                        with features.preserve():
+                            self.test.run()
+                    finally:
+                        #A drive left with a changed feature fails the run
+                        if features.restore_failures:
+                            self.logger.error(f"{features.restore_failures} feature(s) could not be restored")
+                            self.test.errors += features.restore_failures
+                else:
+                    self.test.run()
             self.logger.info(f"[====== End test:   {self.testname} ======]")
+            self.emit_phase("Test", "end", errors=self.test.errors)
             return True
         else:
             self.logger.error("No test defined.")
             return None
 
     def set_final_result(self):
-        '''Log the Final test result based on the test's error count'''
+        '''Log the Final test result based on the test's error count
+        Returns:
+            str: "PASSED" or "FAILED"'''
         self.logger.info(f"================================")
-        if (self.test.errors == 0):
-            self.logger.info(f"[====== TEST PASSED ======]")
-        else:
-            self.logger.info(f"[====== TEST FAILED ======]")
+        verdict = "PASSED" if self.test.errors == 0 else "FAILED"
+        self.logger.info(f"[====== TEST {verdict} ======]")
         self.logger.info(f"================================")
+        self.report_handle_stats()
+        if self.results:
+            self.results.finish_run(self.run_id, verdict, self.test.errors)
+        if self.events:
+            self.events.verdict(verdict, self.test.errors)
+        #Keep the drive telemetry of every failure for later analysis
+        if self.test.errors != 0:
+            self.capture_telemetry()
+        return verdict
+
+    def report_handle_stats(self):
+        '''Log and record how many device handles the run opened and reused from the pool
+        (counted over the whole process, so concurrent runs in the same process are included)
+        Returns:
+            dict: Counter name -> increase since the start of the run'''
+        if self.handle_baseline is None:
+            return {}
+        stats = self.nvme.handle_stats()
+        delta = {name: stats[name] - self.handle_baseline.get(name, 0) for name in ("opens", "reuses", "reopens", "stale")}
+        self.logger.info(f"Device handles: {delta['opens']} opened ({delta['reopens']} reopened), "
+                         f"{delta['reuses']} reused, {delta['stale']} invalidated")
+        if self.results:
+            for name, value in delta.items():
+                self.results.record_measurement(self.run_id, f"handle_{name}", value)
+        return delta
+
+    def execute(self):
+        '''Run the whole sequence: drive Pre-Check, test, final result and drive Post-Check
+        Returns:
+            str: "PASSED" or "FAILED", or None if the test did not run'''
+        verdict = None
+        self.drive_check(discovery=True)
+        if self.run():
+            verdict = self.set_final_result()
+        self.drive_check(discovery=False)
+        return verdict
+
+    def capture_telemetry(self, log_dir="logs"):
+        '''Capture the host-initiated telemetry log, and the controller-initiated one when
+        the drive reports it has data available, next to the test logs.
+        Each log is captured to a file named after the serial number and LID, so a capture
+        interrupted in an earlier run is resumed (when the drive still holds the same data
+        generation), and it gets its timestamped name only once complete.
+        Args:
+            log_dir (str): Directory where the captures are stored'''
+        if self.admin is None:
+            return
+
+        from nvme.telemetry import TelemetryCapture, LOG_PAGE_ID_TELEMETRY_HOST, LOG_PAGE_ID_TELEMETRY_CTRL
+
+        timestamp = datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        base = os.path.join(log_dir, f"{self.testname}_{self.serial_number}_{timestamp}")
+        telemetry = TelemetryCapture(self.admin, self.logger)
+
+        self.logger.info("Capturing host-initiated telemetry log...")
+        summary = telemetry.capture(os.path.join(log_dir, f"{self.serial_number}_lid{LOG_PAGE_ID_TELEMETRY_HOST:02x}.bin"),
+                                    final_path=f"{base}_telemetry_host.bin")
+        if summary is None:
+            self.logger.error("Host-initiated telemetry capture failed.")
+            return
+
+        if summary["header"]["ctrl_avail"]:
+            self.logger.info("Capturing controller-initiated telemetry log...")
+            if telemetry.capture(os.path.join(log_dir, f"{self.serial_number}_lid{LOG_PAGE_ID_TELEMETRY_CTRL:02x}.bin"),
+                                 controller_initiated=True, final_path=f"{base}_telemetry_ctrl.bin") is None:
+                self.logger.error("Controller-initiated telemetry capture failed.")
 
+    def close(self):
+        '''Write the buffered results to the results store, release the device lease and close
+        the log and event stream (waiting for the compression of rotated log segments)'''
+        if self.results and self.owns_results:
+            self.results.close()
+        if self.lease:
+            self.lease.release()
+        self.log_manager.close()
@@ -12,6 +12,9 @@ MESSAGE = '/root/repos/Diplomado-SolidGM-Eq4/tests/TEXT.txt'
 FORMAT = 0
 class TestIdNs():
     
+    # Borra y crea namespaces: ningun otro test puede usar el controlador al mismo tiempo
+    access = "exclusive"
+
     def __init__(self, logger, nvme, admin):
         
         self.nvme = nvme
@@ -0,0 +1,217 @@
+import itertools
+import json
+import math
+import os
+import random
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from nvme.buffer_pool import lba_size_from_id_ns, open_block_device
+
+## Benchmark parameters
+NSID = 1
+BLOCK_SIZES = [4096, 131072]
+QUEUE_DEPTHS = [1, 32]
+WORKLOADS = [("seq", "read"), ("seq", "write"), ("rand", "read"), ("rand", "write")]
+RUNTIME_SECONDS = 5
+SPAN_BYTES = 1024 * 1024 * 1024
+STANDIN_LBA_SIZE = 512
+PERCENTILES = [50, 90, 99, 99.9]
+THRESHOLDS_PATH = "tests/perf_thresholds.json"
+
+##Class to measure throughput and latency of the namespace at several queue depths
+class TestPerfIo():
+    ## Writes over the namespace and needs the drive to itself for meaningful latencies
+    access = "exclusive"
+    ## Namespace written by the benchmark, leased along with the controller
+    namespaces = {NSID: "exclusive"}
+    ## Gives our logger and the functions of NVME to the class
+    def __init__(self, logger, nvme, admin, block_sizes=BLOCK_SIZES, queue_depths=QUEUE_DEPTHS,
+                 workloads=WORKLOADS, runtime=RUNTIME_SECONDS, thresholds_path=THRESHOLDS_PATH):
+        self.logger = logger
+        self.nvme = nvme
+        self.admin = admin
+        self.block_sizes = block_sizes
+        self.queue_depths = queue_depths
+        self.workloads = workloads
+        self.runtime = runtime
+        self.thresholds_path = thresholds_path
+        self.errors = 0
+        self.results = []
+        self.standin = False
+
+    def run(self):
+
+        ## Resolve the namespace, or use the device itself when it is a file or loop-device stand-in
+        target, id_ns = self.resolve_target()
+        self.logger.info(f"Benchmark target: {target}")
+
+        ## Size the aligned buffer pool for the largest block and the deepest queue
+        if id_ns:
+            self.nvme.configure_buffer_pool(id_ns=id_ns, buffer_size=max(self.block_sizes),
+                                            count=max(self.queue_depths))
+        else:
+            self.nvme.configure_buffer_pool(lba_size=STANDIN_LBA_SIZE, buffer_size=max(self.block_sizes),
+                                            count=max(self.queue_depths))
+
+        thresholds = self.load_thresholds()
+
+        ## Execute every workload at every block size and queue depth
+        for pattern, op in self.workloads:
+            for block_size in self.block_sizes:
+                if block_size % self.nvme.buffer_pool.lba_size:
+                    self.logger.error(f"Block size {block_size} is not a multiple of the LBA size")
+                    self.errors += 1
+                    continue
+                for qd in self.queue_depths:
+                    result = self.run_job(target, pattern, op, block_size, qd)
+                    if result is None:
+                        self.errors += 1
+                        continue
+                    self.report(result)
+                    self.results.append(result)
+
+        ## Compare the results against the thresholds of this model/firmware
+        self.errors += self.validate(self.results, thresholds)
+        if self.errors == 0:
+            self.logger.info("TEST PASSED, 0 errors")
+            return True
+        self.logger.info(f"TEST FAILED, {self.errors} error(s)")
+        return False
+
+    def resolve_target(self):
+
+        ## Regular files and block devices (e.g. /dev/loop0) are used directly as the namespace
+        device = self.nvme.device
+        if device and os.path.exists(device) and not stat.S_ISCHR(os.stat(device).st_mode):
+            self.standin = True
+            return device, None
+
+        ## Real controller: benchmark the namespace and size buffers from its LBA format
+        id_ns = self.admin.id_ns(NSID)
+        if id_ns:
+            self.logger.info(f"LBA size: {lba_size_from_id_ns(id_ns)} bytes")
+        return f"{device}n{NSID}", id_ns
+
+    def load_thresholds(self):
+
+        ## Pick the thresholds of this model and firmware, then this model, then the default ones
+        try:
+            with open(self.thresholds_path, 'r') as thresholds_file:
+                all_thresholds = json.load(thresholds_file)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            self.logger.error(f"Unable to load thresholds from {self.thresholds_path}: {e}")
+            return {}
+
+        ctrl = None if self.standin else self.admin.id_ctrl()
+        if ctrl:
+            for key in (f"{ctrl['mn']}|{ctrl['fr']}", ctrl["mn"]):
+                if key in all_thresholds:
+                    self.logger.info(f"Using performance thresholds for {key}")
+                    return all_thresholds[key]
+
+        self.logger.info("Using default performance thresholds")
+        return all_thresholds.get("default", {})
+
+    def run_job(self, target, pattern, op, block_size, qd):
+
+        write = op == "write"
+        pool = self.nvme.buffer_pool
+        try:
+            fd, direct = open_block_device(target, write=write)
+        except OSError as e:
+            self.logger.error(f"Unable to open {target}: {e}")
+            return None
+
+        try:
+            ## Limit the working span so writes stay bounded on large namespaces
+            span = min(os.lseek(fd, 0, os.SEEK_END), SPAN_BYTES) // block_size
+            if span == 0:
+                self.logger.error(f"Target {target} is smaller than one {block_size} byte block")
+                return None
+
+            next_block = itertools.count()
+            lock = threading.Lock()
+            deadline = time.monotonic() + self.runtime
+
+            def worker(seed):
+                ## Every worker keeps one I/O outstanding, so the pool size is the queue depth
+                latencies = []
+                rng = random.Random(seed)
+                with pool.buffer(block_size) as view:
+                    if write:
+                        view[:] = os.urandom(block_size)
+                    while time.monotonic() < deadline:
+                        if pattern == "seq":
+                            with lock:
+                                block = next(next_block) % span
+                        else:
+                            block = rng.randrange(span)
+                        start = time.perf_counter_ns()
+                        if write:
+                            os.pwritev(fd, [view], block * block_size)
+                        else:
+                            os.preadv(fd, [view], block * block_size)
+                        latencies.append(time.perf_counter_ns() - start)
+                return latencies
+
+            started = time.monotonic()
+            with ThreadPoolExecutor(max_workers=qd) as executor:
+                per_worker = list(executor.map(worker, range(qd)))
+            elapsed = time.monotonic() - started
+        except OSError as e:
+            self.logger.error(f"I/O error during {pattern} {op} bs={block_size} qd={qd}: {e}")
+            return None
+        finally:
+            os.close(fd)
+
+        latencies = sorted(lat for worker_lat in per_worker for lat in worker_lat)
+        ios = len(latencies)
+        return {
+            "workload": f"{pattern}_{op}",
+            "block_size": block_size,
+            "qd": qd,
+            "direct": direct,
+            "ios": ios,
+            "iops": ios / elapsed,
+            "mbps": ios * block_size / elapsed / 1e6,
+            "lat_us": {f"p{p}": self.percentile(latencies, p) / 1000 for p in PERCENTILES},
+        }
+
+    def percentile(self, ordered, p):
+
+        ## Nearest-rank percentile over sorted latencies
+        if not ordered:
+            return 0
+        rank = max(0, min(len(ordered), math.ceil(p / 100 * len(ordered))) - 1)
+        return ordered[rank]
+
+    def report(self, result):
+
+        lat = ", ".join(f"{name}={value:.1f}us" for name, value in result["lat_us"].items())
+        self.logger.info(f"{result['workload']} bs={result['block_size']} qd={result['qd']} "
+                         f"direct={result['direct']}: {result['iops']:.0f} IOPS, "
+                         f"{result['mbps']:.1f} MB/s, {lat}")
+
+    def validate(self, results, thresholds):
+
+        errors = 0
+        for result in results:
+            ## Thresholds are keyed by workload, block size and queue depth, e.g. "rand_read/4096/32"
+            key = f"{result['workload']}/{result['block_size']}/{result['qd']}"
+            limits = thresholds.get(key)
+            if not limits:
+                continue
+
+            if result["iops"] < limits.get("min_iops", 0):
+                self.logger.error(f"{key}: {result['iops']:.0f} IOPS below {limits['min_iops']}")
+                errors += 1
+            if result["mbps"] < limits.get("min_mbps", 0):
+                self.logger.error(f"{key}: {result['mbps']:.1f} MB/s below {limits['min_mbps']}")
+                errors += 1
+            if "max_p99_us" in limits and result["lat_us"]["p99"] > limits["max_p99_us"]:
+                self.logger.error(f"{key}: p99 {result['lat_us']['p99']:.1f}us above {limits['max_p99_us']}")
+                errors += 1
+        return errors
@@ -1,7 +1,9 @@
 import re
+import time
 from logger.log_manager import LogManager
 from nvme.nvme_wrapper import NvmeCommands
 from nvme.admin_passthru_wrapper import AdminCommands
+from nvme.aer_listener import AerListener, AER_SMART_TEMPERATURE
 
 ## Data of our NVME controller
 DEVICE = "/dev/nvme0"
@@ -12,10 +14,16 @@ PERCENTAGE_USAGE_TRESHOLDS = 100
 N = 140
 FID = "0x4"
 FID_INT = 0x4
-TMP_INIT = 0x155
+AER_TIMEOUT = 10
 MESSAGE = '/root/repos/Diplomado-SolidGM-Eq4/tests/TEXT.txt'
 ##Class to test the smart_log command of the NVME controller
 class TestSmartLog():
+  ## The temperature threshold is changed, so the test manager restores the features at the end
+    preserve_features = True
+  ## The read/write loop runs 280 commands, so their log lines are aggregated into summaries
+    aggregate_commands = True
+  ## Writes data and changes a feature, so no other test may use the controller meanwhile
+    access = "exclusive"
   ## Gives our logger and the functions of NVME to the class
     def __init__(self, logger, nvme, admin):
         self.admin = admin
@@ -64,8 +72,22 @@ class TestSmartLog():
             self.nvme.write(nsid=1, start_block=0, block_count=0, data_size=512, input_file=MESSAGE)
             self.nvme.read(nsid=1, start_block=0, block_count=0, data_size=512)
 
-        ## Change temperature threshold and critical warning ------MISSING------
-        self.admin.set_feature(fid=FID_INT,value=0x55)
+        ## Lower the temperature threshold below the current temperature and wait for the
+        ## SMART temperature event instead of polling the critical warning
+        try:
+            with AerListener(self.admin, self.logger) as listener:
+                since = time.monotonic()
+                self.admin.set_feature(fid=FID_INT,value=0x55)
+                event = listener.wait_for("smart", info=AER_SMART_TEMPERATURE, timeout=AER_TIMEOUT, since=since)
+        except RuntimeError as ex:
+            self.logger.error(str(ex))
+            self.errors += 1
+        else:
+            if event is None:
+                self.logger.error(f"No temperature event received within {AER_TIMEOUT} seconds")
+                self.errors += 1
+            else:
+                self.logger.info(f"Temperature event received after {event['monotonic'] - since:.3f} seconds")
 
         ## Take final snapshot of the smart log command using admin-passthru
         found_log = self.admin.smart_log()
@@ -79,8 +101,7 @@ class TestSmartLog():
             self.logger.info("PASSED: No errors found in smart_log test")
         else:
             self.logger.error(f"FAILED: {self.errors} errors found in smart_log test")
-            
-        self.admin.set_feature(fid=FID_INT,value=TMP_INIT)
+
         return self.errors
     
     def extract_temp(self, text):